@@ -2,15 +2,40 @@ import shutil
 import tempfile
 import unittest
 import ctypes
+import functools
+import hashlib
+import importlib.machinery
+import importlib.util
+import os
 import subprocess
+import sysconfig
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
 
 from zolotone import Node, StaticType, TupleT
+from infra.cpp_cache import compiler_identity, default_cache
 
 _INFRA_DIR = Path(__file__).resolve().parent
 _AC_TYPES_INCLUDE_DIR = _INFRA_DIR / "ac_types" / "include"
 
 
+@functools.lru_cache(maxsize=None)
+def _include_digest() -> str:
+    """Digest of the ac_types headers, which nonjittable sources include."""
+    digest = hashlib.blake2b(digest_size=16)
+    if _AC_TYPES_INCLUDE_DIR.is_dir():
+        for path in sorted(_AC_TYPES_INCLUDE_DIR.rglob("*")):
+            if path.is_file():
+                digest.update(path.relative_to(_AC_TYPES_INCLUDE_DIR).as_posix().encode() + b"\0")
+                digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
 def _find_cpp_compiler() -> str | None:
     for candidate in ("c++", "g++", "clang++"):
         compiler = shutil.which(candidate)
@@ -19,6 +44,27 @@ def _find_cpp_compiler() -> str | None:
     raise unittest.SkipTest("A C++ compiler is required for lowering round-trip tests")
 
 
+# Lowered sources by design fingerprint, so that recompiling a design skips codegen
+_LOWERED_SOURCES_MAX = 256
+_lowered_sources: OrderedDict[tuple, str] = OrderedDict()
+_lowered_sources_lock = threading.Lock()
+
+
+def _lowered_source(node: Node, name: str, jittable: bool, optimize: bool, batch: bool = False) -> str:
+    key = (node._fingerprint(jittable), name, jittable, optimize, batch)
+    with _lowered_sources_lock:
+        source = _lowered_sources.get(key)
+        if source is not None:
+            _lowered_sources.move_to_end(key)
+            return source
+    source = node.to_cpp(name, jittable=jittable, optimize=optimize, batch=batch)
+    with _lowered_sources_lock:
+        _lowered_sources[key] = source
+        if len(_lowered_sources) > _LOWERED_SOURCES_MAX:
+            _lowered_sources.popitem(last=False)
+    return source
+
+
 def _abi_bits(type_: StaticType) -> int:
     if isinstance(type_, TupleT):
         raise TypeError("compile helpers support only scalar arguments and return types")
@@ -58,20 +104,44 @@ def _arg_mask(type_: StaticType) -> str:
     return str((1 << type_.total_bits()) - 1)
 
 
-def _wrapper_arg_expr(arg, idx: int, *, jittable: bool) -> str:
-    expr = f"arg_{idx}"
+def _is_wide(type_: StaticType, jittable: bool) -> bool:
+    return jittable and not isinstance(type_, TupleT) and type_.total_bits() > 64
+
+
+def _word_count(type_: StaticType) -> int:
+    return (type_.total_bits() + 63) // 64
+
+
+def _wrapper_param(arg, idx: int, *, jittable: bool) -> str:
+    if _is_wide(arg.node_type, jittable):
+        return f"const std::uint64_t* arg_{idx}"
+    return f"{_cpp_abi_type(arg.node_type)} arg_{idx}"
+
+
+def _wrapper_arg_expr(arg, idx: int, *, jittable: bool, name: str | None = None) -> str:
+    expr = name or f"arg_{idx}"
+    if _is_wide(arg.node_type, jittable):
+        return f"{_lowered_cpp_type(arg.node_type, jittable=jittable)}::load({expr})"
     if jittable:
         expr = f"static_cast<{_cpp_abi_type(arg.node_type)}>({expr} & {_arg_mask(arg.node_type)})"
     lowered_type = _lowered_cpp_type(arg.node_type, jittable=jittable)
     return f"static_cast<{lowered_type}>({expr})"
 
 
-def compile_(node: Node, jittable: bool):
-    if not hasattr(node, "inner_args"):
-        raise TypeError("compile helpers expect a Primitive or Composite node")
+def _numpy_abi_type(type_: StaticType):
+    return np.dtype(f"uint{_abi_bits(type_)}")
 
-    function_name = "lowered_entry"
-    source = node.to_cpp(function_name, jittable=jittable)
+
+_DEFAULT_INCLUDES = ["#include <cstdint>", '#include "lowered.hpp"']
+
+
+def _build_shared_object(
+    source: str,
+    wrapper_lines: list[str],
+    jittable: bool,
+    includes: list[str] = _DEFAULT_INCLUDES,
+    extra_flags: tuple[str, ...] = (),
+):
     compiler = _find_cpp_compiler()
 
     tempdir = tempfile.TemporaryDirectory()
@@ -80,44 +150,29 @@ def compile_(node: Node, jittable: bool):
     wrapper_path = temp_path / "wrapper.cpp"
     library_path = temp_path / "lowered.so"
 
+    wrapper = "\n".join([*includes, "", *wrapper_lines, ""])
     header_path.write_text(source, encoding="utf-8")
-    arg_decls = [
-        f"{_cpp_abi_type(arg.node_type)} arg_{idx}"
-        for idx, arg in enumerate(node.inner_args)
-    ]
-    call_args = ", ".join(
-        _wrapper_arg_expr(arg, idx, jittable=jittable)
-        for idx, arg in enumerate(node.inner_args)
-    )
-    return_type = _cpp_abi_type(node.node_type)
+    wrapper_path.write_text(wrapper, encoding="utf-8")
 
-    wrapper_path.write_text(
-        "\n".join(
-            [
-                "#include <cstdint>",
-                '#include "lowered.hpp"',
-                "",
-                f'extern "C" {return_type} {function_name}_entry({", ".join(arg_decls)}) {{',
-                f"    return static_cast<{return_type}>({function_name}({call_args}));",
-                "}",
-                "",
-            ]
-        ),
-        encoding="utf-8",
-    )
-
-    command = [
-        compiler,
+    flags = [
         "-std=c++17",
         "-shared",
         "-fPIC",
         "-O3",
         "-march=native",
         f"-I{_AC_TYPES_INCLUDE_DIR}",
-        str(wrapper_path),
-        "-o",
-        str(library_path),
+        *extra_flags,
     ]
+    cache = default_cache()
+    if cache is not None:
+        # Only nonjittable sources include the ac_types headers
+        headers = () if jittable else (_include_digest(),)
+        key = cache.key(compiler_identity(compiler), *flags, *headers, source, wrapper)
+        cached_path = cache.get(key)
+        if cached_path is not None:
+            return tempdir, cached_path
+
+    command = [compiler, *flags, str(wrapper_path), "-o", str(library_path)]
     result = subprocess.run(command, capture_output=True, text=True, check=False)
     if result.returncode != 0:
         tempdir.cleanup()
@@ -133,17 +188,393 @@ def compile_(node: Node, jittable: bool):
             f"stdout:\n{result.stdout}\n"
             f"stderr:\n{result.stderr}"
         )
+    if cache is not None:
+        library_path = cache.put(key, library_path)
+    return tempdir, library_path
+
+
+def _build_library(source: str, wrapper_lines: list[str], jittable: bool):
+    tempdir, library_path = _build_shared_object(source, wrapper_lines, jittable=jittable)
+    return tempdir, ctypes.CDLL(str(library_path))
+
+
+class WideFunction:
+    """Calls a lowered entry point with values wider than 64 bits as Python ints.
+
+    Such values cross the ABI as arrays of 64-bit words, least significant
+    first; a wide result is written through a trailing output pointer.
+    """
+
+    def __init__(self, entry, arg_types: list[StaticType], return_type: StaticType):
+        self.arg_words = [_word_count(type_) if _is_wide(type_, True) else 0 for type_ in arg_types]
+        self.out_words = _word_count(return_type) if _is_wide(return_type, True) else 0
+        entry.argtypes = [
+            *(ctypes.POINTER(ctypes.c_uint64) if words else _ctypes_abi_type(type_)
+              for words, type_ in zip(self.arg_words, arg_types)),
+            *([ctypes.POINTER(ctypes.c_uint64)] if self.out_words else []),
+        ]
+        entry.restype = None if self.out_words else _ctypes_abi_type(return_type)
+        self._entry = entry
+
+    @staticmethod
+    def _to_words(value: int, words: int):
+        return (ctypes.c_uint64 * words)(*((value >> (64 * i)) & ((1 << 64) - 1) for i in range(words)))
+
+    def __call__(self, *args: int) -> int:
+        if len(args) != len(self.arg_words):
+            raise TypeError(f"Expected {len(self.arg_words)} arguments, got {len(args)}")
+        c_args = [self._to_words(arg, words) if words else arg for arg, words in zip(args, self.arg_words)]
+        if not self.out_words:
+            return self._entry(*c_args)
+        out = (ctypes.c_uint64 * self.out_words)()
+        self._entry(*c_args, out)
+        return sum(word << (64 * i) for i, word in enumerate(out))
+
+
+# A lowered design: header source, wrapper source lines, and a function binding the loaded library
+_LoweredEntry = tuple[str, list[str], Callable[[ctypes.CDLL], Callable]]
+
+
+def _lower_entry(node: Node, jittable: bool, optimize: bool = True) -> _LoweredEntry:
+    if not hasattr(node, "inner_args"):
+        raise TypeError("compile helpers expect a Primitive or Composite node")
+    return (_lowered_source(node, "lowered_entry", jittable, optimize), *_entry_wrapper(node, "lowered_entry", jittable))
+
+
+def _entry_wrapper(node: Node, function_name: str, jittable: bool) -> tuple[list[str], Callable[[ctypes.CDLL], Callable]]:
+    arg_decls = [
+        _wrapper_param(arg, idx, jittable=jittable)
+        for idx, arg in enumerate(node.inner_args)
+    ]
+    call_args = ", ".join(
+        _wrapper_arg_expr(arg, idx, jittable=jittable)
+        for idx, arg in enumerate(node.inner_args)
+    )
+    arg_types = [arg.node_type for arg in node.inner_args]
+    wide = _is_wide(node.node_type, jittable) or any(_is_wide(type_, jittable) for type_ in arg_types)
+
+    if _is_wide(node.node_type, jittable):
+        wrapper_lines = [
+            f'extern "C" void {function_name}_entry({", ".join([*arg_decls, "std::uint64_t* out"])}) {{',
+            f"    {function_name}({call_args}).store(out);",
+            "}",
+        ]
+    else:
+        return_type = _cpp_abi_type(node.node_type)
+        wrapper_lines = [
+            f'extern "C" {return_type} {function_name}_entry({", ".join(arg_decls)}) {{',
+            f"    return static_cast<{return_type}>({function_name}({call_args}));",
+            "}",
+        ]
+
+    def bind(library: ctypes.CDLL):
+        func = getattr(library, f"{function_name}_entry")
+        if wide:
+            return WideFunction(func, arg_types, node.node_type)
+        func.argtypes = [_ctypes_abi_type(type_) for type_ in arg_types]
+        func.restype = _ctypes_abi_type(node.node_type)
+        return func
+
+    return wrapper_lines, bind
+
+
+def _build_entry(lowered: _LoweredEntry, jittable: bool):
+    source, wrapper_lines, bind = lowered
+    tempdir, library = _build_library(source, wrapper_lines, jittable=jittable)
+    return tempdir, bind(library)
+
+
+def compile_(node: Node, jittable: bool, optimize: bool = True):
+    return _build_entry(_lower_entry(node, jittable, optimize), jittable)
+
+
+class BatchFunction:
+    """Runs the lowered design over NumPy arrays in one native call.
+
+    Arguments that are already C-contiguous arrays of the ABI dtype
+    (uint8/16/32/64 by width, see `dtypes`) are passed without copies.
+    """
+
+    def __init__(self, entry, arg_types: list[StaticType], return_type: StaticType):
+        self.dtypes = [_numpy_abi_type(type_) for type_ in arg_types]
+        self.out_dtype = _numpy_abi_type(return_type)
+        entry.argtypes = [
+            *(np.ctypeslib.ndpointer(dtype=dtype, flags="C_CONTIGUOUS") for dtype in self.dtypes),
+            np.ctypeslib.ndpointer(dtype=self.out_dtype, flags=("C_CONTIGUOUS", "WRITEABLE")),
+            ctypes.c_uint64,
+        ]
+        entry.restype = None
+        self._entry = entry
+
+    def _run(self, columns: list[np.ndarray], out: np.ndarray, size: int) -> None:
+        self._entry(*columns, out, size)
+
+    def __call__(self, *columns, out: np.ndarray | None = None) -> np.ndarray:
+        if len(columns) != len(self.dtypes):
+            raise TypeError(f"Expected {len(self.dtypes)} input arrays, got {len(columns)}")
+        columns = [np.ascontiguousarray(column, dtype=dtype) for column, dtype in zip(columns, self.dtypes)]
+        sizes = {column.shape[0] for column in columns}
+        if len(sizes) > 1 or any(column.ndim != 1 for column in columns):
+            raise ValueError(f"Input arrays must be one-dimensional and of equal length, got sizes {sorted(sizes)}")
+        size = sizes.pop() if sizes else 0
+        if out is None:
+            out = np.empty(size, dtype=self.out_dtype)
+        elif out.shape != (size,):
+            raise ValueError(f"Output array must have shape ({size},), got {out.shape}")
+        self._run(columns, out, size)
+        return out
+
+
+def _lower_batch_entry(node: Node, jittable: bool, optimize: bool = True) -> _LoweredEntry:
+    if not hasattr(node, "inner_args"):
+        raise TypeError("compile helpers expect a Primitive or Composite node")
+    source = _lowered_source(node, "lowered_entry", jittable, optimize, batch=True)
+    return (source, *_batch_entry_wrapper(node, "lowered_entry"))
+
+
+def _batch_entry_wrapper(node: Node, function_name: str) -> tuple[list[str], Callable[[ctypes.CDLL], Callable]]:
+    arg_types = [arg.node_type for arg in node.inner_args]
+    params = [f"const {_cpp_abi_type(type_)}* arg_{idx}" for idx, type_ in enumerate(arg_types)]
+    params.extend([f"{_cpp_abi_type(node.node_type)}* out", "std::uint64_t n"])
+    call_args = ", ".join([*(f"arg_{idx}" for idx in range(len(arg_types))), "out", "n"])
+
+    wrapper_lines = [
+        f'extern "C" void {function_name}_batch_entry({", ".join(params)}) {{',
+        f"    {function_name}_batch({call_args});",
+        "}",
+    ]
+
+    def bind(library: ctypes.CDLL):
+        return BatchFunction(getattr(library, f"{function_name}_batch_entry"), arg_types, node.node_type)
+
+    return wrapper_lines, bind
+
+
+def compile_batch_(node: Node, jittable: bool, optimize: bool = True):
+    return _build_entry(_lower_batch_entry(node, jittable, optimize), jittable)
+
+
+def jit_compile(node: Node, optimize: bool = True):
+    return compile_(node, jittable=True, optimize=optimize)
+
+
+def nonjit_compile(node: Node, optimize: bool = True):
+    return compile_(node, jittable=False, optimize=optimize)
+
+
+def jit_compile_batch(node: Node, optimize: bool = True):
+    return compile_batch_(node, jittable=True, optimize=optimize)
+
+
+def nonjit_compile_batch(node: Node, optimize: bool = True):
+    return compile_batch_(node, jittable=False, optimize=optimize)
+
+
+_LIMITED_API_VERSION = "0x030B0000"  # 3.11, the first release with the buffer protocol in the limited API
+
+_EXTENSION_INCLUDES = [
+    "#define PY_SSIZE_T_CLEAN",
+    f"#define Py_LIMITED_API {_LIMITED_API_VERSION}",
+    "#include <Python.h>",
+    *_DEFAULT_INCLUDES,
+    "#include <cstring>",
+]
+
+
+def _extension_source(node: Node, module_name: str, jittable: bool) -> list[str]:
+    # Scalar `call(*ints)` and `batch(*arrays, out)`, both METH_FASTCALL; arrays are read through the buffer protocol
+    arg_types = [arg.node_type for arg in node.inner_args]
+    if any(_is_wide(type_, True) for type_ in [*arg_types, node.node_type]):
+        raise TypeError("extension helpers support only values up to 64 bits")
+    return_type = _cpp_abi_type(node.node_type)
+    n_args = len(arg_types)
+
+    scalar_reads = []
+    for idx in range(n_args):
+        scalar_reads.extend([
+            f"    const unsigned long long arg_{idx} = PyLong_AsUnsignedLongLongMask(args[{idx}]);",
+            f"    if (arg_{idx} == static_cast<unsigned long long>(-1) && PyErr_Occurred()) return nullptr;",
+        ])
+    scalar_call = ", ".join(_wrapper_arg_expr(arg, idx, jittable=jittable) for idx, arg in enumerate(node.inner_args))
+    column_ptrs = [
+        f"    const {_cpp_abi_type(type_)}* col_{idx} = static_cast<const {_cpp_abi_type(type_)}*>(buffers.views[{idx}].buf);"
+        for idx, type_ in enumerate(arg_types)
+    ]
+    batch_call = ", ".join(
+        _wrapper_arg_expr(arg, idx, jittable=jittable, name=f"col_{idx}[i]")
+        for idx, arg in enumerate(node.inner_args)
+    )
+    itemsizes = ", ".join(str(_abi_bits(type_) // 8) for type_ in [*arg_types, node.node_type])
+
+    return [
+        "namespace {",
+        "",
+        "struct Buffers {",
+        f"    Py_buffer views[{n_args + 1}];",
+        "    int acquired = 0;",
+        "    ~Buffers() {",
+        "        for (int i = 0; i < acquired; ++i) PyBuffer_Release(&views[i]);",
+        "    }",
+        "};",
+        "",
+        "bool is_unsigned_format(const char* format) {",
+        "    if (format == nullptr) return true;",
+        "    const char code = format[0] == '<' || format[0] == '=' || format[0] == '@' ? format[1] : format[0];",
+        "    return code != '\\0' && std::strchr(\"BHILQ\", code) != nullptr;",
+        "}",
+        "",
+        "PyObject* call(PyObject*, PyObject* const* args, Py_ssize_t nargs) {",
+        f"    if (nargs != {n_args}) {{",
+        f'        PyErr_Format(PyExc_TypeError, "expected {n_args} arguments, got %zd", nargs);',
+        "        return nullptr;",
+        "    }",
+        *scalar_reads,
+        f"    return PyLong_FromUnsignedLongLong(static_cast<{return_type}>(lowered_entry({scalar_call})));",
+        "}",
+        "",
+        "PyObject* batch(PyObject*, PyObject* const* args, Py_ssize_t nargs) {",
+        f"    if (nargs != {n_args + 1}) {{",
+        f'        PyErr_Format(PyExc_TypeError, "expected {n_args} input buffers and an output buffer, got %zd arguments", nargs);',
+        "        return nullptr;",
+        "    }",
+        f"    static const Py_ssize_t itemsizes[] = {{{itemsizes}}};",
+        "    Buffers buffers;",
+        "    Py_ssize_t n = -1;",
+        f"    for (int idx = 0; idx <= {n_args}; ++idx) {{",
+        f"        const int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | (idx == {n_args} ? PyBUF_WRITABLE : 0);",
+        "        if (PyObject_GetBuffer(args[idx], &buffers.views[idx], flags) < 0) return nullptr;",
+        "        buffers.acquired++;",
+        "        const Py_buffer& view = buffers.views[idx];",
+        "        if (view.itemsize != itemsizes[idx] || !is_unsigned_format(view.format)) {",
+        '            PyErr_Format(PyExc_TypeError, "buffer %d must hold unsigned %zd-byte integers", idx, itemsizes[idx]);',
+        "            return nullptr;",
+        "        }",
+        "        if (n >= 0 && view.len / view.itemsize != n) {",
+        '            PyErr_SetString(PyExc_ValueError, "buffers must have equal lengths");',
+        "            return nullptr;",
+        "        }",
+        "        n = view.len / view.itemsize;",
+        "    }",
+        *column_ptrs,
+        f"    {return_type}* out = static_cast<{return_type}*>(buffers.views[{n_args}].buf);",
+        "    Py_BEGIN_ALLOW_THREADS",
+        "    for (Py_ssize_t i = 0; i < n; ++i) {",
+        f"        out[i] = static_cast<{return_type}>(lowered_entry({batch_call}));",
+        "    }",
+        "    Py_END_ALLOW_THREADS",
+        "    Py_INCREF(Py_None);",
+        "    return Py_None;",
+        "}",
+        "",
+        "PyMethodDef methods[] = {",
+        '    {"call", reinterpret_cast<PyCFunction>(reinterpret_cast<void (*)(void)>(call)), METH_FASTCALL, "Evaluates the design on integer arguments."},',
+        '    {"batch", reinterpret_cast<PyCFunction>(reinterpret_cast<void (*)(void)>(batch)), METH_FASTCALL, "Evaluates the design over input buffers into an output buffer."},',
+        "    {nullptr, nullptr, 0, nullptr},",
+        "};",
+        "",
+        f'PyModuleDef module_def = {{PyModuleDef_HEAD_INIT, "{module_name}", nullptr, -1, methods}};',
+        "",
+        "}  // namespace",
+        "",
+        f'extern "C" PyMODINIT_FUNC PyInit_{module_name}(void) {{',
+        "    return PyModule_Create(&module_def);",
+        "}",
+    ]
+
+
+def _load_extension(module_name: str, path: Path):
+    loader = importlib.machinery.ExtensionFileLoader(module_name, str(path))
+    spec = importlib.util.spec_from_file_location(module_name, str(path), loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def compile_extension(node: Node, jittable: bool = True, optimize: bool = True):
+    """Builds the lowered design into a CPython extension module on the limited API.
+
+    Returns `(tempdir, module)`; `module.call(*ints)` evaluates one point and
+    `module.batch(*arrays, out)` fills `out` from C-contiguous unsigned
+    arrays, without going through ctypes.
+    """
+    if not hasattr(node, "inner_args"):
+        raise TypeError("compile helpers expect a Primitive or Composite node")
+
+    source = _lowered_source(node, "lowered_entry", jittable, optimize)
+    # Modules of one name share the import machinery, so the name follows the source
+    module_name = "_zolotone_" + hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+    tempdir, path = _build_shared_object(
+        source,
+        _extension_source(node, module_name, jittable=jittable),
+        jittable=jittable,
+        includes=_EXTENSION_INCLUDES,
+        extra_flags=(f"-I{sysconfig.get_paths()['include']}",),
+    )
+    return tempdir, _load_extension(module_name, path)
+
+
+class ExtensionBatchFunction(BatchFunction):
+    """BatchFunction over the buffer-protocol entry of `compile_extension()`."""
+
+    def __init__(self, batch, arg_types: list[StaticType], return_type: StaticType):
+        self.dtypes = [_numpy_abi_type(type_) for type_ in arg_types]
+        self.out_dtype = _numpy_abi_type(return_type)
+        self._batch = batch
+
+    def _run(self, columns: list[np.ndarray], out: np.ndarray, size: int) -> None:
+        self._batch(*columns, out)
+
+
+def ext_compile(node: Node, optimize: bool = True):
+    """Drop-in for `jit_compile()` returning the vectorcall scalar entry of the extension."""
+    tempdir, module = compile_extension(node, optimize=optimize)
+    return tempdir, module.call
+
+
+def ext_compile_batch(node: Node, optimize: bool = True):
+    """Drop-in for `jit_compile_batch()` over the buffer-protocol entry of the extension."""
+    tempdir, module = compile_extension(node, optimize=optimize)
+    arg_types = [arg.node_type for arg in node.inner_args]
+    return tempdir, ExtensionBatchFunction(module.batch, arg_types, node.node_type)
+
+
+class CompilePool:
+    """Compiles several designs at once.
+
+    `submit()` lowers the design in the calling thread and hands the build to
+    a worker, which runs the compiler in its own process and loads the
+    library. The returned future resolves to the `(tempdir, fn)` pair of
+    `compile_()`/`compile_batch_()`, so a set of designs takes about as long
+    as its slowest compile.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+
+    def submit(self, node: Node, jittable: bool = True, optimize: bool = True, batch: bool = False) -> Future:
+        lower = _lower_batch_entry if batch else _lower_entry
+        return self._executor.submit(_build_entry, lower(node, jittable, optimize), jittable)
 
-    library = ctypes.CDLL(str(library_path))
-    func = getattr(library, f"{function_name}_entry")
-    func.argtypes = [_ctypes_abi_type(arg.node_type) for arg in node.inner_args]
-    func.restype = _ctypes_abi_type(node.node_type)
-    return tempdir, func
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
 
+    def __enter__(self) -> "CompilePool":
+        return self
 
-def jit_compile(node: Node):
-    return compile_(node, jittable=True)
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
 
 
-def nonjit_compile(node: Node):
-    return compile_(node, jittable=False)
+def compile_all(
+    nodes: Iterable[Node],
+    jittable: bool = True,
+    optimize: bool = True,
+    batch: bool = False,
+    max_workers: int | None = None,
+) -> Iterator[tuple[Node, tempfile.TemporaryDirectory, Callable]]:
+    """Yields `(node, tempdir, fn)` for every design as soon as its compile finishes."""
+    with CompilePool(max_workers=max_workers) as pool:
+        futures = {pool.submit(node, jittable=jittable, optimize=optimize, batch=batch): node for node in nodes}
+        for future in as_completed(futures):
+            tempdir, fn = future.result()
+            yield futures[future], tempdir, fn
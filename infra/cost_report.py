@@ -0,0 +1,46 @@
+import argparse
+import json
+from pathlib import Path
+
+from zolotone.sim import CostReport, estimate_cost
+from infra.elaboration_bench import DESIGNS
+
+
+def design_report(name: str, optimize: bool = True) -> CostReport:
+    design, make_inputs = DESIGNS[name]
+    return estimate_cost(design(*make_inputs()), optimize=optimize)
+
+
+def format_comparison(reports: list[CostReport]) -> str:
+    width = max(len("design"), *(len(report.design) for report in reports))
+    lines = [f"{'design':<{width}}  {'area GE':>10}  {'adder':>6}  {'mux':>6}  {'shift':>5}  {'mul':>6}  {'depth':>5}"]
+    for report in reports:
+        cost = report.cost
+        lines.append(
+            f"{report.design:<{width}}  {cost.area:>10.1f}  {cost.adder_bits:>6}  {cost.mux_bits:>6}"
+            f"  {cost.shifter_stages:>5}  {cost.multiplier_bits:>6}  {report.depth:>5}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Static area and critical-path estimates of the example designs")
+    parser.add_argument("designs", nargs="*", help=f"Designs to estimate, any of {', '.join(DESIGNS)} (default: all)")
+    parser.add_argument("--no-optimize", help="Estimate the design as written, without graph passes", action="store_true")
+    parser.add_argument("--details", help="Print per-Primitive/Composite tables with this many rows", default=0, type=int)
+    parser.add_argument("--json-report", help="Write the full reports to this JSON file", default=None)
+    args = parser.parse_args()
+    unknown = [name for name in args.designs if name not in DESIGNS]
+    if unknown:
+        parser.error(f"unknown designs: {', '.join(unknown)}")
+
+    reports = [design_report(name, optimize=not args.no_optimize) for name in (args.designs or DESIGNS)]
+    if args.json_report:
+        report_path = Path(args.json_report)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = [json.loads(report.to_json()) for report in reports]
+        report_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(format_comparison(reports))
+    for report in reports if args.details else []:
+        print()
+        print(report.table(limit=args.details))
@@ -0,0 +1,110 @@
+"""Persistent cache of compiled shared objects.
+
+Libraries are stored as `<key>.so`, where the key is a digest of everything
+that determines the compiler output: the generated sources, the compiler
+binary and version, the flags, the host (`-march=native` depends on it) and,
+for nonjittable sources, the ac_types headers they include.
+Hits refresh the file mtime, and inserts evict the least recently used
+libraries until the cache fits its size bound.
+
+The cache lives in `$ZOLOTONE_CPP_CACHE` (default `~/.cache/zolotone/cpp`);
+an empty value disables it. `$ZOLOTONE_CPP_CACHE_BYTES` bounds its size
+(default 1 GiB).
+"""
+import functools
+import hashlib
+import os
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "zolotone" / "cpp"
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_identity(compiler: str) -> str:
+    result = subprocess.run([compiler, "--version"], capture_output=True, text=True, check=False)
+    return "\n".join([os.path.realpath(compiler), result.stdout, platform.machine(), platform.node()])
+
+
+class SharedObjectCache:
+    def __init__(self, root: Path | str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            encoded = part.encode()
+            # Length prefixes keep ("ab", "c") and ("a", "bc") apart
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}.so"
+
+    def get(self, key: str) -> Path | None:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, library_path: Path) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Copy under a unique name and rename, concurrent builds of one key never see a partial file
+        fd, staging = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as staging_file:
+                staging_file.write(Path(library_path).read_bytes())
+            os.replace(staging, self.path(key))
+        except BaseException:
+            Path(staging).unlink(missing_ok=True)
+            raise
+        self.evict(keep=key)
+        return self.path(key)
+
+    def entries(self) -> list[tuple[Path, os.stat_result]]:
+        """Cached libraries, least recently used first."""
+        entries = []
+        for path in self.root.glob("*.so"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:  # Evicted by another process
+                continue
+        return sorted(entries, key=lambda entry: entry[1].st_mtime_ns)
+
+    def size(self) -> int:
+        return sum(stat.st_size for _, stat in self.entries())
+
+    def evict(self, keep: str | None = None) -> list[Path]:
+        entries = self.entries()
+        total = sum(stat.st_size for _, stat in entries)
+        evicted = []
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            if path.stem == keep:
+                continue
+            # Libraries already loaded stay mapped after unlink
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            evicted.append(path)
+        return evicted
+
+    def clear(self) -> None:
+        for path, _ in self.entries():
+            path.unlink(missing_ok=True)
+
+
+def default_cache() -> SharedObjectCache | None:
+    root = os.environ.get("ZOLOTONE_CPP_CACHE", str(DEFAULT_CACHE_DIR))
+    if not root:
+        return None
+    max_bytes = int(os.environ.get("ZOLOTONE_CPP_CACHE_BYTES", DEFAULT_MAX_BYTES))
+    return SharedObjectCache(root, max_bytes=max_bytes)
@@ -0,0 +1,168 @@
+"""Incremental parallel builds of designs lowered with `lower_to_cpp_units()`.
+
+A build directory keeps the sources and objects of the units of one design,
+and `manifest.json` records a digest of everything that went into each
+object: the compiler, the flags, the headers the unit includes and its
+source. A rebuild compiles only the units whose digest changed, in parallel
+compiler processes, and relinks. Function units are named after the
+fingerprints of their subtrees, so editing a large design recompiles the
+functions on the path from the edit to the root and little else.
+
+Every link writes a library named after its objects, since the dynamic
+loader would return the handle of an already loaded library of the same path.
+"""
+import ctypes
+import json
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from zolotone import CppUnit, CppUnits, Node, lower_to_cpp_units
+from zolotone.codegen.units import ENTRY_HEADER, PRELUDE_HEADER
+from infra.compile_cpp import (
+    _AC_TYPES_INCLUDE_DIR,
+    _DEFAULT_INCLUDES,
+    _batch_entry_wrapper,
+    _entry_wrapper,
+    _find_cpp_compiler,
+    _include_digest,
+)
+from infra.cpp_cache import SharedObjectCache, compiler_identity
+
+MANIFEST = "manifest.json"
+_UNIT_FLAGS = ("-std=c++17", "-fPIC", "-O3", "-march=native", f"-I{_AC_TYPES_INCLUDE_DIR}")
+
+
+def _write_if_changed(path: Path, text: str) -> None:
+    if not path.exists() or path.read_text(encoding="utf-8") != text:
+        path.write_text(text, encoding="utf-8")
+
+
+def _read_manifest(build_dir: Path) -> dict[str, str]:
+    try:
+        return json.loads((build_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _unit_key(compiler: str, units: CppUnits, unit: CppUnit) -> str:
+    # Only the entry points and the wrappers include ENTRY_HEADER
+    header = units.header if f'#include "{ENTRY_HEADER}"' in unit.source else ""
+    # The prelude of nonjittable units includes the ac_types headers
+    ac_types = (_include_digest(),) if "#include <ac_int.h>" in units.prelude else ()
+    return SharedObjectCache.key(
+        compiler_identity(compiler), *_UNIT_FLAGS, *ac_types, units.prelude, header, unit.source
+    )
+
+
+def _compile_unit(compiler: str, build_dir: Path, unit: CppUnit) -> None:
+    source_path = build_dir / f"{unit.name}.cpp"
+    source_path.write_text(unit.source, encoding="utf-8")
+    # Objects are replaced atomically, an interrupted build leaves the previous one
+    fd, staging = tempfile.mkstemp(dir=build_dir, suffix=".o.tmp")
+    os.close(fd)
+    command = [compiler, *_UNIT_FLAGS, "-c", str(source_path), "-o", staging]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        Path(staging).unlink(missing_ok=True)
+        raise AssertionError(
+            f"Failed to compile unit {unit.name}:\n"
+            f"stdout:\n{result.stdout}\n"
+            f"stderr:\n{result.stderr}"
+        )
+    os.replace(staging, build_dir / f"{unit.name}.o")
+
+
+def build_units(
+    units: CppUnits,
+    build_dir: Path | str,
+    max_workers: int | None = None,
+) -> tuple[Path, list[str]]:
+    """Brings the shared library of `units` in `build_dir` up to date.
+
+    Returns the library path and the names of the units that were recompiled.
+    """
+    compiler = _find_cpp_compiler()
+    build_dir = Path(build_dir)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    _write_if_changed(build_dir / PRELUDE_HEADER, units.prelude)
+    _write_if_changed(build_dir / ENTRY_HEADER, units.header)
+
+    manifest = _read_manifest(build_dir)
+    keys = {unit.name: _unit_key(compiler, units, unit) for unit in units.units}
+    stale = [
+        unit for unit in units.units
+        if manifest.get(unit.name) != keys[unit.name] or not (build_dir / f"{unit.name}.o").exists()
+    ]
+
+    stale_names = {unit.name for unit in stale}
+    built = {name: key for name, key in manifest.items() if name in keys and name not in stale_names}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {executor.submit(_compile_unit, compiler, build_dir, unit): unit for unit in stale}
+        for future, unit in futures.items():
+            try:
+                future.result()
+            except AssertionError as error:
+                errors.append(error)
+            else:
+                built[unit.name] = keys[unit.name]
+    # Compiled units stay recorded, so that fixing one unit does not rebuild the others
+    (build_dir / MANIFEST).write_text(json.dumps(built, indent=1, sort_keys=True), encoding="utf-8")
+    if errors:
+        raise errors[0]
+
+    for path in [*build_dir.glob("*.o"), *build_dir.glob("*.cpp")]:
+        if path.stem not in keys:
+            path.unlink(missing_ok=True)
+
+    library_name = f"lib_{SharedObjectCache.key(*(keys[name] for name in sorted(keys)))}.so"
+    library_path = build_dir / library_name
+    if not library_path.exists():
+        fd, staging = tempfile.mkstemp(dir=build_dir, suffix=".so.tmp")
+        os.close(fd)
+        objects = [str(build_dir / f"{name}.o") for name in sorted(keys)]
+        command = [compiler, "-shared", *objects, "-o", staging]
+        result = subprocess.run(command, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            Path(staging).unlink(missing_ok=True)
+            raise AssertionError(f"Failed to link units:\nstderr:\n{result.stderr}")
+        os.replace(staging, library_path)
+    # Libraries already loaded stay mapped after unlink
+    for path in build_dir.glob("lib_*.so"):
+        if path.name != library_name:
+            path.unlink(missing_ok=True)
+    return library_path, sorted(stale_names)
+
+
+def compile_units(
+    node: Node,
+    build_dir: Path | str,
+    jittable: bool = True,
+    optimize: bool = True,
+    batch: bool = False,
+    max_workers: int | None = None,
+) -> tuple[Callable, list[str]]:
+    """`compile_()`/`compile_batch_()` over an incremental build in `build_dir`.
+
+    Returns the bound function and the names of the recompiled units.
+    """
+    if not hasattr(node, "inner_args"):
+        raise TypeError("compile helpers expect a Primitive or Composite node")
+
+    units = lower_to_cpp_units(node, "lowered_entry", jittable=jittable, optimize=optimize, batch=batch)
+    if batch:
+        wrapper_lines, bind = _batch_entry_wrapper(node, "lowered_entry")
+    else:
+        wrapper_lines, bind = _entry_wrapper(node, "lowered_entry", jittable)
+    wrapper_source = "\n".join([*_DEFAULT_INCLUDES, "", *wrapper_lines, ""])
+    wrapper = CppUnit("wrapper", SharedObjectCache.key(wrapper_source), wrapper_source)
+    library_path, rebuilt = build_units(
+        CppUnits(prelude=units.prelude, header=units.header, units=(*units.units, wrapper)),
+        build_dir,
+        max_workers=max_workers,
+    )
+    return bind(ctypes.CDLL(str(library_path))), rebuilt
@@ -0,0 +1,232 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from zolotone import BFloat16, BFloat16T, Var, dumps_design, loads_design, ulp_distance
+from examples.conventional import Conventional
+from examples.optimized import Optimized
+
+DEFAULT_SEED = 0
+DEFAULT_N_POINTS = 1000
+# Points per shard; fixed so that the stimuli do not depend on the number of workers
+DEFAULT_SHARD_POINTS = 250
+MIN_SHARED_EXPONENT_BITS = 5
+
+# Per-process state: designs are elaborated once per worker, mismatches go through the queue
+_designs = None
+_mismatch_queue = None
+
+
+def dot_product_spec(a_0, a_1, a_2, a_3, b_0, b_1, b_2, b_3):
+    res = 0.0
+    res += a_0.evaluate().to_val() * b_0.evaluate().to_val()
+    res += a_1.evaluate().to_val() * b_1.evaluate().to_val()
+    res += a_2.evaluate().to_val() * b_2.evaluate().to_val()
+    res += a_3.evaluate().to_val() * b_3.evaluate().to_val()
+    return float(np.float32(res))
+
+
+def shard_seed(seed: int, shared_bits: int, shard: int) -> int:
+    return int(np.random.SeedSequence([seed, shared_bits, shard]).generate_state(1)[0])
+
+
+def make_shards(seed: int, n_points: int, shard_points: int = DEFAULT_SHARD_POINTS) -> list[dict]:
+    """Splits n_points per shared exponent width into shards with their own seeds."""
+    if shard_points <= 0:
+        raise ValueError(f"shard_points must be positive, got {shard_points}")
+    shards = []
+    for shared_bits in range(MIN_SHARED_EXPONENT_BITS, BFloat16.exponent_bits + 1):
+        for shard, start in enumerate(range(0, n_points, shard_points)):
+            shards.append({
+                "shared_exponent_bits": shared_bits,
+                "shard": shard,
+                "seed": shard_seed(seed, shared_bits, shard),
+                "num_points": min(shard_points, n_points - start),
+            })
+    return shards
+
+
+def _get_designs():
+    global _designs
+    if _designs is None:
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        _designs = (a, b, Conventional(*a, *b), Optimized(*a, *b))
+    return _designs
+
+
+def _init_worker(mismatch_queue, designs: bytes | None = None) -> None:
+    global _designs, _mismatch_queue
+    _mismatch_queue = mismatch_queue
+    # Forked workers inherit the elaborated designs, others load them instead of elaborating
+    if _designs is None and designs is not None:
+        (conventional, optimized), inputs = loads_design(designs)
+        _designs = (inputs[:4], inputs[4:], conventional, optimized)
+
+
+def run_shard(shard: dict, on_mismatch: Callable[[dict], None] | None = None) -> dict:
+    a, b, conventional, optimized = _get_designs()
+    if on_mismatch is None:
+        on_mismatch = _mismatch_queue.put
+
+    conventional_runtime_s = 0.0
+    optimized_runtime_s = 0.0
+    num_mismatches = 0
+    t_start = time.perf_counter()
+
+    random_gen, exp_reshuffle = BFloat16.random_generator(
+        seed=shard["seed"], shared_exponent_bits=shard["shared_exponent_bits"]
+    )
+    for _ in range(shard["num_points"]):
+        exp_reshuffle()
+        for i in range(4):
+            a[i].load_val(random_gen())
+            b[i].load_val(random_gen())
+
+        t0 = time.perf_counter()
+        con_res = conventional.evaluate().to_val()
+        conventional_runtime_s += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        opt_res = optimized.evaluate().to_val()
+        optimized_runtime_s += time.perf_counter() - t0
+
+        spec_res = dot_product_spec(*a, *b)
+        if ulp_distance(opt_res, con_res) != 0 or ulp_distance(opt_res, spec_res) != 0:
+            num_mismatches += 1
+            on_mismatch({
+                "shared_exponent_bits": shard["shared_exponent_bits"],
+                "shard": shard["shard"],
+                "inputs": [x.val.to_val() for x in a + b],
+                "optimized": opt_res,
+                "conventional": con_res,
+                "spec": spec_res,
+            })
+
+    return {
+        **shard,
+        "pid": os.getpid(),
+        "num_mismatches": num_mismatches,
+        "conventional_runtime_s": conventional_runtime_s,
+        "optimized_runtime_s": optimized_runtime_s,
+        "wall_time_s": time.perf_counter() - t_start,
+    }
+
+
+def _run_parallel(shards: list[dict], jobs: int, on_mismatch: Callable[[dict], None]) -> list[dict]:
+    ctx = mp.get_context()
+    mismatch_queue = ctx.Queue()
+    a, b, conventional, optimized = _get_designs()
+    designs = None
+    if ctx.get_start_method() != "fork":
+        designs = dumps_design([conventional, optimized], inputs=[*a, *b])
+    results = []
+    received = 0
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=ctx, initializer=_init_worker, initargs=(mismatch_queue, designs)
+    ) as pool:
+        pending = {pool.submit(run_shard, shard) for shard in shards}
+        while pending or received < sum(r["num_mismatches"] for r in results):
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            results.extend(future.result() for future in done)
+            while True:
+                try:
+                    mismatch = mismatch_queue.get(timeout=0.1 if not pending else 0)
+                except queue.Empty:
+                    break
+                received += 1
+                on_mismatch(mismatch)
+    return results
+
+
+def run_differential(
+    seed: int = DEFAULT_SEED,
+    n_points: int = DEFAULT_N_POINTS,
+    jobs: int = 1,
+    shard_points: int = DEFAULT_SHARD_POINTS,
+    on_mismatch: Callable[[dict], None] | None = None,
+) -> tuple[dict, list[dict]]:
+    """Compares Conventional, Optimized and the float spec on random points.
+
+    The stimulus space is sharded by shared exponent width and point range,
+    and every shard gets a seed derived from `seed`, so results do not depend
+    on `jobs`. Mismatches are passed to `on_mismatch` as soon as they arrive.
+    Returns the merged impl report and the list of mismatches.
+    """
+    mismatches = []
+
+    def collect(mismatch):
+        mismatches.append(mismatch)
+        if on_mismatch is not None:
+            on_mismatch(mismatch)
+
+    shards = make_shards(seed, n_points, shard_points)
+    t0 = time.perf_counter()
+    if jobs <= 1:
+        results = [run_shard(shard, collect) for shard in shards]
+    else:
+        results = _run_parallel(shards, jobs, collect)
+    wall_time_s = time.perf_counter() - t0
+
+    results.sort(key=lambda r: (r["shared_exponent_bits"], r["shard"]))
+    mismatches.sort(key=lambda m: (m["shared_exponent_bits"], m["shard"]))
+    total_points = sum(r["num_points"] for r in results)
+    conventional_runtime_s = sum(r["conventional_runtime_s"] for r in results)
+    optimized_runtime_s = sum(r["optimized_runtime_s"] for r in results)
+    report = {
+        "seed": seed,
+        "total_num_points": total_points,
+        "conventional_runtime_per_point": conventional_runtime_s / max(total_points, 1),
+        "optimized_runtime_per_point": optimized_runtime_s / max(total_points, 1),
+        "conventional_runtime_s_total": conventional_runtime_s,
+        "optimized_runtime_s_total": optimized_runtime_s,
+        "num_jobs": max(jobs, 1),
+        "wall_time_s": wall_time_s,
+        "num_mismatches": len(mismatches),
+        "shards": results,
+    }
+    return report, mismatches
+
+
+def format_mismatch(mismatch: dict) -> str:
+    return (
+        f"Mismatch at pt:\n{mismatch['inputs']}\n"
+        f"optimized impl={mismatch['optimized']}, conventional impl={mismatch['conventional']}, "
+        f"double-precision spec={mismatch['spec']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded differential test of the fused dot product designs")
+    parser.add_argument("-s", "--seed", help="Random seed", default=DEFAULT_SEED, type=int)
+    parser.add_argument("-pt", "--num-points", help="Number of points to run per shared exponent", default=DEFAULT_N_POINTS, type=int)
+    parser.add_argument("-j", "--jobs", help="Number of worker processes", default=os.cpu_count() or 1, type=int)
+    parser.add_argument("--shard-points", help="Number of points per shard", default=DEFAULT_SHARD_POINTS, type=int)
+    parser.add_argument("--json-report", help="Write the merged impl report to this JSON file", default=None)
+    args = parser.parse_args()
+
+    report, mismatches = run_differential(
+        seed=args.seed,
+        n_points=args.num_points,
+        jobs=args.jobs,
+        shard_points=args.shard_points,
+        on_mismatch=lambda m: print(format_mismatch(m), flush=True),
+    )
+
+    if args.json_report:
+        report_path = Path(args.json_report)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    print(f"{report['total_num_points']} points, {len(mismatches)} mismatches, "
+          f"{report['wall_time_s']:.2f} s on {report['num_jobs']} jobs")
+    sys.exit(1 if mismatches else 0)
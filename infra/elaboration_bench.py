@@ -0,0 +1,108 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from zolotone import BFloat16T, Float32T, Node, Var
+from zolotone.ast.nodes import composite, primitive
+from zolotone.sim import flatten
+from examples.FP32_IEEE_adder import FP32_IEEE_adder
+from examples.FP32_IEEE_mult import FP32_IEEE_mult
+from examples.conventional import Conventional
+from examples.optimized import Optimized
+
+DEFAULT_REPEATS = 5
+
+
+def _dot_product_inputs() -> list[Var]:
+    return [Var(name=f"{x}_{i}", sign=BFloat16T()) for x in "ab" for i in range(4)]
+
+
+def _fp32_inputs() -> list[Var]:
+    return [Var(name="x", sign=Float32T()), Var(name="y", sign=Float32T())]
+
+
+# name -> (design, input factory)
+DESIGNS: dict[str, tuple[Callable[..., Node], Callable[[], list[Var]]]] = {
+    "Conventional": (Conventional, _dot_product_inputs),
+    "Optimized": (Optimized, _dot_product_inputs),
+    "FP32_IEEE_adder": (FP32_IEEE_adder, _fp32_inputs),
+    "FP32_IEEE_mult": (FP32_IEEE_mult, _fp32_inputs),
+}
+
+
+def node_counts(root: Node) -> dict[str, int]:
+    """Counts distinct reachable nodes, Primitive/Composite instances and inlined Op/Const/Var nodes."""
+    visited: set[Node] = set()
+    stack = [root]
+    instances = 0
+    while stack:
+        node = stack.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        stack.extend(node.args)
+        if isinstance(node, (composite, primitive)):
+            instances += 1
+            stack.append(node.inner_tree)
+    return {
+        "nodes": len(visited),
+        "instances": instances,
+        "flat_nodes": len(flatten(root).nodes),
+    }
+
+
+def bench_design(name: str, repeats: int = DEFAULT_REPEATS) -> dict:
+    """Elaborates a design `repeats` times on fresh inputs and reports times and node counts."""
+    if repeats <= 0:
+        raise ValueError(f"repeats must be positive, got {repeats}")
+    design, make_inputs = DESIGNS[name]
+    times_s = []
+    root = None
+    for _ in range(repeats):
+        inputs = make_inputs()
+        t0 = time.perf_counter()
+        root = design(*inputs)
+        times_s.append(time.perf_counter() - t0)
+    return {
+        "design": name,
+        "repeats": repeats,
+        "min_s": min(times_s),
+        "mean_s": statistics.fmean(times_s),
+        **node_counts(root),
+    }
+
+
+def run_bench(names: list[str] | None = None, repeats: int = DEFAULT_REPEATS) -> list[dict]:
+    return [bench_design(name, repeats) for name in (names or DESIGNS)]
+
+
+def format_table(rows: list[dict]) -> str:
+    width = max(len("design"), *(len(row["design"]) for row in rows))
+    lines = [f"{'design':<{width}}  {'min ms':>8}  {'mean ms':>8}  {'nodes':>7}  {'instances':>9}  {'flat':>7}"]
+    for row in rows:
+        lines.append(
+            f"{row['design']:<{width}}  {1e3 * row['min_s']:>8.1f}  {1e3 * row['mean_s']:>8.1f}"
+            f"  {row['nodes']:>7}  {row['instances']:>9}  {row['flat_nodes']:>7}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elaboration time and node counts of the example designs")
+    parser.add_argument("designs", nargs="*", help=f"Designs to elaborate, any of {', '.join(DESIGNS)} (default: all)")
+    parser.add_argument("-r", "--repeats", help="Elaborations per design", default=DEFAULT_REPEATS, type=int)
+    parser.add_argument("--json-report", help="Write the results to this JSON file", default=None)
+    args = parser.parse_args()
+    unknown = [name for name in args.designs if name not in DESIGNS]
+    if unknown:
+        parser.error(f"unknown designs: {', '.join(unknown)}")
+
+    rows = run_bench(args.designs, args.repeats)
+    if args.json_report:
+        report_path = Path(args.json_report)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(rows, indent=2) + "\n", encoding="utf-8")
+    print(format_table(rows))
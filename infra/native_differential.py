@@ -0,0 +1,176 @@
+import argparse
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+from zolotone import (
+    Composite,
+    FP32_ADD,
+    FP32_MUL,
+    Float32T,
+    NativeReference,
+    Node,
+    UQT,
+    Var,
+    lower_differential_harness,
+    lower_exhaustive_harness,
+    uq_max,
+)
+from examples.FP32_IEEE_adder import FP32_IEEE_adder
+from examples.FP32_IEEE_mult import FP32_IEEE_mult
+from examples.max_exponent import OPTIMIZED_MAX_EXP4, max_exp4_spec
+from infra.compile_cpp import _find_cpp_compiler
+
+DEFAULT_SEED = 0
+DEFAULT_N_POINTS = 10_000_000
+
+# Design factory over fresh input Vars, and its native reference
+DESIGNS = {
+    "FP32_IEEE_adder": (lambda: FP32_IEEE_adder(Var("x", sign=Float32T()), Var("y", sign=Float32T())), FP32_ADD),
+    "FP32_IEEE_mult": (lambda: FP32_IEEE_mult(Var("x", sign=Float32T()), Var("y", sign=Float32T())), FP32_MUL),
+}
+
+
+@Composite(name="max_exp4_reference", spec=max_exp4_spec)
+def max_exp4_reference(e0: Node, e1: Node, e2: Node, e3: Node) -> Node:
+    return uq_max(uq_max(e0, e1), uq_max(e2, e3))
+
+
+def _max_exp4_pair(exp_bits: int = 8) -> tuple[Node, Node]:
+    inputs = [Var(f"e_{i}", sign=UQT(exp_bits, 0)) for i in range(4)]
+    return OPTIMIZED_MAX_EXP4(*inputs), max_exp4_reference(*inputs)
+
+
+# Small designs whose whole input space is enumerated, with a reference design over the same inputs
+EXHAUSTIVE_DESIGNS: dict[str, Callable[[], tuple[Node, Node | NativeReference]]] = {
+    "OPTIMIZED_MAX_EXP4": _max_exp4_pair,
+}
+
+
+def _compile_program(source: str):
+    tempdir = tempfile.TemporaryDirectory()
+    source_path = Path(tempdir.name) / "harness.cpp"
+    executable = Path(tempdir.name) / "harness"
+    source_path.write_text(source, encoding="utf-8")
+    command = [
+        _find_cpp_compiler(), "-std=c++17", "-O3", "-march=native", "-pthread",
+        str(source_path), "-o", str(executable),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        tempdir.cleanup()
+        raise AssertionError(f"Failed to compile differential harness:\nstderr:\n{result.stderr}")
+    return tempdir, executable
+
+
+def build_harness(design: Node, reference: NativeReference, optimize: bool = True):
+    """Compiles the generated random driver; returns the temporary directory and the executable path."""
+    return _compile_program(lower_differential_harness(design, reference, optimize=optimize))
+
+
+def run_exhaustive(
+    design: Node,
+    reference: Node | NativeReference,
+    threads: int = 0,
+    progress_seconds: float = 0.0,
+    on_progress: Callable[[dict], None] | None = None,
+    optimize: bool = True,
+) -> dict:
+    """Checks the design against the reference on every input; returns the final verdict line.
+
+    threads=0 uses all cores; progress lines are passed to `on_progress` as they arrive.
+    """
+    tempdir, executable = _compile_program(lower_exhaustive_harness(design, reference, optimize=optimize))
+    try:
+        process = subprocess.Popen(
+            [str(executable), str(threads), str(progress_seconds)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        verdict = None
+        for line in process.stdout:
+            record = json.loads(line)
+            if "progress" in record:
+                if on_progress is not None:
+                    on_progress(record["progress"])
+            else:
+                verdict = record
+        stderr = process.stderr.read()
+        returncode = process.wait()
+    finally:
+        tempdir.cleanup()
+    if returncode not in (0, 1) or verdict is None:
+        raise RuntimeError(f"Exhaustive harness failed with status {returncode}:\n{stderr}")
+    return verdict
+
+
+def run_harness(executable: Path, seed: int = DEFAULT_SEED, n_points: int = DEFAULT_N_POINTS, max_reports: int = 10) -> dict:
+    """Runs a built driver; returns its summary with the reported mismatches under "mismatch_reports"."""
+    result = subprocess.run(
+        [str(executable), str(seed), str(n_points), str(max_reports)],
+        capture_output=True, text=True, check=False,
+    )
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    if result.returncode not in (0, 1) or not lines or "points" not in lines[-1]:
+        raise RuntimeError(f"Differential harness failed with status {result.returncode}:\n{result.stderr}")
+    return {**lines[-1], "mismatch_reports": [line["mismatch"] for line in lines[:-1]]}
+
+
+def run_native_differential(
+    design: Node,
+    reference: NativeReference,
+    seed: int = DEFAULT_SEED,
+    n_points: int = DEFAULT_N_POINTS,
+    max_reports: int = 10,
+    optimize: bool = True,
+) -> dict:
+    tempdir, executable = build_harness(design, reference, optimize=optimize)
+    try:
+        return run_harness(executable, seed=seed, n_points=n_points, max_reports=max_reports)
+    finally:
+        tempdir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Native random differential testing of the FP32 designs against IEEE float ops")
+    parser.add_argument("designs", nargs="*", help=f"Designs to test, any of {', '.join(DESIGNS)} (default: all)")
+    parser.add_argument("--seed", help="Seed of the stimuli", default=DEFAULT_SEED, type=int)
+    parser.add_argument("--points", help="Number of random points per design", default=DEFAULT_N_POINTS, type=int)
+    parser.add_argument("--max-reports", help="Mismatches to print per design", default=10, type=int)
+    parser.add_argument("--no-optimize", help="Lower the design without graph passes", action="store_true")
+    parser.add_argument(
+        "--exhaustive",
+        help=f"Enumerate all inputs of small designs instead, any of {', '.join(EXHAUSTIVE_DESIGNS)}",
+        action="store_true",
+    )
+    parser.add_argument("--threads", help="Worker threads of --exhaustive (default: all cores)", default=0, type=int)
+    parser.add_argument("--progress", help="Seconds between --exhaustive progress lines", default=5.0, type=float)
+    args = parser.parse_args()
+    catalog = EXHAUSTIVE_DESIGNS if args.exhaustive else DESIGNS
+    unknown = [name for name in args.designs if name not in catalog]
+    if unknown:
+        parser.error(f"unknown designs: {', '.join(unknown)}")
+
+    failed = False
+    if args.exhaustive:
+        for name in args.designs or catalog:
+            design, reference = EXHAUSTIVE_DESIGNS[name]()
+            verdict = run_exhaustive(
+                design, reference,
+                threads=args.threads, progress_seconds=args.progress, optimize=not args.no_optimize,
+                on_progress=lambda progress, name=name: print(json.dumps({"design": name, **progress}), flush=True),
+            )
+            print(json.dumps({"design": name, **verdict}))
+            failed = failed or verdict["verdict"] != "proved"
+        raise SystemExit(1 if failed else 0)
+
+    for name in args.designs or catalog:
+        make_design, reference = DESIGNS[name]
+        report = run_native_differential(
+            make_design(), reference,
+            seed=args.seed, n_points=args.points, max_reports=args.max_reports, optimize=not args.no_optimize,
+        )
+        print(json.dumps({"design": name, **report}))
+        failed = failed or report["mismatches"] > 0
+    raise SystemExit(1 if failed else 0)
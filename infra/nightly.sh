@@ -1,6 +1,6 @@
 #!/bin/bash
 
-# bash infra/nightly.sh [-output-dir DIR] [-seed N] [-num-points N]
+# bash infra/nightly.sh [-output-dir DIR] [-seed N] [-num-points N] [-jobs N]
 
 # exit immediately upon first error, log every command executed
 set -e -x
@@ -9,6 +9,7 @@ PYTHON="${PYTHON:-python3}"
 N_POINTS="${N_POINTS:-1000}"
 REPORTS_DIR="${REPORTS_DIR:-reports}"
 SEED="${SEED:-0}"
+JOBS="${JOBS:-$(nproc)}"
 
 while [[ $# -gt 0 ]]; do
     case "$1" in
@@ -24,6 +25,10 @@ while [[ $# -gt 0 ]]; do
             N_POINTS="$2"
             shift 2
             ;;
+        --jobs)
+            JOBS="$2"
+            shift 2
+            ;;
         -*)
             echo "Unknown option: $1" >&2
             usage >&2
@@ -38,5 +43,5 @@ REPORT_PATH="${REPORTS_DIR}/report.json"
 mkdir -p "$REPORTS_DIR"
 rm -f "$REPORT_PATH"
 
-"$PYTHON" -m infra.unittests --seed "$SEED" --num-points "$N_POINTS" --json-report "$REPORT_PATH"
+"$PYTHON" -m infra.unittests --seed "$SEED" --num-points "$N_POINTS" --jobs "$JOBS" --json-report "$REPORT_PATH"
 echo "Nightly report written to: $REPORT_PATH"
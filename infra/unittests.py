@@ -17,19 +17,9 @@ from examples.FP32_IEEE_adder import FP32_IEEE_adder
 from examples.FP32_IEEE_mult import FP32_IEEE_mult
 from examples.max_exponent import OPTIMIZED_MAX_EXP4
 
-from infra.compile_cpp import jit_compile, nonjit_compile
+from infra.compile_cpp import CompilePool, ext_compile, jit_compile, nonjit_compile
+from infra.differential import DEFAULT_N_POINTS, DEFAULT_SEED, dot_product_spec, format_mismatch, run_differential
 
-DEFAULT_SEED = 0
-DEFAULT_N_POINTS = 1000
-
-
-def dot_product_spec(a_0, a_1, a_2, a_3, b_0, b_1, b_2, b_3):
-        res = 0.0
-        res += a_0.evaluate().to_val() * b_0.evaluate().to_val()
-        res += a_1.evaluate().to_val() * b_1.evaluate().to_val()
-        res += a_2.evaluate().to_val() * b_2.evaluate().to_val()
-        res += a_3.evaluate().to_val() * b_3.evaluate().to_val()
-        return float(np.float32(res))
 
 def run_spec_with_metrics(design: Node):
     return design.check_spec()
@@ -76,6 +66,7 @@ def merge_spec_reports(reports: list[dict]):
 class TestFusedDotProduct(unittest.TestCase):
     SEED = DEFAULT_SEED
     N_POINTS = DEFAULT_N_POINTS
+    JOBS = 1
     SPEC_REPORT = None
     IMPL_REPORT = None
     
@@ -126,67 +117,15 @@ class TestFusedDotProduct(unittest.TestCase):
         self.assertTrue(overall_report["proved"], pformat(overall_report))
     
     def test_designs_difference_with_fp_spec(self):
-        SEED = self.SEED
-        N_POINTS = self.N_POINTS
-        TOTAL_POINTS = 0
-        conventional_runtime_s = 0.0
-        optimized_runtime_s = 0.0
-        
-        # Compile designs
-        a = [
-            Var(name="a_0", sign=BFloat16T()),
-            Var(name="a_1", sign=BFloat16T()),
-            Var(name="a_2", sign=BFloat16T()),
-            Var(name="a_3", sign=BFloat16T()),
-        ]
-        
-        b = [
-            Var(name="b_0", sign=BFloat16T()),
-            Var(name="b_1", sign=BFloat16T()),
-            Var(name="b_2", sign=BFloat16T()),
-            Var(name="b_3", sign=BFloat16T()),
-        ]
-        
-        conventional = Conventional(*a, *b)
-        optimized = Optimized(*a, *b)
-        
-        N = 4
-        
-        for shared_bits in range(5, BFloat16.exponent_bits+1):
-            TOTAL_POINTS += N_POINTS
-            
-            random_gen, exp_reshuffle = BFloat16.random_generator(seed=SEED, shared_exponent_bits=shared_bits)
-            
-            for _ in range(N_POINTS):
-                exp_reshuffle()
-                for i in range(N):
-                    a[i].load_val(random_gen())
-                    b[i].load_val(random_gen())
-                
-                t0 = time.perf_counter()
-                con_res = conventional.evaluate().to_val()
-                conventional_runtime_s += time.perf_counter() - t0
-
-                t0 = time.perf_counter()
-                opt_res = optimized.evaluate().to_val()
-                optimized_runtime_s += time.perf_counter() - t0
-
-                spec_res = dot_product_spec(*a, *b)
-                msg = (
-                    f"Mismatch at pt:\nf{[x.val.to_val() for x in a + b]}",
-                    f"optimized impl={opt_res}, conventional impl={con_res}, double-precision spec={spec_res}"
-                )
-                if ulp_distance(opt_res, con_res) != 0 or ulp_distance(opt_res, spec_res) != 0:
-                    self.fail(str(msg))
-                    
-        TestFusedDotProduct.IMPL_REPORT = {
-            "seed": SEED,
-            "total_num_points": TOTAL_POINTS,
-            "conventional_runtime_per_point": conventional_runtime_s/TOTAL_POINTS,
-            "optimized_runtime_per_point": optimized_runtime_s/TOTAL_POINTS,
-            "conventional_runtime_s_total": conventional_runtime_s,
-            "optimized_runtime_s_total": optimized_runtime_s,
-        }
+        impl_report, mismatches = run_differential(
+            seed=self.SEED,
+            n_points=self.N_POINTS,
+            jobs=self.JOBS,
+            on_mismatch=lambda mismatch: print(format_mismatch(mismatch), flush=True),
+        )
+        TestFusedDotProduct.IMPL_REPORT = impl_report
+        if mismatches:
+            self.fail(f"{len(mismatches)} mismatches, first one:\n{format_mismatch(mismatches[0])}")
 
         pprint(TestFusedDotProduct.IMPL_REPORT)
 
@@ -195,13 +134,21 @@ class TestFusedDotProduct(unittest.TestCase):
         y = Var(name="y", sign=Float32T())
         design = FP32_IEEE_mult(x, y)
         
-        tempdir_jit, fn_jit = jit_compile(design)
-        tempdir_no_jit, fn_no_jit = nonjit_compile(design)
+        with CompilePool() as pool:
+            jit = pool.submit(design)
+            no_jit = pool.submit(design, jittable=False)
+            batch = pool.submit(design, batch=True)
+        tempdir_jit, fn_jit = jit.result()
+        tempdir_no_jit, fn_no_jit = no_jit.result()
+        tempdir_batch, fn_batch = batch.result()
+        tempdir_ext, fn_ext = ext_compile(design)
         
         try:
             jit_runtime = 0.0
+            ext_runtime = 0.0
             no_jit_runtime = 0.0
             reference_runtime = 0.0
+            points = []
             
             rnd = random.Random(self.SEED)
             for _ in range(self.N_POINTS):
@@ -214,6 +161,12 @@ class TestFusedDotProduct(unittest.TestCase):
                 jit_bits = fn_jit(x_bits, y_bits)
                 jit_runtime += time.perf_counter() - t0
                 jit_fp32 = float(np.float32(Float32(jit_bits).to_val()))
+                points.append((x_bits, y_bits, jit_bits))
+
+                t0 = time.perf_counter()
+                ext_bits = fn_ext(x_bits, y_bits)
+                ext_runtime += time.perf_counter() - t0
+                self.assertEqual(ext_bits, jit_bits)
                 
                 t0 = time.perf_counter()
                 no_jit_bits = fn_no_jit(x_bits, y_bits)
@@ -228,14 +181,25 @@ class TestFusedDotProduct(unittest.TestCase):
                 with self.subTest(lhs=x_fp, rhs=y_fp):
                     self.assertEqual(ulp_distance(reference_fp32, jit_fp32), 0, msg=f"{reference_fp32} != {jit_fp32}")
                     self.assertEqual(ulp_distance(jit_fp32, no_jit_fp32), 0, msg=f"{jit_fp32} != {no_jit_fp32}")
+            
+            # One native call over contiguous arrays instead of one ctypes call per point
+            xs, ys, jit_out = (np.array(column, dtype=np.uint32) for column in zip(*points))
+            t0 = time.perf_counter()
+            batch_out = fn_batch(xs, ys)
+            batch_runtime = time.perf_counter() - t0
+            np.testing.assert_array_equal(batch_out, jit_out)
                 
             print(
                 "cpp_lowering_performance_mult:",
                 {
                     "jit_total": jit_runtime,
+                    "jit_batch_total": batch_runtime,
+                    "ext_total": ext_runtime,
                     "no_jit_total": no_jit_runtime,
                     "reference_total": reference_runtime,
                     "jit_per_point": jit_runtime / self.N_POINTS,
+                    "jit_batch_per_point": batch_runtime / self.N_POINTS,
+                    "ext_per_point": ext_runtime / self.N_POINTS,
                     "no_jit_per_point": no_jit_runtime / self.N_POINTS,
                     "reference_per_point": reference_runtime / self.N_POINTS,
                 },
@@ -243,6 +207,8 @@ class TestFusedDotProduct(unittest.TestCase):
         finally:
             tempdir_jit.cleanup()
             tempdir_no_jit.cleanup()
+            tempdir_batch.cleanup()
+            tempdir_ext.cleanup()
 
 
     def test_cpp_lowering_performance_adder(self):
@@ -250,13 +216,21 @@ class TestFusedDotProduct(unittest.TestCase):
         y = Var(name="y", sign=Float32T())
         design = FP32_IEEE_adder(x, y)
         
-        tempdir_jit, fn_jit = jit_compile(design)
-        tempdir_no_jit, fn_no_jit = nonjit_compile(design)
+        with CompilePool() as pool:
+            jit = pool.submit(design)
+            no_jit = pool.submit(design, jittable=False)
+            batch = pool.submit(design, batch=True)
+        tempdir_jit, fn_jit = jit.result()
+        tempdir_no_jit, fn_no_jit = no_jit.result()
+        tempdir_batch, fn_batch = batch.result()
+        tempdir_ext, fn_ext = ext_compile(design)
         
         try:
             jit_runtime = 0.0
+            ext_runtime = 0.0
             no_jit_runtime = 0.0
             reference_runtime = 0.0
+            points = []
             
             rnd = random.Random(self.SEED)
             for _ in range(self.N_POINTS):
@@ -269,6 +243,12 @@ class TestFusedDotProduct(unittest.TestCase):
                 jit_bits = fn_jit(x_bits, y_bits)
                 jit_runtime += time.perf_counter() - t0
                 jit_fp32 = float(np.float32(Float32(jit_bits).to_val()))
+                points.append((x_bits, y_bits, jit_bits))
+
+                t0 = time.perf_counter()
+                ext_bits = fn_ext(x_bits, y_bits)
+                ext_runtime += time.perf_counter() - t0
+                self.assertEqual(ext_bits, jit_bits)
                 
                 t0 = time.perf_counter()
                 no_jit_bits = fn_no_jit(x_bits, y_bits)
@@ -283,14 +263,25 @@ class TestFusedDotProduct(unittest.TestCase):
                 with self.subTest(lhs=x_fp, rhs=y_fp):
                     self.assertEqual(ulp_distance(reference_fp32, jit_fp32), 0, msg=f"{reference_fp32} != {jit_fp32}")
                     self.assertEqual(ulp_distance(jit_fp32, no_jit_fp32), 0, msg=f"{jit_fp32} != {no_jit_fp32}")
+            
+            # One native call over contiguous arrays instead of one ctypes call per point
+            xs, ys, jit_out = (np.array(column, dtype=np.uint32) for column in zip(*points))
+            t0 = time.perf_counter()
+            batch_out = fn_batch(xs, ys)
+            batch_runtime = time.perf_counter() - t0
+            np.testing.assert_array_equal(batch_out, jit_out)
                 
             print(
                 "cpp_lowering_performance_adder:",
                 {
                     "jit_total": jit_runtime,
+                    "jit_batch_total": batch_runtime,
+                    "ext_total": ext_runtime,
                     "no_jit_total": no_jit_runtime,
                     "reference_total": reference_runtime,
                     "jit_per_point": jit_runtime / self.N_POINTS,
+                    "jit_batch_per_point": batch_runtime / self.N_POINTS,
+                    "ext_per_point": ext_runtime / self.N_POINTS,
                     "no_jit_per_point": no_jit_runtime / self.N_POINTS,
                     "reference_per_point": reference_runtime / self.N_POINTS,
                 },
@@ -298,6 +289,8 @@ class TestFusedDotProduct(unittest.TestCase):
         finally:
             tempdir_jit.cleanup()
             tempdir_no_jit.cleanup()
+            tempdir_batch.cleanup()
+            tempdir_ext.cleanup()
         
     def test_cpp_lowering_via_jit_adder(self):
         x = Var(name="x", sign=Float32T())
@@ -589,12 +582,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Unittests for fused dot product desings")
     parser.add_argument("-s", "--seed", help="Random seed", default=DEFAULT_SEED, type=int)
     parser.add_argument("-pt", "--num-points", help=f"Number of points to run per shared exponent", default=DEFAULT_N_POINTS, type=int)
+    parser.add_argument("-j", "--jobs", help="Number of worker processes for the differential test", default=1, type=int)
     parser.add_argument("--json-report", help="Write unittest summary report to this JSON file", default=None)
     
     args, unittest_args = parser.parse_known_args()
 
     TestFusedDotProduct.SEED = args.seed
     TestFusedDotProduct.N_POINTS = args.num_points
+    TestFusedDotProduct.JOBS = args.jobs
     TestFusedDotProduct.rnd = random.Random(args.seed)
     
     program = unittest.main(argv=[__file__, *unittest_args], exit=False)
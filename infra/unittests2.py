@@ -1,19 +1,28 @@
 import unittest
 import contextlib
+import inspect
+import json
 import os
 import pickle
+import random
 import sys
+import tempfile
 import time
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import dreal
 import math
+import numpy as np
 import z3
 from egglog import EGraph
 
 from zolotone import *
-from zolotone.ast import nodes as ast_nodes
+from zolotone.ast import nodes as ast_nodes, serialize
+from zolotone.components import basics
 from zolotone.egglog.rules import load_rules
+from zolotone.sim import flatten, limbs_to_ints
+from zolotone.sim.passes import remove_dead_nodes
 from zolotone.smt import dreal_check_eq, z3_check_eq
 from zolotone.solver import engine as solver_engine
 from zolotone.solver.report import build_proof_report
@@ -33,8 +42,12 @@ from examples.FP32_IEEE_mult import FP32_IEEE_mult
 from examples.common import xor_spec
 from examples.conventional import Conventional
 from examples.optimized import Optimized
+from examples.max_exponent import OPTIMIZED_MAX_EXP4, max_exp4_spec
 
-from infra.compile_cpp import jit_compile, nonjit_compile
+from infra.compile_cpp import jit_compile, jit_compile_batch, nonjit_compile
+from infra import compile_cpp, cpp_units, differential, elaboration_bench, native_differential
+from infra.cpp_cache import SharedObjectCache
+from infra.cpp_units import compile_units
 
 
 def _flat_trace_tool(ctx, timeout_ms):
@@ -75,9 +88,9 @@ def _large_report_tool(ctx, timeout_ms):
 
 class TestConstantFolding(unittest.TestCase):
     def assert_folded_value(self, node, runtime_type, expected_val):
-        self.assertIsNotNone(node.node_type.runtime_val)
-        self.assertIsInstance(node.node_type.runtime_val, runtime_type)
-        self.assertEqual(node.node_type.runtime_val.val, expected_val)
+        self.assertIsNotNone(node.runtime_val)
+        self.assertIsInstance(node.runtime_val, runtime_type)
+        self.assertEqual(node.runtime_val.val, expected_val)
 
         evaluated = node.evaluate()
         self.assertIsInstance(evaluated, runtime_type)
@@ -281,11 +294,11 @@ class TestConstantFolding(unittest.TestCase):
             out=Const(UQ(0, 3, 0)),
         )
 
-        self.assertIsNone(node.node_type.runtime_val)
+        self.assertIsNone(node.runtime_val)
 
         x.load_val(UQ(6, 3, 0))
         self.assertEqual(node.evaluate().val, 7)
-        self.assertIsNone(node.node_type.runtime_val)
+        self.assertIsNone(node.runtime_val)
 
     def test_uq_rshift_jam_sets_sticky_when_shifted_out_bits_are_nonzero(self):
         cases = [
@@ -330,21 +343,16 @@ class TestFingerprint(unittest.TestCase):
         self.assertEqual(lhs._fingerprint(), rhs._fingerprint())
         self.assertNotEqual(lhs._fingerprint(), different._fingerprint())
 
-    def test_static_type_fingerprint_includes_runtime_val(self):
-        plain = UQT(3, 0)
-        same = UQT(3, 0)
-        self.assertEqual(plain._fingerprint(), same._fingerprint())
+    def test_static_type_fingerprint_depends_on_shape_only(self):
+        self.assertEqual(UQT(3, 0)._fingerprint(), UQT(3, 0)._fingerprint())
+        self.assertNotEqual(UQT(3, 0)._fingerprint(), UQT(3, 1)._fingerprint())
+        self.assertNotEqual(UQT(3, 0)._fingerprint(), QT(3, 0)._fingerprint())
 
-        with_runtime = UQT(3, 0)
-        with_runtime.runtime_val = UQ(1, 3, 0)
-        same_runtime = UQT(3, 0)
-        same_runtime.runtime_val = UQ(1, 3, 0)
-        different_runtime = UQT(3, 0)
-        different_runtime.runtime_val = UQ(2, 3, 0)
-
-        self.assertEqual(with_runtime._fingerprint(), same_runtime._fingerprint())
-        self.assertNotEqual(plain._fingerprint(), with_runtime._fingerprint())
-        self.assertNotEqual(with_runtime._fingerprint(), different_runtime._fingerprint())
+        # Folded values are part of the node, not of its type
+        folded = Const(UQ(1, 3, 0))
+        self.assertIs(folded.node_type, UQT(3, 0))
+        self.assertEqual(folded.runtime_val, UQ(1, 3, 0))
+        self.assertNotEqual(folded._fingerprint(), Const(UQ(2, 3, 0))._fingerprint())
 
     def test_equivalent_graphs_have_equal_fingerprints(self):
         x1 = Var("x", sign=UQT(3, 0))
@@ -387,6 +395,1351 @@ class TestFingerprint(unittest.TestCase):
         after = node._fingerprint()
         self.assertEqual(before, after)
 
+    def test_node_fingerprints_are_fixed_size_digests(self):
+        x = Var("x", sign=UQT(3, 0))
+        y = Var("y", sign=UQT(3, 0))
+        node = x
+        for _ in range(50):
+            node = basic_add(node, y, Const(UQ(0, 3, 0)))
+
+        for fingerprint in (x._fingerprint(), node._fingerprint(), node._fingerprint(jittable=True)):
+            self.assertIsInstance(fingerprint, bytes)
+            self.assertEqual(len(fingerprint), 16)
+        self.assertIs(node._fingerprint(), node._fingerprint())
+
+
+class TestRuntimeTypeLayout(unittest.TestCase):
+    def test_runtime_values_are_slotted(self):
+        for value in (UQ(3, 3, 0), Q(3, 3, 1), Bool(1), Float32(7), BFloat16(7), Tuple(Bool(0), UQ(1, 1, 0))):
+            with self.subTest(value=value):
+                self.assertFalse(hasattr(value, "__dict__"))
+                self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+
+    def test_static_types_are_shared_per_shape(self):
+        self.assertIs(UQ(3, 3, 0).static_type(), UQ(5, 3, 0).static_type())
+        self.assertIsNot(UQ(3, 3, 0).static_type(), UQ(3, 3, 1).static_type())
+        self.assertIs(Float32(0).static_type(), Float32(1).static_type())
+        self.assertIs(
+            Tuple(UQ(1, 3, 0), Bool(0)).static_type(),
+            Tuple(UQ(2, 3, 0), Bool(1)).static_type(),
+        )
+        self.assertEqual(Tuple(UQ(1, 3, 0), Bool(0)).static_type(), TupleT(UQT(3, 0), BoolT()))
+
+
+class TestStaticTypeInterning(unittest.TestCase):
+    def test_equal_types_are_identical(self):
+        self.assertIs(UQT(3, 2), UQT(3, 2))
+        self.assertIs(TupleT(QT(2, 1), BoolT()), TupleT(QT(2, 1), BoolT()))
+        self.assertIs(Float32T(), Float32T())
+        self.assertIsNot(UQT(3, 2), QT(3, 2))
+        self.assertNotEqual(UQT(3, 2), UQT(2, 3))
+        self.assertEqual(len({UQT(3, 2), UQT(3, 2), UQT(2, 3)}), 2)
+
+    def test_types_are_immutable_and_survive_pickling(self):
+        type_ = UQT(3, 2)
+        with self.assertRaises(AttributeError):
+            type_.int_bits = 4
+        self.assertIs(type_.copy(), type_)
+        self.assertIs(pickle.loads(pickle.dumps(TupleT(type_, BoolT()))), TupleT(type_, BoolT()))
+
+    def test_nodes_share_interned_types(self):
+        x = Var("x", sign=UQT(3, 0))
+        y = Var("y", sign=UQT(3, 0))
+        node = basic_add(x, y, Const(UQ(0, 4, 0)))
+
+        self.assertIs(node.args_types[0], x.node_type)
+        self.assertIs(node.node_type, UQT(4, 0))
+        self.assertIsNone(node.runtime_val)
+
+    def test_invalid_shapes_are_still_rejected(self):
+        with self.assertRaises(ValueError):
+            UQT(0, 0)
+        with self.assertRaises(TypeError):
+            TupleT(3)
+
+
+class TestHashConsing(unittest.TestCase):
+    def test_identical_ops_and_consts_are_shared_during_elaboration(self):
+        built = []
+
+        @Primitive(name="twice_and", spec=lambda x, y, ctx: x)
+        def twice_and(x: Node, y: Node) -> Node:
+            first = basics.basic_and(x, y, Const(UQ(0, 4, 0)))
+            second = basics.basic_and(x, y, Const(UQ(0, 4, 0)))
+            low = basics.basic_select(x, 1, 0, Const(UQ(0, 2, 0)))
+            high = basics.basic_select(x, 3, 2, Const(UQ(0, 2, 0)))
+            built.extend([first, second, low, high])
+            return basics.basic_xor(first, second, Const(UQ(0, 4, 0)))
+
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        design = twice_and(x, y)
+        first, second, low, high = built
+        self.assertIs(first, second)
+        self.assertIs(first.args[2], design.inner_tree.args[2])
+        self.assertIsNot(low, high)
+        self.assertIs(low.args[1], high.args[1])
+
+        x.load_val(UQ(12, 4, 0))
+        y.load_val(UQ(10, 4, 0))
+        self.assertEqual(design.evaluate(), UQ(0, 4, 0))
+
+    def test_ops_with_different_closures_stay_distinct(self):
+        def sign(x: UQT) -> UQT:
+            return UQT(4, 0)
+
+        def shift_right(x: Node, amount: int) -> Op:
+            def impl(x: UQ) -> UQ:
+                return UQ(x.val >> amount, 4, 0)
+
+            return Op(
+                impl=impl,
+                sign=sign,
+                args=[x],
+                name="shift_right",
+                c_lowering=lambda args, jittable: f"({args[0]} >> {amount})",
+            )
+
+        @Primitive(name="two_shifts", spec=lambda x, ctx: x)
+        def two_shifts(x: Node) -> Node:
+            return basics.basic_xor(shift_right(x, 1), shift_right(x, 2), Const(UQ(0, 4, 0)))
+
+        x = Var("x", sign=UQT(4, 0))
+        identity = Mock(wraps=ast_nodes._op_identity)
+        with patch.object(ast_nodes, "_op_identity", identity):
+            design = two_shifts(x)
+            elaborated = identity.call_count
+            self.assertEqual(design.compile_plan()(0b1100), 0b0101)
+        # CSE reuses the identities computed for hash-consing
+        self.assertEqual(identity.call_count, elaborated)
+        first, second = design.inner_tree.args[:2]
+        self.assertIsNot(first, second)
+        self.assertIsNot(shift_right(x, 1), shift_right(x, 1))
+
+        x.load_val(UQ(0b1100, 4, 0))
+        self.assertEqual(design.evaluate(), UQ(0b0101, 4, 0))
+
+    def test_top_level_nodes_stay_distinct(self):
+        x = Var("x", sign=UQT(4, 0))
+        self.assertIsNot(Const(UQ(1, 4, 0)), Const(UQ(1, 4, 0)))
+        self.assertIsNot(
+            basics.basic_invert(x, Const(UQ(0, 4, 0))),
+            basics.basic_invert(x, Const(UQ(0, 4, 0))),
+        )
+
+    def test_elaboration_output_is_unchanged(self):
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        design = Conventional(*a, *b)
+        with patch.object(ast_nodes, "_elaboration_scope", contextlib.nullcontext):
+            reference = Conventional(*a, *b)
+
+        self.assertEqual(design._fingerprint(), reference._fingerprint())
+        self.assertEqual(design.to_cpp(), reference.to_cpp())
+
+
+class TestTemplateCaching(unittest.TestCase):
+    def test_instances_with_equal_argument_types_share_inner_trees(self):
+        built = []
+
+        @Composite(name="two_adds", spec=lambda x, y, z, ctx: (x + y) + (y + z))
+        def two_adds(x: Node, y: Node, z: Node) -> Node:
+            first = uq_add(x, y)
+            second = uq_add(y, z)
+            wide = uq_add(first, second)
+            built.extend([first, second, wide])
+            return wide
+
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        z = Var("z", sign=UQT(4, 0))
+        design = two_adds(x, y, z)
+        first, second, wide = built
+        self.assertIsNot(first, second)
+        self.assertIs(first.inner_tree, second.inner_tree)
+        self.assertIsNot(first.inner_tree, wide.inner_tree)
+
+        x.load_val(UQ(15, 4, 0))
+        y.load_val(UQ(3, 4, 0))
+        z.load_val(UQ(9, 4, 0))
+        self.assertEqual(design.evaluate().to_val(), (15 + 3) + (3 + 9))
+        self.assertEqual(first.evaluate().to_val(), 18)
+        self.assertEqual(second.evaluate().to_val(), 12)
+
+    def test_top_level_instances_do_not_share(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        self.assertIsNot(uq_add(x, y).inner_tree, uq_add(y, x).inner_tree)
+
+
+class TestFastElaboration(unittest.TestCase):
+    def test_cached_signatures_still_reject_mismatches(self):
+        def to_bool(x: Node) -> Op:
+            def impl(x: UQ) -> Bool:
+                return Bool(x.val != 0)
+
+            def sign(x: UQT) -> BoolT:
+                return BoolT()
+
+            return Op(impl=impl, sign=sign, args=[x], name="to_bool", c_lowering=None)
+
+        x = Var("x", sign=UQT(4, 0))
+        for _ in range(2):
+            self.assertEqual(to_bool(x).node_type, BoolT())
+            with self.assertRaisesRegex(TypeError, "do not match its signature"):
+                to_bool(Var("b", sign=BoolT()))
+
+        def untyped(x: Node) -> Op:
+            def sign(x):
+                return BoolT()
+
+            return Op(impl=lambda x: Bool(True), sign=sign, args=[x], name="untyped", c_lowering=None)
+
+        for _ in range(2):
+            with self.assertRaisesRegex(TypeError, "not an instance of StaticType"):
+                untyped(x)
+
+    def test_make_fixed_arguments_shares_signatures(self):
+        first = make_fixed_arguments(lambda *args: args[-1], [StaticType] * 3)
+        second = make_fixed_arguments(lambda *args: args[0], [StaticType] * 3)
+        self.assertIs(first.__signature__, second.__signature__)
+        self.assertEqual(len(inspect.signature(first).parameters), 3)
+
+    def test_elaboration_bench_reports_node_counts(self):
+        [row] = elaboration_bench.run_bench(["FP32_IEEE_mult"], repeats=1)
+        self.assertEqual(row["design"], "FP32_IEEE_mult")
+        self.assertGreater(row["min_s"], 0.0)
+        self.assertGreater(row["instances"], 0)
+        self.assertGreater(row["nodes"], row["instances"])
+        self.assertIn("FP32_IEEE_mult", elaboration_bench.format_table([row]))
+
+
+class TestDesignSerialization(unittest.TestCase):
+    @staticmethod
+    def _count_nodes(root: Node) -> int:
+        seen, stack = set(), [root]
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(node.args)
+                if hasattr(node, "inner_tree"):
+                    stack.append(node.inner_tree)
+        return len(seen)
+
+    def test_round_trip_preserves_behaviour_and_structure(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        design = FP32_IEEE_mult(x, y)
+        loaded, inputs = loads_design(dumps_design(design))
+
+        self.assertEqual([var.name for var in inputs], ["x", "y"])
+        self.assertEqual(self._count_nodes(loaded), self._count_nodes(design))
+        self.assertEqual(loaded._fingerprint(), design._fingerprint())
+        self.assertEqual(loaded.to_cpp(), design.to_cpp())
+        self.assertEqual(len(loaded.ctx.checks), len(design.ctx.checks))
+        self.assertIsNotNone(loaded.ctx.spec_of(loaded.inner_tree))
+
+        rng = random.Random(0)
+        for _ in range(50):
+            x.load_rand(rng)
+            y.load_rand(rng)
+            inputs[0].load_val(x.val)
+            inputs[1].load_val(y.val)
+            self.assertEqual(loaded.evaluate(), design.evaluate())
+
+    def test_several_roots_share_inputs(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        (total, carry), inputs = loads_design(dumps_design([uq_add(x, y), uq_add(y, y)]))
+        self.assertEqual([var.name for var in inputs], ["x", "y"])
+        self.assertIs(total.args[1], carry.args[0])
+
+        inputs[0].load_val(UQ(7, 4, 0))
+        inputs[1].load_val(UQ(12, 4, 0))
+        self.assertEqual(total.evaluate().to_val(), 19)
+        self.assertEqual(carry.evaluate().to_val(), 24)
+
+    def test_save_and_load_file(self):
+        x = Var("x", sign=UQT(4, 0))
+        design = uq_add(x, Const(UQ(3, 4, 0)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "design.zd")
+            save_design(design, path)
+            loaded, [x_loaded] = load_design(path)
+        x_loaded.load_val(UQ(5, 4, 0))
+        self.assertEqual(loaded.evaluate().to_val(), 8)
+
+    def test_rejects_foreign_and_stale_data(self):
+        data = dumps_design(uq_add(Var("x", sign=UQT(4, 0)), Var("y", sign=UQT(4, 0))))
+        with self.assertRaisesRegex(DesignFormatError, "Not a serialized design"):
+            loads_design(b"garbage" + data)
+        with patch.object(serialize, "_module_digest", return_value="0" * 32):
+            with self.assertRaisesRegex(DesignFormatError, "changed since the design was saved"):
+                loads_design(data)
+
+    def test_rejects_changed_module_of_importable_spec(self):
+        # max_exp4_spec is a module-level function, pickled by reference
+        design = OPTIMIZED_MAX_EXP4(*(Var(f"e_{i}", sign=UQT(8, 0)) for i in range(4)))
+        data = dumps_design(design)
+        module_digest = serialize._module_digest
+
+        def stale(name):
+            return "0" * 32 if name == "examples.max_exponent" else module_digest(name)
+
+        with patch.object(serialize, "_module_digest", side_effect=stale):
+            with self.assertRaisesRegex(DesignFormatError, "examples.max_exponent changed"):
+                loads_design(data)
+
+
+class TestEvalPlan(unittest.TestCase):
+    def test_plan_matches_evaluate_on_fp32_designs(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        rnd = random.Random(0)
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y)):
+            plan = design.compile_plan()
+            self.assertEqual(plan.inputs, [x, y])
+            for _ in range(50):
+                x.load_rand(rnd)
+                y.load_rand(rnd)
+                with self.subTest(design=design.name, lhs=x.val.val, rhs=y.val.val):
+                    self.assertEqual(plan(x.val.val, y.val.val), design.evaluate().val)
+
+    def test_plan_matches_evaluate_on_dot_products(self):
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        random_gen, exp_shuffle = BFloat16.random_generator(seed=0, shared_exponent_bits=5)
+
+        for design in (Conventional(*a, *b), Optimized(*a, *b)):
+            plan = design.compile_plan()
+            for _ in range(20):
+                exp_shuffle()
+                for var in a + b:
+                    var.load_val(random_gen())
+                with self.subTest(design=design.name):
+                    self.assertEqual(plan(*plan.bound_inputs()), design.evaluate().val)
+
+    def test_plan_returns_tuples_and_constants(self):
+        x = Var("x", sign=UQT(4, 0))
+        design = make_Tuple(uq_add(x, Const(UQ(3, 2, 0))), Const(Bool(1)))
+        plan = design.compile_plan()
+
+        self.assertEqual(plan(13), (16, 1))
+        self.assertEqual(plan.evaluate(UQ(13, 4, 0)), Tuple(UQ(16, 5, 0), Bool(1)))
+
+    def test_plan_rejects_wrong_input_count(self):
+        x = Var("x", sign=UQT(4, 0))
+        plan = uq_add(x, x).compile_plan()
+
+        with self.assertRaises(SimulationError):
+            plan(1, 2)
+
+
+class TestBatchedCppEntry(unittest.TestCase):
+    def test_batch_entry_matches_batch_plan_on_fp32_designs(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        rng = np.random.default_rng(0)
+        xs = rng.integers(0, 1 << 32, 10_000, dtype=np.uint64).astype(np.uint32)
+        ys = rng.integers(0, 1 << 32, 10_000, dtype=np.uint64).astype(np.uint32)
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y)):
+            tempdir, fn = jit_compile_batch(design)
+            try:
+                out = fn(xs, ys)
+                with self.subTest(design=design.name):
+                    self.assertEqual(out.dtype, np.uint32)
+                    expected = compile_batch(design)(xs.astype(np.uint64), ys.astype(np.uint64))
+                    self.assertEqual(out.tolist(), expected.tolist())
+            finally:
+                tempdir.cleanup()
+
+    def test_batch_entry_writes_into_given_output(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        tempdir, fn = jit_compile_batch(uq_add(x, y), optimize=True)
+        try:
+            xs, ys = np.meshgrid(np.arange(16, dtype=np.uint8), np.arange(16, dtype=np.uint8))
+            xs, ys = xs.ravel(), ys.ravel()
+            out = np.zeros(256, dtype=np.uint8)
+            self.assertIs(fn(xs, ys, out=out), out)
+            self.assertEqual(out.tolist(), (xs + ys).tolist())
+            self.assertEqual(fn(xs[:0], ys[:0]).shape, (0,))
+            with self.assertRaises(ValueError):
+                fn(xs, ys[:10])
+        finally:
+            tempdir.cleanup()
+
+    def test_batch_entry_rejects_wide_and_tuple_types(self):
+        wide = Var("wide", sign=UQT(80, 0))
+        x = Var("x", sign=UQT(4, 0))
+        with self.assertRaises(CppLoweringError):
+            uq_add(wide, wide).to_cpp(jittable=False, batch=True)
+        with self.assertRaises(CppLoweringError):
+            make_Tuple(x, x).to_cpp(batch=True)
+
+
+class TestWideCppLowering(unittest.TestCase):
+    def test_wide_designs_match_evaluate(self):
+        x = Var("x", sign=UQT(80, 20))
+        y = Var("y", sign=UQT(70, 0))
+        amount = Var("amount", sign=UQT(8, 0))
+        q = Var("q", sign=QT(60, 40))
+        designs = [
+            uq_add(x, y),
+            uq_sub(x, y),
+            uq_mul(x, y),
+            uq_max(x, y),
+            uq_lt(x, y),
+            uq_rshift_jam(x, amount),
+            uq_lshift(x, amount),
+            uq_resize(x, 30, 10),
+            q_mul(q, q),
+            q_abs(q),
+        ]
+        rnd = random.Random(3)
+
+        for design in designs:
+            for optimize in (False, True):
+                tempdir, fn = jit_compile(design, optimize=optimize)
+                try:
+                    for _ in range(50):
+                        for var in (x, y, amount, q):
+                            var.load_rand(rnd)
+                        args = [arg.val.val for arg in design.args]
+                        with self.subTest(design=design.name, optimize=optimize, args=args):
+                            self.assertEqual(fn(*args), design.evaluate().val)
+                finally:
+                    tempdir.cleanup()
+
+    def test_wide_prelude_is_emitted_only_when_used(self):
+        narrow = Var("narrow", sign=UQT(32, 0))
+        wide = Var("wide", sign=UQT(100, 0))
+        self.assertNotIn("zolotone::wide", uq_add(narrow, narrow).to_cpp())
+        source = uq_add(wide, wide).to_cpp()
+        self.assertEqual(source.count("#define ZOLOTONE_WIDE_INT"), 1)
+        self.assertIn("zolotone::wide<101>", source)
+        self.assertNotIn("zolotone::wide", uq_add(wide, wide).to_cpp(jittable=False))
+
+
+class TestSharedObjectCache(unittest.TestCase):
+    def test_unchanged_design_loads_cached_library(self):
+        x = Var("x", sign=UQT(12, 0))
+        y = Var("y", sign=UQT(12, 0))
+        design = uq_mul(x, y)
+        run = Mock(wraps=compile_cpp.subprocess.run)
+
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.dict(os.environ, {"ZOLOTONE_CPP_CACHE": cache_dir}), \
+                patch.object(compile_cpp.subprocess, "run", run):
+            for _ in range(2):
+                tempdir, fn = jit_compile(design)
+                tempdir.cleanup()
+                self.assertEqual(fn(4000, 4000), 16_000_000)
+            compiles = [call for call in run.call_args_list if "-shared" in call.args[0]]
+            self.assertEqual(len(compiles), 1)
+            self.assertEqual(len(SharedObjectCache(cache_dir).entries()), 1)
+
+            tempdir, fn = jit_compile(uq_add(x, y))
+            tempdir.cleanup()
+            self.assertEqual(fn(4000, 4000), 8000)
+            self.assertEqual(len(SharedObjectCache(cache_dir).entries()), 2)
+
+    def test_nonjittable_keys_cover_ac_types_headers(self):
+        real_run = compile_cpp.subprocess.run
+
+        def fake_compile(command, **kwargs):
+            # Libraries are not loaded, so the compiler can be skipped without the headers
+            if "-shared" not in command:
+                return real_run(command, **kwargs)
+            Path(command[command.index("-o") + 1]).write_bytes(b"\0")
+            return compile_cpp.subprocess.CompletedProcess(command, 0, "", "")
+
+        run = Mock(side_effect=fake_compile)
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.dict(os.environ, {"ZOLOTONE_CPP_CACHE": cache_dir}), \
+                patch.object(compile_cpp.subprocess, "run", run):
+            for digest in ("old", "old", "new"):
+                with patch.object(compile_cpp, "_include_digest", return_value=digest):
+                    for jittable in (True, False):
+                        tempdir, _ = compile_cpp._build_shared_object("// lowered", [], jittable=jittable)
+                        tempdir.cleanup()
+            compiles = [call for call in run.call_args_list if "-shared" in call.args[0]]
+            self.assertEqual(len(compiles), 3)  # jittable once, nonjittable once per digest
+
+        design = uq_add(Var("x", sign=UQT(12, 0)), Var("y", sign=UQT(12, 0)))
+        compiler = compile_cpp._find_cpp_compiler()
+        for jittable in (True, False):
+            units = lower_to_cpp_units(design, jittable=jittable)
+            keys = set()
+            for digest in ("old", "new"):
+                with patch.object(cpp_units, "_include_digest", return_value=digest):
+                    keys.add(cpp_units._unit_key(compiler, units, units.units[0]))
+            self.assertEqual(len(keys), 1 if jittable else 2)
+
+        with tempfile.TemporaryDirectory() as include_dir, \
+                patch.object(compile_cpp, "_AC_TYPES_INCLUDE_DIR", Path(include_dir)):
+            header = Path(include_dir) / "ac_int.h"
+            digests = []
+            for text in ("#define AC_VERSION 1", "#define AC_VERSION 2"):
+                header.write_text(text, encoding="utf-8")
+                compile_cpp._include_digest.cache_clear()
+                digests.append(compile_cpp._include_digest())
+            compile_cpp._include_digest.cache_clear()
+            self.assertNotEqual(digests[0], digests[1])
+
+    def test_equal_design_reuses_lowered_source(self):
+        def design():
+            return uq_mul(Var("x", sign=UQT(12, 0)), Var("y", sign=UQT(12, 0)))
+
+        to_cpp = Mock(wraps=Node.to_cpp)
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.dict(os.environ, {"ZOLOTONE_CPP_CACHE": cache_dir}), \
+                patch.dict(compile_cpp._lowered_sources, clear=True), \
+                patch.object(Node, "to_cpp", lambda self, *args, **kwargs: to_cpp(self, *args, **kwargs)):
+            for _ in range(2):
+                tempdir, fn = jit_compile(design())
+                tempdir.cleanup()
+                self.assertEqual(fn(4000, 4000), 16_000_000)
+            self.assertEqual(to_cpp.call_count, 1)
+
+    def test_eviction_drops_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as build_dir:
+            cache = SharedObjectCache(cache_dir, max_bytes=250)
+            library = Path(build_dir) / "lowered.so"
+            library.write_bytes(b"\0" * 100)
+            for age, key in enumerate(("old", "used", "new")):
+                cache.put(key, library)
+                os.utime(cache.path(key), ns=(age, age))
+            self.assertIsNone(cache.get("old"))
+            self.assertIsNotNone(cache.get("used"))
+            cache.put("newest", library)
+            self.assertEqual(sorted(path.stem for path, _ in cache.entries()), ["newest", "used"])
+            self.assertLessEqual(cache.size(), 250)
+
+
+class TestCompilePool(unittest.TestCase):
+    def test_compile_all_yields_every_design(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        designs = [uq_add(x, y), uq_sub(x, y), uq_mul(x, y), uq_max(x, y)]
+        expected = dict(zip(designs, (300, 0, 22_500, 150)))
+
+        with tempfile.TemporaryDirectory() as cache_dir, patch.dict(os.environ, {"ZOLOTONE_CPP_CACHE": cache_dir}):
+            compiled = list(compile_cpp.compile_all(designs, max_workers=4))
+        self.assertCountEqual([node for node, _, _ in compiled], designs)
+        for node, tempdir, fn in compiled:
+            tempdir.cleanup()
+            with self.subTest(design=node.name):
+                self.assertEqual(fn(150, 150), expected[node])
+
+    def test_pool_futures_match_sequential_helpers(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        design = FP32_IEEE_mult(x, y)
+        with compile_cpp.CompilePool(max_workers=2) as pool:
+            scalar = pool.submit(design, optimize=True)
+            batch = pool.submit(design, batch=True)
+        (scalar_dir, scalar_fn), (batch_dir, batch_fn) = scalar.result(), batch.result()
+        try:
+            xs = np.array([0x3F800000, 0x40490FDB, 0x7F7FFFFF], dtype=np.uint32)
+            ys = np.array([0x40000000, 0xC0000000, 0x00000001], dtype=np.uint32)
+            self.assertEqual(batch_fn(xs, ys).tolist(), [scalar_fn(int(a), int(b)) for a, b in zip(xs, ys)])
+        finally:
+            scalar_dir.cleanup()
+            batch_dir.cleanup()
+
+
+class TestCppUnits(unittest.TestCase):
+    def test_units_share_functions_by_fingerprint(self):
+        @Composite(name="square_sum", spec=lambda x, y, ctx: x * y + y * x)
+        def square_sum(x: Node, y: Node) -> Node:
+            return uq_add(uq_mul(x, y), uq_mul(y, x))
+
+        units = lower_to_cpp_units(square_sum(Var("x", sign=UQT(8, 0)), Var("y", sign=UQT(8, 0))), "entry")
+        names = [unit.name for unit in units.units]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(len([name for name in names if name.startswith("uq_mul_")]), 1)
+        self.assertEqual(names[-1], "entry")
+        self.assertIn('extern "C" uint32_t entry(', units.header)
+        for unit in units.units[:-1]:
+            self.assertRegex(unit.name, r"_[0-9a-f]{16}$")
+            self.assertNotIn("static inline", unit.source)
+
+    def test_rebuild_compiles_only_changed_units(self):
+        @Composite(name="mul_add", spec=lambda x, y, ctx: x * y + x)
+        def mul_add(x: Node, y: Node) -> Node:
+            return uq_add(uq_mul(x, y), x)
+
+        @Composite(name="mul_sub", spec=lambda x, y, ctx: x * y - x)
+        def mul_sub(x: Node, y: Node) -> Node:
+            return uq_sub(uq_mul(x, y), x)
+
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        with tempfile.TemporaryDirectory() as build_dir:
+            fn, rebuilt = compile_units(mul_add(x, y), build_dir)
+            self.assertEqual(fn(10, 20), 210)
+            self.assertTrue(any(name.startswith("uq_mul_") for name in rebuilt))
+
+            fn, rebuilt = compile_units(mul_add(x, y), build_dir)
+            self.assertEqual(rebuilt, [])
+            self.assertEqual(fn(10, 20), 210)
+
+            fn, rebuilt = compile_units(mul_sub(x, y), build_dir)
+            self.assertEqual(fn(10, 20), 190)
+            self.assertIn("lowered_entry", rebuilt)
+            self.assertFalse(any(name.startswith("uq_mul_") for name in rebuilt))
+
+            batch_fn, _ = compile_units(mul_sub(x, y), build_dir, batch=True)
+            xs = np.array([10, 255], dtype=np.uint8)
+            ys = np.array([20, 255], dtype=np.uint8)
+            self.assertEqual(batch_fn(xs, ys).tolist(), [fn(10, 20), fn(255, 255)])
+
+    def test_optimized_units_keep_one_unit_per_function(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        design = FP32_IEEE_adder(x, y)
+        optimized = lower_to_cpp_units(design, "lowered_entry", optimize=True)
+        plain = lower_to_cpp_units(design, "lowered_entry", optimize=False)
+        self.assertGreater(len(optimized.units), 1)
+        self.assertEqual([unit.name for unit in optimized.units], [unit.name for unit in plain.units])
+        self.assertTrue(all("static inline" not in unit.source for unit in optimized.units))
+        # Names follow the subtrees, fingerprints the sources
+        for optimized_unit, plain_unit in zip(optimized.units, plain.units):
+            self.assertEqual(
+                optimized_unit.fingerprint == plain_unit.fingerprint,
+                optimized_unit.source == plain_unit.source,
+            )
+        self.assertNotEqual(
+            [unit.fingerprint for unit in optimized.units], [unit.fingerprint for unit in plain.units]
+        )
+
+        rnd = random.Random(5)
+        with tempfile.TemporaryDirectory() as build_dir:
+            fn, _ = compile_units(design, build_dir, optimize=True)
+            for _ in range(200):
+                x.load_rand(rnd)
+                y.load_rand(rnd)
+                with self.subTest(lhs=x.val.val, rhs=y.val.val):
+                    self.assertEqual(fn(x.val.val, y.val.val), design.evaluate().val)
+
+
+class TestExtensionModule(unittest.TestCase):
+    def test_extension_entries_match_ctypes_helpers(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        design = FP32_IEEE_adder(x, y)
+        tempdir_ext, module = compile_cpp.compile_extension(design)
+        tempdir_jit, fn_jit = jit_compile(design)
+        rnd = random.Random(4)
+        try:
+            points = [(rnd.getrandbits(32), rnd.getrandbits(32)) for _ in range(500)]
+            expected = [fn_jit(lhs, rhs) for lhs, rhs in points]
+            self.assertEqual([module.call(lhs, rhs) for lhs, rhs in points], expected)
+
+            xs, ys = (np.array(column, dtype=np.uint32) for column in zip(*points))
+            out = np.zeros(len(points), dtype=np.uint32)
+            module.batch(xs, ys, out)
+            self.assertEqual(out.tolist(), expected)
+            batch_fn = compile_cpp.ExtensionBatchFunction(module.batch, [x.node_type, y.node_type], design.node_type)
+            self.assertEqual(batch_fn(xs, ys).tolist(), expected)
+        finally:
+            tempdir_ext.cleanup()
+            tempdir_jit.cleanup()
+
+    def test_extension_rejects_bad_arguments(self):
+        x = Var("x", sign=UQT(8, 0))
+        tempdir, module = compile_cpp.compile_extension(uq_add(x, x))
+        tempdir.cleanup()
+        self.assertEqual(module.call(200, 100), 300)
+        with self.assertRaises(TypeError):
+            module.call(1)
+        with self.assertRaises(TypeError):
+            module.call("1", 2)
+        column = np.arange(4, dtype=np.uint8)
+        with self.assertRaises(TypeError):
+            module.batch(column, column.astype(np.int8), np.zeros(4, dtype=np.uint16))
+        with self.assertRaises(ValueError):
+            module.batch(column, column[:2], np.zeros(4, dtype=np.uint16))
+        with self.assertRaises(TypeError):
+            compile_cpp.compile_extension(uq_add(Var("wide", sign=UQT(80, 0)), x))
+
+
+class TestNativeDifferentialHarness(unittest.TestCase):
+    def test_fp32_designs_match_native_float_ops(self):
+        for name, (make_design, reference) in native_differential.DESIGNS.items():
+            report = native_differential.run_native_differential(make_design(), reference, seed=5, n_points=200_000)
+            with self.subTest(design=name):
+                self.assertEqual(report["points"], 200_000)
+                self.assertEqual(report["mismatches"], 0, report["mismatch_reports"])
+                self.assertGreater(report["points_per_second"], 0)
+
+    def test_mismatches_are_reported_and_reproducible(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        # Off by one whenever the carry out is set
+        reference = NativeReference("(x0 + x1) & 0xff")
+        tempdir, executable = native_differential.build_harness(uq_add(x, y), reference)
+        try:
+            report = native_differential.run_harness(executable, seed=1, n_points=1000, max_reports=3)
+            rerun = native_differential.run_harness(executable, seed=1, n_points=1000, max_reports=3)
+            self.assertEqual(rerun["mismatch_reports"], report["mismatch_reports"])
+        finally:
+            tempdir.cleanup()
+        self.assertGreater(report["mismatches"], 3)
+        self.assertEqual(len(report["mismatch_reports"]), 3)
+        for mismatch in report["mismatch_reports"]:
+            lhs, rhs = mismatch["inputs"]
+            self.assertEqual(mismatch["dut"], lhs + rhs)
+            self.assertEqual(mismatch["reference"], (lhs + rhs) & 0xFF)
+
+        with self.assertRaises(CppLoweringError):
+            lower_differential_harness(uq_add(Var("wide", sign=UQT(80, 0)), x), reference)
+        with self.assertRaises(ValueError):
+            NativeReference("x0", compare="float64")
+
+
+class TestExhaustiveHarness(unittest.TestCase):
+    def test_max_exp4_is_proved_against_reference_design(self):
+        design, reference = native_differential._max_exp4_pair(exp_bits=4)
+        verdict = native_differential.run_exhaustive(design, reference, threads=3)
+        self.assertEqual(verdict["verdict"], "proved")
+        self.assertEqual(verdict["points"], 1 << 16)
+        self.assertEqual(verdict["total"], 1 << 16)
+        self.assertIsNone(verdict["counterexample"])
+
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        verdict = native_differential.run_exhaustive(uq_add(x, y), NativeReference("x0 + x1"), threads=2)
+        self.assertEqual((verdict["verdict"], verdict["points"]), ("proved", 1 << 16))
+
+    def test_first_counterexample_does_not_depend_on_threads(self):
+        @Composite(name="max_of_three", spec=max_exp4_spec)
+        def max_of_three(e0, e1, e2, e3):
+            return uq_max(uq_max(e0, e1), uq_resize(e2, 4, 0))
+
+        inputs = [Var(f"e_{i}", sign=UQT(4, 0)) for i in range(4)]
+        design, reference = OPTIMIZED_MAX_EXP4(*inputs), max_of_three(*inputs)
+        for threads in (1, 4):
+            verdict = native_differential.run_exhaustive(design, reference, threads=threads, optimize=False)
+            with self.subTest(threads=threads):
+                self.assertEqual(verdict["verdict"], "refuted")
+                # e3 takes the top bits of the index, e3 = 1 with all other inputs zero comes first
+                self.assertEqual(
+                    verdict["counterexample"],
+                    {"index": 1 << 12, "inputs": [0, 0, 0, 1], "impl": 1, "reference": 0},
+                )
+
+        with self.assertRaises(ValueError):
+            lower_exhaustive_harness(design, uq_max(inputs[0], inputs[1]))
+
+
+class TestGraphPasses(unittest.TestCase):
+    def test_passes_shrink_designs_and_preserve_results(self):
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        random_gen, exp_shuffle = BFloat16.random_generator(seed=0, shared_exponent_bits=5)
+
+        for design in (Conventional(*a, *b), Optimized(*a, *b)):
+            reference = design.compile_plan(optimize=False)
+            plan = design.compile_plan()
+            self.assertLess(len(plan), len(reference))
+            for _ in range(20):
+                exp_shuffle()
+                for var in a + b:
+                    var.load_val(random_gen())
+                with self.subTest(design=design.name):
+                    bits = plan.bound_inputs()
+                    self.assertEqual(plan(*bits), design.evaluate().val)
+                    self.assertEqual(plan(*bits), reference(*bits))
+
+    def test_manager_records_live_ops_per_pass(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        manager = PassManager()
+        graph = manager.run(flatten(FP32_IEEE_adder(x, y)))
+
+        self.assertEqual([stats.name for stats in manager.stats], ["copies", "cse", "dce"])
+        self.assertLess(manager.stats[0].ops_after, manager.stats[0].ops_before)
+        self.assertLess(manager.stats[1].ops_after, manager.stats[1].ops_before)
+        self.assertEqual(len(list(graph.ops())), manager.stats[-1].ops_after)
+
+    def test_cse_merges_equal_primitive_instances(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        design = make_Tuple(uq_add(x, y), uq_add(x, y))
+        plan = design.compile_plan()
+
+        self.assertEqual([flat.node.name for _, flat in plan.graph.ops()].count("basic_add"), 1)
+        self.assertEqual(plan(7, 9), (16, 16))
+
+    def test_only_equal_width_identities_are_removed(self):
+        q = Var("q", sign=QT(3, 1))
+        u = Var("u", sign=UQT(3, 1))
+        as_uq = basics.basic_identity(q, out=Const(UQ(0, 3, 1)))
+        design = make_Tuple(uq_add(as_uq, u), q_to_uq(q))
+        names = [flat.node.name for _, flat in design.compile_plan().graph.ops()]
+        self.assertEqual(names.count("basic_identity"), 1)  # q_to_uq drops the sign bit
+
+        # The output keeps its declared type
+        plan = as_uq.compile_plan()
+        self.assertEqual(plan.output_type, UQT(3, 1))
+        self.assertEqual(plan.evaluate(Q(0b1011, 3, 1)), UQ(0b1011, 3, 1))
+
+    def test_dead_node_removal_keeps_unused_inputs(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        design = make_Tuple(uq_add(x, x), y)
+        graph = remove_dead_nodes(flatten(design[0], inputs=[x, y]))
+
+        self.assertEqual(graph.inputs, [x, y])
+        self.assertEqual(EvalPlan(graph)(3, 5), 6)
+
+    def test_optimized_backends_match_evaluate(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        rnd = random.Random(1)
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y)):
+            xs, ys = [], []
+            for _ in range(64):
+                x.load_rand(rnd)
+                y.load_rand(rnd)
+                xs.append(x.val.val)
+                ys.append(y.val.val)
+            expected = [design.compile_plan(optimize=False)(lhs, rhs) for lhs, rhs in zip(xs, ys)]
+            columns = [np.array(xs, dtype=np.uint64), np.array(ys, dtype=np.uint64)]
+            with self.subTest(design=design.name):
+                self.assertEqual(compile_batch(design)(*columns).tolist(), expected)
+                self.assertEqual(design.compile_bitslice()(*columns).tolist(), expected)
+
+    def test_optimized_cpp_lowering_matches_evaluate(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        design = FP32_IEEE_adder(x, y)
+        self.assertNotEqual(design.to_cpp(optimize=True), design.to_cpp(optimize=False))
+        self.assertEqual(design.to_cpp(), design.to_cpp(optimize=True))
+        tempdir, fn = jit_compile(design, optimize=True)
+        rnd = random.Random(2)
+
+        try:
+            for _ in range(200):
+                x.load_rand(rnd)
+                y.load_rand(rnd)
+                with self.subTest(lhs=x.val.val, rhs=y.val.val):
+                    self.assertEqual(fn(x.val.val, y.val.val), design.evaluate().val)
+        finally:
+            tempdir.cleanup()
+
+
+class TestCostModel(unittest.TestCase):
+    def test_adder_cost_and_depth(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        report = uq_add(x, y).estimate_cost()
+
+        self.assertEqual(report.cost.adder_bits, 8)
+        self.assertEqual(report.depth, 5)  # 3 prefix levels, propagate/generate and sum
+        self.assertEqual(report.critical_path, ["basic_add"])
+        self.assertEqual(report.unknown_ops, [])
+
+    def test_constant_shifts_are_wiring(self):
+        x = Var("x", sign=UQT(8, 0))
+        amount = Var("amount", sign=UQT(3, 0))
+        out = Const(UQ(0, 8, 0))
+        variable = basics.basic_rshift(x, amount, out=out).estimate_cost()
+        constant = basics.basic_rshift(x, Const(UQ(2, 3, 0)), out=out).estimate_cost()
+
+        self.assertEqual((variable.cost.shifter_stages, variable.cost.mux_bits, variable.depth), (3, 24, 3))
+        self.assertEqual((constant.cost.area, constant.depth), (0.0, 0))
+
+    def test_instances_are_counted_per_hardware_copy(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        z = Var("z", sign=UQT(8, 0))
+        report = make_Tuple(uq_add(x, y), uq_add(x, z)).estimate_cost()
+        adders = {row["name"]: row for row in report.rows()}["uq_add"]
+
+        self.assertEqual(adders["instances"], 2)
+        self.assertEqual(adders["adder_bits"], report.cost.adder_bits)
+        self.assertEqual(adders["depth"], report.depth)
+
+    def test_dot_product_reports(self):
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+
+        for design in (Conventional(*a, *b), Optimized(*a, *b)):
+            report = design.estimate_cost()
+            with self.subTest(design=design.name):
+                self.assertEqual(report.unknown_ops, [])
+                self.assertEqual(report.cost.multiplier_bits, 4 * 8 * 8)
+                self.assertGreater(report.depth, 0)
+                self.assertLessEqual(max(row["depth"] for row in report.rows()), report.depth)
+                payload = json.loads(report.to_json())
+                self.assertEqual(payload["design"], design.name)
+                self.assertEqual(len(payload["instances"]), len(report.instances))
+                self.assertIn("fp32_encode", report.table())
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    def test_batch_matches_plan_on_fp32_designs(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        rng = np.random.default_rng(0)
+        lhs = rng.integers(0, 1 << 32, 500, dtype=np.uint64)
+        rhs = rng.integers(0, 1 << 32, 500, dtype=np.uint64)
+        x.load_batch(lhs)
+        y.load_batch(rhs)
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y)):
+            plan = design.compile_plan()
+            out = design.evaluate_batch()
+            self.assertEqual(out.dtype, np.uint64)
+            expected = [plan(int(a), int(b)) for a, b in zip(lhs, rhs)]
+            self.assertEqual(out.tolist(), expected, msg=design.name)
+
+    def test_batch_covers_basic_operators(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(8, 0))
+        amount = Var("amount", sign=UQT(4, 0))
+        sel = Var("sel", sign=BoolT())
+
+        def out(bits):
+            return Const(UQ(0, bits, 0))
+
+        design = make_Tuple(
+            basics.basic_mux_2_1(sel, x, y, out(8)),
+            basics.basic_add(x, y, out(9)),
+            basics.basic_sub(x, y, out(8)),
+            basics.basic_mul(x, y, out(16)),
+            basics.basic_max(x, y, out(8)),
+            basics.basic_min(x, y, out(8)),
+            basics.basic_rshift(x, amount, out(8)),
+            basics.basic_lshift(x, amount, out(12)),
+            basics.basic_or(x, y, out(8)),
+            basics.basic_xor(x, y, out(8)),
+            basics.basic_and(x, y, out(8)),
+            basics.basic_concat(x, y, out(16)),
+            basics.basic_less(x, y, out(1)),
+            basics.basic_less_or_equal(x, y, out(1)),
+            basics.basic_greater(x, y, out(1)),
+            basics.basic_greater_or_equal(x, y, out(1)),
+            basics.basic_equal(x, y, out(1)),
+            basics.basic_not_equal(x, y, out(1)),
+            basics.basic_select(x, 6, 2, out(5)),
+            basics.basic_invert(x, out(8)),
+            basics.basic_identity(x, out(8)),
+            basics.basic_or_reduce(x, out(1)),
+            basics.basic_and_reduce(x, out(1)),
+            basics.basic_lshift(x, amount, out(64)),
+        )
+        rng = np.random.default_rng(1)
+        columns = {
+            x: np.concatenate([[0, 255, 255, 7], rng.integers(0, 256, 300)]),
+            y: np.concatenate([[0, 255, 0, 7], rng.integers(0, 256, 300)]),
+            amount: np.concatenate([[0, 15, 8, 12], rng.integers(0, 16, 300)]),
+            sel: np.concatenate([[0, 1, 0, 1], rng.integers(0, 2, 300)]),
+        }
+        for var, column in columns.items():
+            var.load_batch(column)
+
+        plan = design.compile_plan()
+        out_columns = design.evaluate_batch()
+        for row in range(len(columns[x])):
+            expected = plan(*[int(columns[var][row]) for var in plan.inputs])
+            self.assertEqual(tuple(int(col[row]) for col in out_columns), expected)
+
+    def test_batch_broadcasts_constant_outputs(self):
+        x = Var("x", sign=UQT(4, 0))
+        x.load_batch(np.arange(16))
+        design = make_Tuple(uq_add(x, Const(UQ(3, 2, 0))), Const(Bool(1)))
+
+        total, flag = design.evaluate_batch()
+        self.assertEqual(total.tolist(), [v + 3 for v in range(16)])
+        self.assertEqual(flag.tolist(), [1] * 16)
+
+    def test_wide_batch_matches_plan(self):
+        x = Var("x", sign=UQT(100, 0))
+        y = Var("y", sign=UQT(90, 0))
+        n = Var("n", sign=UQT(16, 0))
+        amount = Var("amount", sign=UQT(8, 0))
+        sel = Var("sel", sign=BoolT())
+
+        def out(bits):
+            return Const(UQ(0, bits, 0))
+
+        design = make_Tuple(
+            basics.basic_mux_2_1(sel, x, y, out(100)),
+            basics.basic_add(x, y, out(101)),
+            basics.basic_sub(x, y, out(100)),
+            basics.basic_mul(x, y, out(190)),
+            basics.basic_mul(x, n, out(70)),
+            basics.basic_max(x, y, out(100)),
+            basics.basic_min(x, y, out(100)),
+            basics.basic_rshift(x, amount, out(40)),
+            basics.basic_lshift(n, amount, out(200)),
+            basics.basic_rshift(n, x, out(16)),
+            basics.basic_xor(x, y, out(100)),
+            basics.basic_concat(n, x, out(116)),
+            basics.basic_less(x, y, out(1)),
+            basics.basic_equal(x, y, out(1)),
+            basics.basic_select(x, 95, 10, out(86)),
+            basics.basic_invert(x, out(100)),
+            basics.basic_and_reduce(x, out(1)),
+            uq_mul(x, y),
+        )
+        rnd = random.Random(0)
+        columns = {
+            x: [(1 << 100) - 1, 0, 1 << 64] + [rnd.getrandbits(100) for _ in range(200)],
+            y: [(1 << 90) - 1, 0, 1 << 64] + [rnd.getrandbits(90) for _ in range(200)],
+            n: [rnd.getrandbits(16) for _ in range(203)],
+            amount: [0, 64, 255] + [rnd.getrandbits(8) for _ in range(200)],
+            sel: [rnd.getrandbits(1) for _ in range(203)],
+        }
+        for var, column in columns.items():
+            var.load_batch(np.array(column, dtype=object))
+        self.assertEqual(x.batch.shape, (203, 2))
+
+        plan = design.compile_plan()
+        out_columns = [
+            limbs_to_ints(col) if col.ndim == 2 else col.tolist()
+            for col in design.evaluate_batch()
+        ]
+        for row in range(203):
+            expected = plan(*[columns[var][row] for var in plan.inputs])
+            self.assertEqual(tuple(col[row] for col in out_columns), expected)
+
+    def test_wide_accumulator_dot_product(self):
+        import examples.optimized as optimized
+
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        with patch.object(optimized, "Wf", 80):
+            design = optimized.Optimized(*a, *b)
+        rng = np.random.default_rng(2)
+        columns = {var: rng.integers(0, 1 << 16, 300) for var in a + b}
+        for var, column in columns.items():
+            var.load_batch(column)
+
+        plan = design.compile_plan()
+        expected = [
+            plan(*[int(columns[var][row]) for var in plan.inputs]) for row in range(300)
+        ]
+        self.assertEqual(design.evaluate_batch().tolist(), expected)
+
+    def test_load_batch_rejects_invalid_arrays(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+
+        with self.assertRaises(ValueError):
+            x.load_batch(np.array([3, 16]))
+        with self.assertRaises(TypeError):
+            x.load_batch(np.array([[1, 2]]))
+        with self.assertRaises(TypeError):
+            Var("t", sign=TupleT(UQT(4, 0), BoolT())).load_batch(np.array([1]))
+        with self.assertRaises(TypeError):
+            Var("w", sign=UQT(100, 0)).load_batch(np.zeros((2, 3), dtype=np.uint64))
+        with self.assertRaises(ValueError):
+            Var("w", sign=UQT(100, 0)).load_batch(np.array([1 << 100], dtype=object))
+
+        design = uq_add(x, y)
+        x.load_batch(np.arange(4))
+        with self.assertRaises(ValueError):
+            design.evaluate_batch()
+        y.load_batch(np.arange(5))
+        with self.assertRaises(ValueError):
+            design.evaluate_batch()
+
+
+class TestBitslicedEvaluation(unittest.TestCase):
+    @staticmethod
+    def _outputs(value):
+        return [col.tolist() for col in (value if isinstance(value, tuple) else (value,))]
+
+    def test_bitslice_matches_batch_on_basic_operators(self):
+        x = Var("x", sign=UQT(8, 0))
+        y = Var("y", sign=UQT(6, 0))
+        amount = Var("amount", sign=UQT(4, 0))
+        sel = Var("sel", sign=UQT(2, 0))
+        w = Var("w", sign=UQT(100, 0))
+
+        def out(bits):
+            return Const(UQ(0, bits, 0))
+
+        design = make_Tuple(
+            basics.basic_mux_2_1(sel, x, y, out(8)),
+            basics.basic_add(x, y, out(9)),
+            basics.basic_sub(x, y, out(8)),
+            basics.basic_sub(y, x, out(10)),
+            basics.basic_mul(x, y, out(14)),
+            basics.basic_mul(x, y, out(5)),
+            basics.basic_max(x, y, out(8)),
+            basics.basic_min(x, y, out(8)),
+            basics.basic_rshift(x, amount, out(8)),
+            basics.basic_lshift(x, amount, out(12)),
+            basics.basic_or(x, y, out(8)),
+            basics.basic_xor(x, y, out(8)),
+            basics.basic_and(x, y, out(8)),
+            basics.basic_concat(x, y, out(14)),
+            basics.basic_less(x, y, out(1)),
+            basics.basic_less_or_equal(x, y, out(1)),
+            basics.basic_greater(x, y, out(1)),
+            basics.basic_greater_or_equal(x, y, out(1)),
+            basics.basic_equal(x, y, out(1)),
+            basics.basic_not_equal(x, y, out(1)),
+            basics.basic_select(x, 6, 2, out(5)),
+            basics.basic_invert(x, out(8)),
+            basics.basic_identity(x, out(10)),
+            basics.basic_or_reduce(x, out(1)),
+            basics.basic_and_reduce(x, out(1)),
+            basics.basic_add(w, x, out(101)),
+            basics.basic_rshift(w, amount, out(100)),
+            basics.basic_select(w, 99, 40, out(60)),
+        )
+        rng = np.random.default_rng(3)
+        size = 203  # not a multiple of the 64 stimuli packed per word
+        x.load_batch(np.concatenate([[0, 255, 255, 7], rng.integers(0, 256, size - 4)]))
+        y.load_batch(np.concatenate([[0, 63, 0, 7], rng.integers(0, 64, size - 4)]))
+        amount.load_batch(rng.integers(0, 16, size))
+        sel.load_batch(rng.integers(0, 4, size))
+        w.load_batch(np.array([random.Random(row).getrandbits(100) for row in range(size)], dtype=object))
+
+        self.assertEqual(self._outputs(design.evaluate_bitslice()), self._outputs(design.evaluate_batch()))
+
+    def test_bitslice_matches_batch_on_designs(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        rng = np.random.default_rng(4)
+        for var in (x, y):
+            var.load_batch(rng.integers(0, 1 << 32, 150, dtype=np.uint64))
+        for var in a + b:
+            var.load_batch(rng.integers(0, 1 << 16, 150))
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y), Optimized(*a, *b)):
+            plan = design.compile_bitslice()
+            self.assertEqual(plan.fallbacks, [], msg=design.name)
+            self.assertEqual(
+                self._outputs(design.evaluate_bitslice()), self._outputs(design.evaluate_batch()), msg=design.name
+            )
+
+    def test_exhaustive_max_exponent(self):
+        from examples.max_exponent import OPTIMIZED_MAX_EXP4
+
+        args = [Var(f"arg_{i}", sign=UQT(3, 0)) for i in range(4)]
+        plan = OPTIMIZED_MAX_EXP4(*args).compile_bitslice()
+        result = plan.exhaustive()
+
+        stimuli = np.arange(1 << 12, dtype=np.uint64)
+        fields = [(stimuli >> np.uint64(3 * i)) & np.uint64(7) for i in range(4)]
+        self.assertEqual(result.tolist(), np.maximum.reduce(fields).tolist())
+
+
+class TestEvaluationProfiler(unittest.TestCase):
+    def test_profile_counts_calls_hits_and_time_per_node(self):
+        x = Var("x", sign=UQT(4, 0))
+        shared = uq_add(x, x)
+        design = uq_mul(shared, shared)
+        x.load_val(UQ(3, 4, 0))
+
+        with profile_evaluation() as profiler:
+            result = design.evaluate()
+            design.evaluate()
+        self.assertEqual(result, UQ(36, 10, 0))
+
+        by_node = profiler.stats(by="node")
+        self.assertEqual(by_node[shared].calls, 2)
+        self.assertEqual(by_node[shared].hits, 2)
+        self.assertEqual(by_node[shared].hit_rate, 0.5)
+        self.assertEqual(by_node[design].calls, 2)
+        for stats in by_node.values():
+            self.assertGreaterEqual(stats.total_s, stats.self_s)
+            self.assertGreaterEqual(stats.self_s, 0.0)
+
+        by_name = profiler.stats(by="name")
+        self.assertEqual(by_name["uq_add"].calls, by_node[shared].calls)
+        self.assertIn(("Primitive", "uq_add"), profiler.stats(by="kind"))
+        self.assertIn(("Op", "basic_add"), profiler.stats(by="kind"))
+
+    def test_profile_reports_and_dot_export(self):
+        x = Var("x", sign=UQT(4, 0))
+        design = uq_add(x, Const(UQ(1, 1, 0)))
+        x.load_val(UQ(3, 4, 0))
+        with profile_evaluation() as profiler:
+            design.evaluate()
+
+        rows = json.loads(profiler.to_json(by="kind"))
+        self.assertEqual(rows, sorted(rows, key=lambda row: row["self_s"], reverse=True))
+        self.assertEqual({"kind", "name", "calls", "hits", "hit_rate", "total_s", "self_s"}, set(rows[0]))
+        self.assertIn("uq_add", profiler.table())
+        with self.assertRaises(ValueError):
+            profiler.stats(by="unknown")
+
+        dot = profiler.to_dot(design, top=1)
+        self.assertTrue(dot.startswith("digraph profile {"))
+        self.assertEqual(dot.count("fillcolor=\"#ff"), 1)
+        self.assertIn("cluster_", profiler.to_dot(design, inline=True))
+
+        # The hottest node of a collapsed inner tree does not take the highlight
+        profiler.nodes[design.inner_tree].self_s = 1.0
+        self.assertIn('fillcolor="#ff0000"', profiler.to_dot(design, top=1))
+        self.assertNotIn(design.inner_tree.name, profiler.to_dot(design, top=1))
+        self.assertIn(design.inner_tree.name, profiler.to_dot(design, top=1, inline=True))
+
+    def test_profiler_is_disabled_outside_the_block(self):
+        x = Var("x", sign=UQT(4, 0))
+        design = uq_add(x, x)
+        x.load_val(UQ(3, 4, 0))
+        with profile_evaluation() as profiler:
+            design.evaluate()
+        calls = {node: stats.calls for node, stats in profiler.stats(by="node").items()}
+        design.evaluate()
+        self.assertEqual({node: stats.calls for node, stats in profiler.stats(by="node").items()}, calls)
+
+
+class TestIncrementalEvaluation(unittest.TestCase):
+    def test_incremental_matches_evaluate_when_single_inputs_change(self):
+        a = [Var(name=f"a_{i}", sign=BFloat16T()) for i in range(4)]
+        b = [Var(name=f"b_{i}", sign=BFloat16T()) for i in range(4)]
+        random_gen, _ = BFloat16.random_generator(seed=0, shared_exponent_bits=5)
+        rnd = random.Random(0)
+        for var in a + b:
+            var.load_val(random_gen())
+
+        for design in (Conventional(*a, *b), Optimized(*a, *b)):
+            plan = design.compile_incremental()
+            self.assertEqual(plan.evaluate(), design.evaluate())
+            self.assertEqual(plan.last_recomputed, len(plan))
+            for _ in range(10):
+                rnd.choice(a + b).load_val(random_gen())
+                self.assertEqual(plan.evaluate(), design.evaluate())
+                self.assertLessEqual(plan.last_recomputed, len(plan))
+
+    def test_only_the_fan_out_of_changed_inputs_is_recomputed(self):
+        x = Var("x", sign=UQT(4, 0))
+        y = Var("y", sign=UQT(4, 0))
+        design = make_Tuple(uq_add(x, Const(UQ(1, 1, 0))), uq_mul(y, y))
+        plan = design.compile_incremental()
+        x.load_val(UQ(3, 4, 0))
+        y.load_val(UQ(5, 4, 0))
+        plan.evaluate()
+
+        x.load_val(UQ(4, 4, 0))
+        self.assertEqual(plan.evaluate(), Tuple(UQ(5, 5, 0), UQ(25, 8, 0)))
+        x_cone = plan.last_recomputed
+        self.assertLess(x_cone, len(plan))
+
+        y.load_val(UQ(6, 4, 0))
+        self.assertEqual(plan.evaluate(), Tuple(UQ(5, 5, 0), UQ(36, 8, 0)))
+        self.assertLess(plan.last_recomputed, len(plan))
+
+        y.load_val(UQ(6, 4, 0))
+        self.assertEqual(plan.evaluate(), Tuple(UQ(5, 5, 0), UQ(36, 8, 0)))
+        self.assertEqual(plan.last_recomputed, 0)
+
+    def test_cone_cache_evicts_least_recently_used_masks(self):
+        inputs = [Var(f"x_{i}", sign=UQT(4, 0)) for i in range(4)]
+        design = uq_add(uq_add(inputs[0], inputs[1]), uq_add(inputs[2], inputs[3]))
+        plan = design.compile_incremental()
+        rnd = random.Random(3)
+        with patch("zolotone.sim.incremental.MAX_CACHED_CONES", 3):
+            values = [0] * len(inputs)
+            for _ in range(60):
+                values = [rnd.randrange(16) if rnd.random() < 0.5 else value for value in values]
+                self.assertEqual(plan(*values), sum(values))
+                self.assertLessEqual(len(plan._cones), 3)
+                self.assertIn(None, plan._cones)
+                self.assertLessEqual(plan.last_recomputed, len(plan))
+
+    def test_node_evaluate_incremental_keeps_state_between_calls(self):
+        x = Var("x", sign=UQT(4, 0))
+        design = uq_add(x, x)
+
+        with self.assertRaises(ValueError):
+            design.evaluate_incremental()
+        for val in (1, 7, 7, 15):
+            x.load_val(UQ(val, 4, 0))
+            self.assertEqual(design.evaluate_incremental(), design.evaluate())
+
+
+class TestUncheckedEvaluation(unittest.TestCase):
+    @staticmethod
+    def _mistyped_op(x):
+        def impl(x: RuntimeType) -> RuntimeType:
+            return UQ(x.val, 5, 0)
+
+        def sign(x: StaticType) -> StaticType:
+            return UQT(4, 0)
+
+        return Op(impl=impl, sign=sign, args=[x], name="mistyped", c_lowering=None)
+
+    def test_unchecked_matches_checked_on_fp32_designs(self):
+        x = Var(name="x", sign=Float32T())
+        y = Var(name="y", sign=Float32T())
+        rnd = random.Random(0)
+
+        for design in (FP32_IEEE_adder(x, y), FP32_IEEE_mult(x, y)):
+            for _ in range(20):
+                x.load_rand(rnd)
+                y.load_rand(rnd)
+                self.assertEqual(design.evaluate(checked=False), design.evaluate())
+
+    def test_unchecked_skips_dynamic_typecheck(self):
+        x = Var("x", sign=UQT(4, 0))
+        x.load_val(UQ(3, 4, 0))
+        design = self._mistyped_op(x)
+
+        with self.assertRaises(TypeError):
+            design.evaluate()
+        self.assertEqual(design.evaluate(checked=False), UQ(3, 5, 0))
+
+    def test_design_mode_and_debug_override(self):
+        x = Var("x", sign=UQT(4, 0))
+        x.load_val(UQ(3, 4, 0))
+        design = self._mistyped_op(x)
+        design.checked = False
+
+        self.assertEqual(design.evaluate(), UQ(3, 5, 0))
+        with self.assertRaises(TypeError):
+            design.evaluate(checked=True)
+        with evaluation_checks(True):
+            with self.assertRaises(TypeError):
+                design.evaluate()
+        # The mode does not leak out of the evaluation
+        with self.assertRaises(TypeError):
+            self._mistyped_op(x).evaluate()
+
+
+class TestShardedDifferentialRunner(unittest.TestCase):
+    def test_shards_and_seeds_do_not_depend_on_number_of_jobs(self):
+        shards = differential.make_shards(seed=7, n_points=5, shard_points=2)
+        self.assertEqual(shards, differential.make_shards(seed=7, n_points=5, shard_points=2))
+        per_level = [s for s in shards if s["shared_exponent_bits"] == differential.MIN_SHARED_EXPONENT_BITS]
+        self.assertEqual([s["num_points"] for s in per_level], [2, 2, 1])
+        self.assertEqual(len({s["seed"] for s in shards}), len(shards))
+        self.assertNotEqual(shards, differential.make_shards(seed=8, n_points=5, shard_points=2))
+
+        serial, _ = differential.run_differential(seed=7, n_points=3, jobs=1, shard_points=2)
+        parallel, _ = differential.run_differential(seed=7, n_points=3, jobs=2, shard_points=2)
+        key = lambda r: [(s["shared_exponent_bits"], s["shard"], s["seed"], s["num_points"]) for s in r["shards"]]
+        self.assertEqual(key(serial), key(parallel))
+        self.assertEqual(serial["total_num_points"], parallel["total_num_points"])
+        self.assertEqual(parallel["num_jobs"], 2)
+
+    def test_mismatches_are_streamed_from_workers(self):
+        streamed = []
+        with patch.object(differential, "ulp_distance", lambda x, y: 1):
+            report, mismatches = differential.run_differential(
+                seed=1, n_points=1, jobs=2, on_mismatch=streamed.append
+            )
+        self.assertEqual(len(streamed), report["total_num_points"])
+        self.assertEqual(len(mismatches), report["num_mismatches"])
+        self.assertEqual(sum(s["num_mismatches"] for s in report["shards"]), len(mismatches))
+
 
 class TestPowSpecOp(unittest.TestCase):
     def test_if_constant_fold_prunes_nonliteral_branch(self):
@@ -8,6 +8,7 @@ from .components.UQ import *
 from .components.Float import *
 from .components.BFloat16 import *
 from .codegen import *
+from .sim import *
 from .utils import *
 from .egglog import *
 from .spec import *
@@ -1,10 +1,13 @@
 from .helpers import Copy, if_then_else
-from .node import Node
+from .node import Node, evaluation_checks
 from .nodes import Composite, Const, Op, Primitive, Var
+from .profiler import NodeStats, Profiler, profile_evaluation
 from .proofs import context
+from .serialize import DesignFormatError, dumps_design, load_design, loads_design, save_design
 
 __all__ = [
     "Node",
+    "evaluation_checks",
     "Composite",
     "Primitive",
     "Op",
@@ -12,5 +15,13 @@ __all__ = [
     "Var",
     "Copy",
     "if_then_else",
-    "context"
+    "context",
+    "NodeStats",
+    "Profiler",
+    "profile_evaluation",
+    "DesignFormatError",
+    "dumps_design",
+    "loads_design",
+    "save_design",
+    "load_design",
 ]
@@ -1,3 +1,5 @@
+import typing as tp
+
 from ..types.runtime import RuntimeType, Tuple
 from ..types.static import StaticType, TupleT
 from ..spec import BoolExpr, FPExpr, If, RealExpr
@@ -26,13 +28,21 @@ def _basic_get_item(x: Node, idx: int) -> Op:
         c_lowering=lambda lowered_args, jittable: f"{lowered_args[0]}[{idx}]" if jittable else f"std::get<{idx}>({lowered_args[0]})",
         args=[x],
         name=f"_basic_get_item_{idx}",
+        attrs={"idx": idx},
     )
 
+# One Primitive per index, so that instances can share elaborated inner trees
+_tuple_get_item_primitives: dict[int, tp.Callable[[Node], Node]] = {}
+
+
 def Tuple_get_item(x: Node, idx: int) -> Primitive:
-    @Primitive(name=f"Tuple_get_item_{idx}", spec=lambda x, ctx: x[idx], c_inline=True)
-    def impl(x: Node) -> Node:
-        return _basic_get_item(x, idx)
-    
+    impl = _tuple_get_item_primitives.get(idx)
+    if impl is None:
+        @Primitive(name=f"Tuple_get_item_{idx}", spec=lambda x, ctx: x[idx], c_inline=True)
+        def impl(x: Node) -> Node:
+            return _basic_get_item(x, idx)
+        
+        _tuple_get_item_primitives[idx] = impl
     return impl(x)
 
 def if_then_else_spec(sel, in1, in0, ctx):
@@ -1,5 +1,7 @@
+import hashlib
 import inspect
 import typing as tp
+from contextlib import contextmanager
 from contextvars import ContextVar
 
 from ..types.runtime import Bool, RuntimeType
@@ -11,6 +13,53 @@ def _is_static_type_annotation(annotation: tp.Any) -> bool:
     return isinstance(annotation, type) and issubclass(annotation, StaticType)
 
 
+# Checked (parameter annotations, return annotation) of signature functions by
+# _signature_key. Entries keep the keyed object alive, so that its id stays unique.
+_signature_cache: dict[tp.Any, tuple[tp.Any, tuple[tuple[tp.Any, ...], tp.Any]]] = {}
+
+
+def _node_digest(*fields: tp.Any) -> bytes:
+    """128-bit BLAKE2b digest of a node's own fields, which embed the digests of its children.
+
+    Fields are type fingerprints, names, rendered lowerings and child digests,
+    whose reprs are deterministic.
+    """
+    return hashlib.blake2b(repr(fields).encode(), digest_size=16).digest()
+
+
+def _signature_key(sign: tp.Callable[..., tp.Any]) -> tuple[tp.Any, tp.Any]:
+    # make_fixed_arguments wrappers share their __signature__ objects. Other signature
+    # functions are mostly closures created per node, identified by code and annotations.
+    sig = getattr(sign, "__signature__", None)
+    if sig is not None:
+        return id(sig), sig
+    code = getattr(sign, "__code__", None)
+    if code is None:
+        return None, None
+    key = (code, tuple(sign.__annotations__.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None, None
+    return key, code
+
+
+# None outside of evaluation and when no mode was requested explicitly
+_eval_checks: ContextVar[tp.Optional[bool]] = ContextVar("eval_checks", default=None)
+# Active profiler.Profiler, None unless inside profile_evaluation()
+_eval_profiler: ContextVar[tp.Optional[tp.Any]] = ContextVar("eval_profiler", default=None)
+
+
+@contextmanager
+def evaluation_checks(enabled: bool):
+    """Forces dynamic typechecks on (debug) or off (trusted) for every evaluate() inside."""
+    token = _eval_checks.set(enabled)
+    try:
+        yield
+    finally:
+        _eval_checks.reset(token)
+
+
 class Node:
     _eval_cache: ContextVar[tp.Optional[dict["Node", RuntimeType]]] = ContextVar(
         "eval_cache", default=None
@@ -29,31 +78,66 @@ class Node:
             raise TypeError(f"Node arguments must be Node instances, got {bad_args}")
         # Checks that signature's annotations are StaticType
         self._primitive_signature_check(sign)
+        self._init_fields(spec, impl, sign, args, name)
         
+        # Defines node_type at initialization - some parts rely on this
+        self._static_typecheck()
+    
+    ############## PRIVATE METHODS ###############
+    
+    def _init_fields(
+        self,
+        spec: tp.Callable[..., tp.Any],
+        impl: tp.Callable[..., RuntimeType],
+        sign: tp.Callable[..., StaticType],
+        args: list["Node"],
+        name: str,
+    ) -> None:
         # Wrapper for impl that makes sure that out always matches node_type
         def impl_wrapper(impl):
             def compute(inputs: list[RuntimeType]):
                 out = None
-                if self.node_type.runtime_val is not None:
-                    out = self.node_type.runtime_val  # constant-folded nodes are already checked for type
+                if self.runtime_val is not None:
+                    out = self.runtime_val  # constant-folded nodes are already checked for type
                 else:
                     out = impl(*inputs)
+                    if _eval_checks.get() is False:
+                        # Trusted mode: values are shared between nodes and must not be mutated
+                        return out
                     self._dynamic_typecheck(inputs=inputs, out=out)
+                if _eval_checks.get() is False:
+                    return out
                 return out.copy()
             
             return compute
         
         self.spec = spec
+        self.raw_impl = impl
         self.impl = impl_wrapper(impl)
         self.sign = sign
         self.args = args
         self.name = name
-        self._fingerprint_cache: dict[bool, tp.Any] = {}
-        
-        # Defines node_type at initialization - some parts rely on this
-        self._static_typecheck()
+        # Per-design default for evaluate(checked=...); None keeps dynamic typechecks
+        self.checked: tp.Optional[bool] = None
+        self._fingerprint_cache: dict[bool, bytes] = {}
+        # Constant-folded value of the node, None if it depends on a variable
+        self.runtime_val: tp.Optional[RuntimeType] = None
     
-    ############## PRIVATE METHODS ###############
+    def _restore_fields(
+        self,
+        spec: tp.Callable[..., tp.Any],
+        impl: tp.Callable[..., RuntimeType],
+        sign: tp.Callable[..., StaticType],
+        args: list["Node"],
+        name: str,
+        node_type: StaticType,
+        runtime_val: tp.Optional[RuntimeType],
+    ) -> None:
+        # Counterpart of __init__ for nodes that were already checked and folded, see serialize.py
+        self._init_fields(spec, impl, sign, args, name)
+        self.args_types = [x.node_type for x in args]
+        self.node_type = node_type
+        self.runtime_val = runtime_val
     
     def _evaluate_spec(self, ctx, cache):
         if self in cache:
@@ -64,19 +148,18 @@ class Node:
         return output
     
     def _static_typecheck(self):
-        # Clone to avoid sharing runtime_val/state across nodes.
-        self.args_types = [x.node_type.copy() for x in self.args]  # runtime_val is preserved
-        self.node_type = self.sign(*self.args_types).copy()
-        self.node_type.runtime_val = None  # Do not preserve runtime_val for output
+        # Static types are interned and immutable, so they are shared rather than copied
+        self.args_types = [x.node_type for x in self.args]
+        self.node_type = self.sign(*self.args_types)
         
         # Checks that signature does match with received args_types and node_type
         self._signature_match(args=self.args_types, out=self.node_type)
         
         # Constant folding
         # If all arguments are known at compile time - apply constant folding
-        args_ = [arg.runtime_val for arg in self.args_types]
+        args_ = [arg.runtime_val for arg in self.args]
         if all([val is not None for val in args_]) and args_ != []:
-            self.node_type.runtime_val = self.impl(args_)
+            self.runtime_val = self.impl(args_)
 
         return self.node_type
 
@@ -88,14 +171,13 @@ class Node:
                 f"  Required count: {len(self.args_types)}\n"
             )
 
-        err_msg = (
-            f"Arguments do not match Node's signature at {self.name}:\n"
-            f"  Given: {[x.static_type() for x in inputs]}\n"
-            f"  Required: {self.args_types}\n"
-        )
         for arg, arg_t in zip(inputs, self.args_types):
             if arg.static_type() != arg_t:
-                raise TypeError(err_msg)
+                raise TypeError(
+                    f"Arguments do not match Node's signature at {self.name}:\n"
+                    f"  Given: {[x.static_type() for x in inputs]}\n"
+                    f"  Required: {self.args_types}\n"
+                )
 
         if not isinstance(out, RuntimeType):
             raise TypeError(
@@ -104,73 +186,117 @@ class Node:
                 f"  expected-type: {self.node_type}\n"
             )
 
-        err_msg = (
-            f"Output does not match Node's signature at {self.name}:\n"
-            f"  impl: {out}\n"
-            f"  impl-type: {out.static_type()}\n"
-            f"  expected-type: {self.node_type}\n"
-        )
         if out.static_type() != self.node_type:
-            raise TypeError(err_msg)
+            raise TypeError(
+                f"Output does not match Node's signature at {self.name}:\n"
+                f"  impl: {out}\n"
+                f"  impl-type: {out.static_type()}\n"
+                f"  expected-type: {self.node_type}\n"
+            )
 
     def _primitive_signature_check(self, sign):
+        key, owner = _signature_key(sign)
+        entry = _signature_cache.get(key) if key is not None else None
+        if entry is not None and entry[0] is owner:
+            self._signature_annotations = entry[1]
+            return
+        
         sign = inspect.signature(sign)
-        err_msg = (
-            f"Signature contain types that are not an instance of StaticType!\n"
-            f"Given: {sign}\n"
-        )
         for param in sign.parameters.values():
             if not _is_static_type_annotation(param.annotation):
-                raise TypeError(err_msg)
+                raise TypeError(self._signature_check_msg(sign))
         if not _is_static_type_annotation(sign.return_annotation):
-            raise TypeError(err_msg)
+            raise TypeError(self._signature_check_msg(sign))
+        
+        annotations = (
+            tuple(param.annotation for param in sign.parameters.values()),
+            sign.return_annotation,
+        )
+        if key is not None:
+            _signature_cache[key] = (owner, annotations)
+        self._signature_annotations = annotations
+    
+    @staticmethod
+    def _signature_check_msg(sign: inspect.Signature) -> str:
+        return (
+            f"Signature contain types that are not an instance of StaticType!\n"
+            f"Given: {sign}\n"
+        )
 
     def _signature_match(self, args: list[StaticType], out: StaticType):
-        sign = inspect.signature(self.sign)
-        if len(args) != len(sign.parameters):
+        params, return_annotation = self._signature_annotations
+        if len(args) != len(params):
             raise TypeError(
                 f"Arguments to {self.name} do not match its signature\n"
                 f"Given count: {len(args)}\n"
-                f"Required count: {len(sign.parameters)}\n"
+                f"Required count: {len(params)}\n"
+            )
+        for param, arg_type in zip(params, args):
+            if not isinstance(arg_type, param):
+                raise TypeError(
+                    f"Arguments to {self.name} do not match its signature\n"
+                    f"Given: {args}\n"
+                    f"Required: {list(params)}\n"
+                )
+        if not isinstance(out, return_annotation):
+            raise TypeError(
+                f"Output from {self.name} does not match its signature\n"
+                f"Given: {out}\n"
+                f"Required: {return_annotation}"
             )
-        args_msg = (
-            f"Arguments to {self.name} do not match its signature\n"
-            f"Given: {args}\n"
-            f"Required: {[param.annotation for param in sign.parameters.values()]}\n"
-        )
-        for param, arg_type in zip(sign.parameters.values(), args):
-            if not isinstance(arg_type, param.annotation):
-                raise TypeError(args_msg)
-        output_msg = (
-            f"Output from {self.name} does not match its signature\n"
-            f"Given: {out}\n"
-            f"Required: {sign.return_annotation}"
-        )
-        if not isinstance(out, sign.return_annotation):
-            raise TypeError(output_msg)
 
     ################ PUBLIC API ##################
 
-    def _fingerprint(self, jittable: bool = False):
+    def _fingerprint(self, jittable: bool = False) -> bytes:
+        """Fixed-size Merkle digest of the node, identifying it for codegen dedup and compile caches."""
         raise NotImplementedError
 
     def _cached_fingerprint(
         self,
         jittable: bool = False,
-        build: tp.Callable[[], tp.Any] | None = None,
-    ):
+        build: tp.Callable[[], tuple[tp.Any, ...]] | None = None,
+    ) -> bytes:
+        # Computed once per node: parents hash the 16-byte digests of their children
         if jittable in self._fingerprint_cache:
             return self._fingerprint_cache[jittable]
-        fingerprint = build()
+        fingerprint = _node_digest(*build())
         self._fingerprint_cache[jittable] = fingerprint
         return fingerprint
 
-    def to_cpp(self, name=None, jittable: bool = True):
+    def to_cpp(self, name=None, jittable: bool = True, optimize: bool = True, batch: bool = False):
         from ..codegen import lower_to_cpp
         if name is None:
-            return lower_to_cpp(self, jittable=jittable)
+            return lower_to_cpp(self, jittable=jittable, optimize=optimize, batch=batch)
         else:
-            return lower_to_cpp(self, name, jittable=jittable)
+            return lower_to_cpp(self, name, jittable=jittable, optimize=optimize, batch=batch)
+    
+    def compile_plan(self, optimize: bool = True):
+        from ..sim import compile_plan
+        return compile_plan(self, optimize=optimize)
+    
+    def compile_bitslice(self, optimize: bool = True):
+        from ..sim import compile_bitslice
+        return compile_bitslice(self, optimize=optimize)
+    
+    def compile_incremental(self, optimize: bool = True):
+        from ..sim import compile_incremental
+        return compile_incremental(self, optimize=optimize)
+    
+    def estimate_cost(self, optimize: bool = True):
+        from ..sim import estimate_cost
+        return estimate_cost(self, optimize=optimize)
+    
+    def evaluate_batch(self):
+        from ..sim import evaluate_batch
+        return evaluate_batch(self)
+    
+    def evaluate_bitslice(self):
+        from ..sim import evaluate_bitslice
+        return evaluate_bitslice(self)
+    
+    def evaluate_incremental(self):
+        from ..sim import evaluate_incremental
+        return evaluate_incremental(self)
     
     def copy(self):
         from .helpers import Copy
@@ -180,7 +306,18 @@ class Node:
         from .helpers import Tuple_get_item
         return Tuple_get_item(self, idx)
     
-    def evaluate(self, cache: tp.Optional[dict["Node", RuntimeType]] = None) -> RuntimeType:
+    def evaluate(
+        self,
+        cache: tp.Optional[dict["Node", RuntimeType]] = None,
+        checked: tp.Optional[bool] = None,
+    ) -> RuntimeType:
+        # checked=False skips dynamic typechecks and defensive copies of RuntimeType values.
+        # Precedence: this argument, then evaluation_checks(), then self.checked of the
+        # outermost evaluated node; nested evaluations inherit the mode.
+        if checked is None and _eval_checks.get() is None and self.checked is not None:
+            checked = self.checked
+        checks_token = _eval_checks.set(checked) if checked is not None else None
+        
         # Use a per-evaluation cache to avoid recomputing shared subtrees.
         # Cache lives only for the current call chain.
         active_cache = cache if cache is not None else self._eval_cache.get()
@@ -190,11 +327,19 @@ class Node:
         
         try:
             # Cache hit
+            profiler = _eval_profiler.get()
             if self in active_cache:
+                if profiler is not None:
+                    profiler.record_hit(self)
+                if _eval_checks.get() is False:
+                    return active_cache[self]
                 return active_cache[self].copy()
             
             inputs = [arg.evaluate(active_cache) for arg in self.args]
-            out = self.impl(inputs)
+            if profiler is None:
+                out = self.impl(inputs)
+            else:
+                out = profiler.record_call(self, self.impl, inputs)
             active_cache[self] = out
             
             return out
@@ -202,6 +347,8 @@ class Node:
         finally:
             # Erase current cache
             self._eval_cache.reset(token)
+            if checks_token is not None:
+                _eval_checks.reset(checks_token)
 
     def print_tree(self, prefix: str = "", is_last: bool = True, depth: int = 0):
         raise NotImplementedError
@@ -1,13 +1,18 @@
 import typing as tp
 import random
+import types
+from contextlib import contextmanager
+from contextvars import ContextVar
 from itertools import product
 
+import numpy as np
+
 from ..types.runtime import RuntimeType
-from ..types.static import StaticType
+from ..types.static import StaticType, TupleT
 from ..utils import make_fixed_arguments
 from ..solver.engine import check_equivalence as _solver_check_equivalence
-from .node import Node
-from .proofs import SpecRecorder, record_specs
+from .node import Node, _eval_checks
+from .proofs import SpecRecorder, _current_recorder, record_specs
 from ..spec import FPExpr, SpecContext
 from ..spec.spec_context import simplify_ctx
 
@@ -15,6 +20,115 @@ from ..spec.spec_context import simplify_ctx
 CLowering = tp.Callable[[list[str], bool], str]
 
 
+# While elaborating a Primitive or Composite, structurally identical Op/Const nodes
+# are shared and inner trees are reused between instances with the same argument
+# types. The table only lives for the outermost elaboration, so nodes built by the
+# user at top level stay distinct and can carry their own state.
+_elaboration_table: ContextVar[tp.Optional[dict[tp.Any, tp.Any]]] = ContextVar("elaboration_table", default=None)
+
+
+@contextmanager
+def _elaboration_scope():
+    if _elaboration_table.get() is not None:
+        yield
+        return
+    token = _elaboration_table.set({})
+    try:
+        yield
+    finally:
+        _elaboration_table.reset(token)
+
+
+def _elaborate(
+    kind: type,
+    name: str,
+    impl: tp.Callable[..., Node],
+    args: list[Node],
+    build: tp.Callable[[list["Var"]], tp.Any],
+) -> tuple[list["Var"], tp.Any]:
+    """Returns inner args and build(inner args), reusing an instance with the same argument types.
+
+    The inner tree only sees Vars of the argument types, so it does not depend
+    on the argument nodes themselves. Instances share it and rebind the Vars
+    on every evaluation.
+    """
+    table = _elaboration_table.get()
+    key = ("Template", kind, name, impl, tuple(x.node_type for x in args))
+    if table is not None and key in table:
+        return table[key]
+    
+    # Spec blocks inside a Primitive are recorded into the enclosing Composite
+    recorder = _current_recorder.get()
+    blocks = recorder.blocks if recorder is not None else 0
+    inner_args = [Var(name=f"arg_{i}", sign=x.node_type) for i, x in enumerate(args)]
+    with _elaboration_scope():
+        template = (inner_args, build(inner_args))
+    if table is not None and (recorder is None or recorder.blocks == blocks):
+        table[key] = template
+    return template
+
+
+class _HashConsed(type):
+    def _hash_consed(cls, node: Node, key: tp.Any) -> None:
+        # Called with every node entered into the table; classes override it to keep
+        # parts of the key that are costly to compute again, see Op
+        pass
+    
+    def __call__(cls, *args, **kwargs):
+        table = _elaboration_table.get()
+        if table is None:
+            return super().__call__(*args, **kwargs)
+        key = cls._hash_cons_key(*args, **kwargs)
+        if key is None:
+            return super().__call__(*args, **kwargs)
+        node = table.get(key)
+        if node is None:
+            node = table[key] = super().__call__(*args, **kwargs)
+            cls._hash_consed(node, key)
+        return node
+
+
+def _callable_key(func: tp.Any, seen: frozenset[int] = frozenset()) -> tp.Any:
+    # Code and captured values of a function, so that closures created by the same
+    # lambda over different values differ; raises TypeError for unhashable captures
+    if not isinstance(func, types.FunctionType):
+        hash(func)
+        return (type(func), func)
+    if id(func) in seen:
+        return ("recursive", func.__code__)
+    seen = seen | {id(func)}
+    cells = []
+    for cell in func.__closure__ or ():
+        try:
+            cells.append(_callable_key(cell.cell_contents, seen))
+        except ValueError:
+            cells.append(("empty",))
+    defaults = tuple(_callable_key(value, seen) for value in func.__defaults__ or ())
+    return (func.__code__, tuple(cells), defaults)
+
+
+def _op_identity(impl, sign, name, c_lowering, attrs, arity: int) -> tp.Any:
+    """Hashable identity of an Op apart from its arguments, None if it can not be compared.
+
+    Covers the name, the static parameters, both renderings of the C lowering
+    (like `_fingerprint`) and the code and captured values of impl and sign.
+    """
+    try:
+        attrs_key = tuple(sorted(attrs.items())) if attrs else ()
+        functions_key = (_callable_key(impl), _callable_key(sign))
+        hash((attrs_key, functions_key))
+    except TypeError:
+        return None
+    lowerings = None
+    if c_lowering is not None:
+        placeholders = [f"${idx}" for idx in range(arity)]
+        try:
+            lowerings = tuple(c_lowering(placeholders, jittable) for jittable in (False, True))
+        except Exception:
+            return None
+    return (name, attrs_key, lowerings, functions_key)
+
+
 class _Spec(tp.NamedTuple):
     name: str
     collect: tp.Callable[[SpecContext], tp.Any]
@@ -355,19 +469,50 @@ class composite(Node):
     ):
         self.c_inline = c_inline
         self.c_lowering = c_lowering
-        self.ctx = SpecContext(name)
-        self.inner_args = [Var(name=f"arg_{i}", sign=x.node_type.copy()) for i, x in enumerate(args)]
         
-        recorder = SpecRecorder(self.ctx)
-        with record_specs(recorder):
-            self.inner_tree = impl(*self.inner_args)
-        
-        self._validate_components(name)
+        def build(inner_args):
+            ctx = SpecContext(name)
+            with record_specs(SpecRecorder(ctx)):
+                inner_tree = impl(*inner_args)
+            self._validate_components(name, inner_tree)
+            return ctx, inner_tree
         
+        self.inner_args, (self.ctx, self.inner_tree) = _elaborate(composite, name, impl, args, build)
+        self._init_node(spec, args, name)
+    
+    @classmethod
+    def _restore(
+        cls,
+        spec: tp.Callable[..., tp.Any],
+        args: list[Node],
+        name: str,
+        c_inline: bool,
+        c_lowering: tp.Optional[CLowering],
+        inner_args: list["Var"],
+        inner_tree: Node,
+        ctx: SpecContext,
+        runtime_val: tp.Optional[RuntimeType],
+    ) -> "composite":
+        # Rebuilds an instance around an already elaborated inner tree, see serialize.py
+        self = cls.__new__(cls)
+        self.c_inline = c_inline
+        self.c_lowering = c_lowering
+        self.inner_args, self.ctx, self.inner_tree = inner_args, ctx, inner_tree
+        self._init_node(spec, args, name, restored=(inner_tree.node_type, runtime_val))
+        return self
+    
+    def _init_node(
+        self,
+        spec: tp.Callable[..., tp.Any],
+        args: list[Node],
+        name: str,
+        restored: tp.Optional[tuple[StaticType, tp.Optional[RuntimeType]]] = None,
+    ) -> None:
         def impl_(*args):
             for var, arg in zip(self.inner_args, args):
-                var.load_val(arg)
-            return self.inner_tree.evaluate()
+                var.bind_val(arg)
+            # Fresh cache: the inner tree may be shared with other instances
+            return self.inner_tree.evaluate(cache={})
         
         # Signature is obtained from the inner tree
         def sign(*args):
@@ -379,6 +524,9 @@ class composite(Node):
             return_type=type(self.inner_tree.node_type),
         )
         
+        if restored is not None:
+            self._restore_fields(spec, impl_, sign, args, name, *restored)
+            return
         super().__init__(
             spec=spec,
             impl=impl_,
@@ -411,7 +559,7 @@ class composite(Node):
     ):
         return _check_determinism(self, schedule=schedule)
     
-    def _validate_components(self, composite_name: str) -> None:
+    def _validate_components(self, composite_name: str, inner_tree: Node) -> None:
         visited: set[Node] = set()
         
         def visit(node: Node, path: str) -> None:
@@ -432,7 +580,7 @@ class composite(Node):
                 f"found {type(node).__name__} {node.name!r} at {path}"
             )
         
-        visit(self.inner_tree, f"{composite_name}.impl")
+        visit(inner_tree, f"{composite_name}.impl")
     
     def print_tree(self, prefix: str = "", is_last: bool = True, depth: int = 0):
         connector = "└── " if is_last else "├── "
@@ -462,7 +610,9 @@ class composite(Node):
             return (
                 type(self).__name__,
                 self.name,
+                self.c_inline,
                 self.node_type._fingerprint(),
+                None if self.runtime_val is None else self.runtime_val._fingerprint(),
                 tuple(arg.node_type._fingerprint() for arg in self.inner_args),
                 direct_cpp_lowering,
                 self.inner_tree._fingerprint(jittable) if direct_cpp_lowering is None else None,
@@ -503,15 +653,44 @@ class primitive(Node):
         self.c_inline = c_inline
         self.c_lowering = c_lowering
         # Args will preserve runtime values of arguments
-        self.inner_args = [Var(name=f"arg_{i}", sign=x.node_type.copy()) for i, x in enumerate(args)]
-        
-        self.inner_tree = impl(*self.inner_args)
-        
+        self.inner_args, self.inner_tree = _elaborate(
+            primitive, name, impl, args, lambda inner_args: impl(*inner_args)
+        )
+        self._init_node(spec, args, name)
+    
+    @classmethod
+    def _restore(
+        cls,
+        spec: tp.Callable[..., tp.Any],
+        args: list[Node],
+        name: str,
+        c_inline: bool,
+        c_lowering: tp.Optional[CLowering],
+        inner_args: list["Var"],
+        inner_tree: Node,
+        runtime_val: tp.Optional[RuntimeType],
+    ) -> "primitive":
+        # Rebuilds an instance around an already elaborated inner tree, see serialize.py
+        self = cls.__new__(cls)
+        self.c_inline = c_inline
+        self.c_lowering = c_lowering
+        self.inner_args, self.inner_tree = inner_args, inner_tree
+        self._init_node(spec, args, name, restored=(inner_tree.node_type, runtime_val))
+        return self
+    
+    def _init_node(
+        self,
+        spec: tp.Callable[..., tp.Any],
+        args: list[Node],
+        name: str,
+        restored: tp.Optional[tuple[StaticType, tp.Optional[RuntimeType]]] = None,
+    ) -> None:
         def impl_(*args):
             for var, arg in zip(self.inner_args, args):
                 if isinstance(var, Var):
-                    var.load_val(arg)
-            return self.inner_tree.evaluate()
+                    var.bind_val(arg)
+            # Fresh cache: the inner tree may be shared with other instances
+            return self.inner_tree.evaluate(cache={})
         
         # Signature is obtained from the inner tree
         def sign(*args):
@@ -523,6 +702,9 @@ class primitive(Node):
             return_type=type(self.inner_tree.node_type),
         )
         
+        if restored is not None:
+            self._restore_fields(spec, impl_, sign, args, name, *restored)
+            return
         super().__init__(
             spec=spec,
             impl=impl_,
@@ -565,7 +747,9 @@ class primitive(Node):
             return (
                 type(self).__name__,
                 self.name,
+                self.c_inline,
                 self.node_type._fingerprint(),
+                None if self.runtime_val is None else self.runtime_val._fingerprint(),
                 tuple(arg.node_type._fingerprint() for arg in self.inner_args),
                 direct_cpp_lowering,
                 self.inner_tree._fingerprint(jittable) if direct_cpp_lowering is None else None,
@@ -574,7 +758,19 @@ class primitive(Node):
         return self._cached_fingerprint(jittable, build)
 
 
-class Op(Node):
+class Op(Node, metaclass=_HashConsed):
+    @staticmethod
+    def _hash_cons_key(impl, sign, args, name, c_lowering, attrs=None):
+        identity = _op_identity(impl, sign, name, c_lowering, attrs, len(args))
+        if identity is None:
+            return None
+        return ("Op", identity, tuple(args))
+    
+    @staticmethod
+    def _hash_consed(node: "Op", key: tp.Any) -> None:
+        # The identity renders the lowerings and walks the closures, CSE reuses it
+        node._cached_identity = key[1]
+    
     def __init__(
         self,
         impl: tp.Callable[..., RuntimeType],
@@ -582,8 +778,11 @@ class Op(Node):
         args: list[Node],
         name: str,
         c_lowering: tp.Optional[CLowering],
+        attrs: tp.Optional[dict[str, tp.Any]] = None,
     ):
         self.c_lowering = c_lowering
+        # Static parameters of the operation that are not visible from its argument types
+        self.attrs = dict(attrs) if attrs is not None else {}
         super().__init__(
             spec=None,
             impl=impl,
@@ -592,6 +791,35 @@ class Op(Node):
             name=name,
         )
     
+    @classmethod
+    def _restore(
+        cls,
+        impl: tp.Callable[..., RuntimeType],
+        sign: tp.Callable[..., StaticType],
+        args: list[Node],
+        name: str,
+        c_lowering: tp.Optional[CLowering],
+        attrs: dict[str, tp.Any],
+        node_type: StaticType,
+        runtime_val: tp.Optional[RuntimeType],
+    ) -> "Op":
+        # Rebuilds an already checked and folded Op without hash-consing, see serialize.py
+        self = cls.__new__(cls)
+        self.c_lowering = c_lowering
+        self.attrs = dict(attrs)
+        self._restore_fields(None, impl, sign, args, name, node_type, runtime_val)
+        return self
+    
+    def _identity(self) -> tp.Any:
+        """See `_op_identity`; kept from hash-consing or computed on first use."""
+        try:
+            return self._cached_identity
+        except AttributeError:
+            self._cached_identity = _op_identity(
+                self.raw_impl, self.sign, self.name, self.c_lowering, self.attrs, len(self.args)
+            )
+            return self._cached_identity
+    
     def print_tree(self, prefix: str = "", is_last: bool = True, depth: int = 0):
         connector = "└── " if is_last else "├── "
         print(prefix + connector + self.__str__())
@@ -615,6 +843,7 @@ class Op(Node):
                 "Op",
                 self.name,
                 self.node_type._fingerprint(),
+                None if self.runtime_val is None else self.runtime_val._fingerprint(),
                 lowering_fingerprint,
                 tuple(arg._fingerprint(jittable) for arg in self.args),
             )
@@ -622,7 +851,11 @@ class Op(Node):
         return self._cached_fingerprint(jittable, build)
 
 
-class Const(Node):
+class Const(Node, metaclass=_HashConsed):
+    @staticmethod
+    def _hash_cons_key(val):
+        return ("Const", val._fingerprint())
+    
     def __init__(
         self,
         val: RuntimeType,
@@ -646,7 +879,7 @@ class Const(Node):
             name=str(self.val.to_val()),
         )
         
-        self.node_type.runtime_val = self.val.copy()  # Constant folding
+        self.runtime_val = self.val.copy()  # Constant folding
     
     def print_tree(self, prefix: str = "", is_last: bool = True, depth: int = 0):
         connector = "└── " if is_last else "├── "
@@ -665,6 +898,7 @@ class Const(Node):
 class Var(Node):
     def __init__(self, name: str, sign: StaticType):
         self.val = None
+        self.batch: tp.Optional[np.ndarray] = None
         
         def impl():
             if self.val is None:
@@ -701,6 +935,38 @@ class Var(Node):
             raise TypeError(f"Var's val does not match signature {self.sign()}, {val.static_type()} is provided")
         self.val = val
     
+    def bind_val(self, val: RuntimeType):
+        # Internal binding of Composite/Primitive arguments; trusted evaluation skips the checks
+        if _eval_checks.get() is False:
+            self.val = val
+        else:
+            self.load_val(val)
+    
+    def load_batch(self, vals: np.ndarray):
+        """Binds an array of raw bit patterns for Node.evaluate_batch().
+
+        Values wider than 64 bits are given either as Python ints or as an
+        (N, k) array of uint64 limbs, least significant limb first.
+        """
+        from ..sim.limbs import LIMB_BITS, ints_to_limbs, limbs_to_ints, n_limbs
+        sign = self.sign()
+        if isinstance(sign, TupleT):
+            raise TypeError(f"Var {self.name} of tuple type {sign} can not be bound to a batch")
+        bits = sign.total_bits()
+        vals = np.asarray(vals)
+        if bits > LIMB_BITS and vals.ndim == 2:
+            if vals.shape[1] != n_limbs(bits) or not np.issubdtype(vals.dtype, np.unsignedinteger):
+                raise TypeError(f"Var's batch must be an (N, {n_limbs(bits)}) unsigned limb array, {vals.dtype} array of shape {vals.shape} is provided")
+            vals = vals.astype(np.uint64)
+            ints = limbs_to_ints(vals)
+        elif vals.ndim == 1 and (np.issubdtype(vals.dtype, np.integer) or (vals.dtype == object and all(isinstance(x, int) for x in vals))):
+            ints = vals.tolist()
+        else:
+            raise TypeError(f"Var's batch must be a 1-D integer array, {vals.dtype} array of shape {vals.shape} is provided")
+        if ints and (min(ints) < 0 or max(ints) >= 1 << bits):
+            raise ValueError(f"Var's batch does not fit into {bits} bits of {sign}")
+        self.batch = ints_to_limbs(ints, bits) if bits > LIMB_BITS else vals.astype(np.uint64)
+    
     def __str__(self):
         return f"{self.node_type}: {self.name} [Var]"
     
@@ -0,0 +1,205 @@
+import json
+import time
+import typing as tp
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from ..types.runtime import RuntimeType
+from .node import Node, _eval_profiler
+from .nodes import composite, primitive
+
+
+@dataclass
+class NodeStats:
+    """Counters of one node, or of a group of nodes in aggregated reports."""
+    calls: int = 0  # impl executions
+    hits: int = 0  # evaluations served from the evaluation cache
+    total_s: float = 0.0  # impl time, including the inner tree of Composites/Primitives
+    self_s: float = 0.0  # impl time, excluding impls of nested nodes
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.calls + self.hits
+        return self.hits / lookups if lookups else 0.0
+
+    def merge(self, other: "NodeStats") -> None:
+        self.calls += other.calls
+        self.hits += other.hits
+        self.total_s += other.total_s
+        self.self_s += other.self_s
+
+
+def node_kind(node: Node) -> str:
+    if isinstance(node, composite):
+        return "Composite"
+    if isinstance(node, primitive):
+        return "Primitive"
+    return type(node).__name__
+
+
+class Profiler:
+    """Per-node evaluation profile collected by Node.evaluate() around impl calls.
+
+    Time of a Composite/Primitive includes its inner tree, so rows are usually
+    sorted by self time to find hot spots.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: dict[Node, NodeStats] = {}
+        # Time spent in nested impls for every impl currently on the stack
+        self._children_s: list[float] = []
+
+    def _stats(self, node: Node) -> NodeStats:
+        stats = self.nodes.get(node)
+        if stats is None:
+            stats = self.nodes[node] = NodeStats()
+        return stats
+
+    def record_call(
+        self,
+        node: Node,
+        compute: tp.Callable[[list[RuntimeType]], RuntimeType],
+        inputs: list[RuntimeType],
+    ) -> RuntimeType:
+        self._children_s.append(0.0)
+        start = time.perf_counter()
+        try:
+            return compute(inputs)
+        finally:
+            elapsed = time.perf_counter() - start
+            children_s = self._children_s.pop()
+            if self._children_s:
+                self._children_s[-1] += elapsed
+            stats = self._stats(node)
+            stats.calls += 1
+            stats.total_s += elapsed
+            stats.self_s += elapsed - children_s
+
+    def record_hit(self, node: Node) -> None:
+        self._stats(node).hits += 1
+
+    def reset(self) -> None:
+        self.nodes.clear()
+
+    def stats(self, by: str = "name") -> dict[tp.Any, NodeStats]:
+        """Aggregates counters by "name", "kind" ((kind, name) pairs) or "node"."""
+        if by == "node":
+            return dict(self.nodes)
+        if by not in ("name", "kind"):
+            raise ValueError(f"Unknown grouping {by!r}, expected 'name', 'kind' or 'node'")
+        groups: dict[tp.Any, NodeStats] = {}
+        for node, stats in self.nodes.items():
+            key = node.name if by == "name" else (node_kind(node), node.name)
+            groups.setdefault(key, NodeStats()).merge(stats)
+        return groups
+
+    def rows(self, by: str = "name", sort: str = "self_s") -> list[dict[str, tp.Any]]:
+        rows = []
+        for key, stats in self.stats(by).items():
+            if by == "node":
+                row = {"kind": node_kind(key), "name": key.name, "id": id(key)}
+            elif by == "kind":
+                row = {"kind": key[0], "name": key[1]}
+            else:
+                row = {"name": key}
+            row.update(
+                calls=stats.calls,
+                hits=stats.hits,
+                hit_rate=stats.hit_rate,
+                total_s=stats.total_s,
+                self_s=stats.self_s,
+            )
+            rows.append(row)
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows
+
+    def to_json(self, by: str = "name", sort: str = "self_s") -> str:
+        return json.dumps(self.rows(by, sort), indent=2)
+
+    def table(self, by: str = "name", sort: str = "self_s", limit: tp.Optional[int] = None) -> str:
+        rows = self.rows(by, sort)[:limit]
+        total_self_s = sum(stats.self_s for stats in self.nodes.values()) or 1.0
+        label = "kind/name" if by != "name" else "name"
+        names = [row["name"] if by == "name" else f"{row['kind']} {row['name']}" for row in rows]
+        width = max([len(label), *(len(name) for name in names)])
+        lines = [
+            f"{label:<{width}}  {'calls':>8}  {'hits':>8}  {'hit %':>6}  {'total s':>10}  {'self s':>10}  {'self %':>6}"
+        ]
+        for name, row in zip(names, rows):
+            lines.append(
+                f"{name:<{width}}  {row['calls']:>8}  {row['hits']:>8}  {100 * row['hit_rate']:>6.1f}"
+                f"  {row['total_s']:>10.6f}  {row['self_s']:>10.6f}  {100 * row['self_s'] / total_self_s:>6.1f}"
+            )
+        return "\n".join(lines)
+
+    def to_dot(self, root: Node, top: int = 10, inline: bool = False) -> str:
+        """DOT graph of the design with the `top` nodes by self time highlighted.
+
+        With inline=True the inner trees of Composites/Primitives are drawn as
+        clusters, otherwise they are collapsed into a single node.
+        """
+        # Only drawn nodes are ranked, inner nodes of collapsed Composites/Primitives are not
+        drawn: set[Node] = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node in drawn:
+                continue
+            drawn.add(node)
+            stack.extend(node.args)
+            if inline and isinstance(node, (composite, primitive)):
+                stack.append(node.inner_tree)
+        hot = sorted(
+            (node for node in self.nodes if node in drawn),
+            key=lambda node: self.nodes[node].self_s,
+            reverse=True,
+        )[:top]
+        max_self_s = max((self.nodes[node].self_s for node in hot), default=0.0) or 1.0
+        hot_set = set(hot)
+        ids: dict[Node, str] = {}
+        lines = ["digraph profile {", "  node [shape=box, style=filled, fillcolor=white];"]
+
+        def label(node: Node) -> str:
+            text = f"{node.name}\\n{node_kind(node)}"
+            stats = self.nodes.get(node)
+            if stats is not None:
+                text += f"\\ncalls={stats.calls} hits={stats.hits}\\nself={stats.self_s * 1e3:.3f} ms"
+            return text
+
+        def visit(node: Node, indent: str) -> str:
+            if node in ids:
+                return ids[node]
+            node_id = ids[node] = f"n{len(ids)}"
+            attrs = f'label="{label(node)}"'
+            if node in hot_set:
+                heat = self.nodes[node].self_s / max_self_s
+                # White to red by share of the hottest node's self time
+                channel = int(255 * (1.0 - heat))
+                attrs += f', fillcolor="#ff{channel:02x}{channel:02x}"'
+            if inline and isinstance(node, (composite, primitive)):
+                lines.append(f"{indent}subgraph cluster_{node_id} {{")
+                lines.append(f'{indent}  label="{node.name}";')
+                lines.append(f"{indent}  {node_id} [{attrs}];")
+                inner = visit(node.inner_tree, indent + "  ")
+                lines.append(f"{indent}  {inner} -> {node_id} [style=dashed];")
+                lines.append(f"{indent}}}")
+            else:
+                lines.append(f"{indent}{node_id} [{attrs}];")
+            for arg in node.args:
+                lines.append(f"{indent}{visit(arg, indent)} -> {node_id};")
+            return node_id
+
+        visit(root, "  ")
+        lines.append("}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile_evaluation(profiler: tp.Optional[Profiler] = None) -> tp.Iterator[Profiler]:
+    """Profiles every evaluate() inside the block."""
+    profiler = profiler if profiler is not None else Profiler()
+    token = _eval_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _eval_profiler.reset(token)
@@ -7,6 +7,8 @@ from contextvars import ContextVar
 class SpecRecorder:
     def __init__(self, ctx: SpecContext):
         self.ctx = ctx
+        # Number of spec blocks recorded so far
+        self.blocks = 0
 
 _current_recorder: ContextVar[SpecRecorder | None] = ContextVar(
     "current_spec_recorder", default=None
@@ -36,6 +38,7 @@ def context():
     if _current_stage.get() is not None:
         raise RuntimeError(f"Nested spec blocks are not supported")
     
+    recorder.blocks += 1
     stage_token = _current_stage.set(True)
     try:
         yield recorder.ctx
@@ -0,0 +1,438 @@
+"""Versioned on-disk format of elaborated designs.
+
+A design is stored as a table of nodes in topological order, pickled into a
+single stream so that types, values and callables shared between nodes are
+stored once. Nodes refer to each other by table index. Python callables are
+stored by module, qualified name and code identity together with their
+closure values, so loading rebuilds the graph without running the
+Primitive/Composite impls again. Source digests of the referenced modules
+are checked on load, a design saved against different sources is rejected.
+Loading unpickles the file, so only designs from trusted sources should be loaded.
+"""
+import hashlib
+import importlib
+import io
+import pickle
+import sys
+import types
+import typing as tp
+import zlib
+from pathlib import Path
+
+from ..spec import SpecContext
+from .node import Node
+from .nodes import Const, Op, Var, composite, primitive
+
+MAGIC = b"ZOLOTONE-DESIGN\n"
+FORMAT_VERSION = 1
+
+
+class DesignFormatError(ValueError):
+    pass
+
+
+############ Callable references ###########
+
+_CodeKey = tuple[str, int, str]
+
+# module name -> code objects of the functions defined in it found so far, see _find_code
+_code_index: dict[str, dict[_CodeKey, types.CodeType]] = {}
+_scanned_modules: set[str] = set()
+
+# Closure cells that are stored as markers instead of values
+_EMPTY_CELL = "empty"
+_SELF_CELL = "self"
+
+
+def _code_key(code: types.CodeType) -> _CodeKey:
+    # Line numbers tell apart lambdas of one scope, the digest tells apart lambdas of one line
+    digest = hashlib.blake2b(code.co_code, digest_size=8)
+    digest.update("\0".join(code.co_names).encode())
+    return code.co_qualname, code.co_firstlineno, digest.hexdigest()
+
+
+def _index_codes(module_name: str, roots: list[tp.Any], codes: dict[_CodeKey, types.CodeType]) -> None:
+    seen: set[int] = set()
+
+    def add_code(code: types.CodeType) -> None:
+        codes.setdefault(_code_key(code), code)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                add_code(const)
+
+    def visit(obj: tp.Any, depth: int) -> None:
+        if depth > 4 or id(obj) in seen:
+            return
+        seen.add(id(obj))
+        if isinstance(obj, types.FunctionType):
+            if obj.__module__ == module_name:
+                add_code(obj.__code__)
+            for cell in obj.__closure__ or ():
+                try:
+                    visit(cell.cell_contents, depth + 1)
+                except ValueError:
+                    pass  # empty cell
+        elif isinstance(obj, (staticmethod, classmethod)):
+            visit(obj.__func__, depth)
+        elif isinstance(obj, property):
+            for accessor in (obj.fget, obj.fset, obj.fdel):
+                visit(accessor, depth)
+        elif isinstance(obj, type) and obj.__module__ == module_name:
+            for value in list(vars(obj).values()):
+                visit(value, depth + 1)
+        elif isinstance(obj, (list, tuple)):
+            for value in obj:
+                visit(value, depth + 1)
+        elif isinstance(obj, dict):
+            for value in list(obj.values()):
+                visit(value, depth + 1)
+
+    for root in roots:
+        visit(root, 0)
+
+
+def _find_code(module_name: str, key: _CodeKey) -> tp.Optional[types.CodeType]:
+    """Code object of a function defined in a module, including nested functions and lambdas.
+
+    Functions are looked up from the module attribute their qualified name
+    starts with. Module-level lambdas are not kept by the module itself, they
+    are found by scanning the closures of all module attributes, e.g. the
+    spec of a Primitive in its decorator.
+    """
+    codes = _code_index.setdefault(module_name, {})
+    code = codes.get(key)
+    if code is not None:
+        return code
+    module = importlib.import_module(module_name)
+    _index_codes(module_name, [getattr(module, key[0].split(".")[0], None)], codes)
+    if key not in codes and module_name not in _scanned_modules:
+        _scanned_modules.add(module_name)
+        _index_codes(module_name, list(vars(module).values()), codes)
+    return codes.get(key)
+
+
+def _module_digest(module_name: str) -> tp.Optional[str]:
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if path is None:
+        return None
+    return hashlib.blake2b(Path(path).read_bytes(), digest_size=16).hexdigest()
+
+
+def _is_importable(func: types.FunctionType) -> bool:
+    if "<locals>" in func.__qualname__ or func.__module__ is None:
+        return False
+    obj: tp.Any = sys.modules.get(func.__module__)
+    for part in func.__qualname__.split("."):
+        obj = getattr(obj, part, None)
+    return obj is func
+
+
+def _load_function(
+    module_name: str,
+    key: _CodeKey,
+    name: str,
+    defaults: tp.Optional[tuple],
+    kwdefaults: tp.Optional[dict],
+    closure: tp.Optional[tuple],
+    markers: dict[int, str],
+    attrs: dict[str, tp.Any],
+) -> types.FunctionType:
+    code = _find_code(module_name, key)
+    if code is None:
+        raise DesignFormatError(f"Function {module_name}.{key[0]} (line {key[1]}) no longer exists")
+    cells = None
+    if closure is not None:
+        cells = tuple(
+            types.CellType() if idx in markers else types.CellType(value)
+            for idx, value in enumerate(closure)
+        )
+    func = types.FunctionType(code, sys.modules[module_name].__dict__, name, defaults, cells)
+    for idx, marker in markers.items():
+        if marker == _SELF_CELL:
+            cells[idx].cell_contents = func
+    func.__kwdefaults__ = kwdefaults
+    func.__qualname__ = key[0]
+    for attr, value in attrs.items():
+        setattr(func, attr, value)
+    return func
+
+
+############ Pickling ###########
+
+def _same(obj: tp.Any) -> tp.Any:
+    return obj
+
+
+# Closure values compared by value when merging functions, everything else is compared by identity
+_VALUE_TYPES = (int, str, bytes, bool, type(None))
+
+
+class _DesignPickler(pickle.Pickler):
+    def __init__(self, file: tp.BinaryIO, index: dict[Node, int]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.index = index
+        self.modules: set[str] = set()
+        # Elaboration creates many closures with the same code and cell values, they are stored once
+        self._functions: dict[tp.Any, types.FunctionType] = {}
+        self._canonical: dict[int, types.FunctionType] = {}
+
+    def _value_key(self, value: tp.Any) -> tp.Any:
+        if type(value) is types.FunctionType:
+            return ("function", id(self._canonical_function(value)))
+        if type(value) in _VALUE_TYPES:
+            return (type(value), value)
+        return ("object", id(value))
+
+    def _canonical_function(self, func: types.FunctionType) -> types.FunctionType:
+        canonical = self._canonical.get(id(func))
+        if canonical is not None:
+            return canonical
+        # Recursive closures are compared by identity
+        self._canonical[id(func)] = func
+        cells = []
+        for cell in func.__closure__ or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                cells.append(_EMPTY_CELL)
+                continue
+            cells.append(_SELF_CELL if value is func else self._value_key(value))
+        key = (
+            func.__code__,
+            tuple(cells),
+            tuple(map(self._value_key, func.__defaults__ or ())),
+            tuple((k, self._value_key(v)) for k, v in (func.__kwdefaults__ or {}).items()),
+            tuple((k, self._value_key(v)) for k, v in func.__annotations__.items()),
+            tuple((k, self._value_key(v)) for k, v in func.__dict__.items()),
+        )
+        canonical = self._canonical[id(func)] = self._functions.setdefault(key, func)
+        return canonical
+
+    def persistent_id(self, obj: tp.Any) -> tp.Optional[int]:
+        if not isinstance(obj, Node):
+            return None
+        if obj not in self.index:
+            raise DesignFormatError(f"{type(obj).__name__} {obj.name!r} is referenced but not part of the design")
+        return self.index[obj]
+
+    def reducer_override(self, obj: tp.Any) -> tp.Any:
+        if type(obj) is SpecContext:
+            # Unlike SpecContext.__getstate__, keeps the spec cache: recorded specs refer to its entries
+            return _restore_spec_context, (dict(obj.__dict__),)
+        if type(obj) is not types.FunctionType:
+            return NotImplemented
+        if _is_importable(obj):
+            # Stored by reference, so the source check covers the module that defines it
+            self.modules.add(obj.__module__)
+            return NotImplemented
+        canonical = self._canonical_function(obj)
+        if canonical is not obj:
+            return _same, (canonical,)
+        module_name = obj.__module__
+        key = _code_key(obj.__code__)
+        if _find_code(module_name, key) is not obj.__code__:
+            raise DesignFormatError(f"Function {module_name}.{obj.__qualname__} can not be referenced by name")
+        self.modules.add(module_name)
+
+        closure = None
+        markers: dict[int, str] = {}
+        if obj.__closure__ is not None:
+            closure = []
+            for idx, cell in enumerate(obj.__closure__):
+                try:
+                    value = cell.cell_contents
+                except ValueError:
+                    markers[idx] = _EMPTY_CELL
+                    value = None
+                if value is obj:
+                    markers[idx] = _SELF_CELL
+                    value = None
+                closure.append(value)
+            closure = tuple(closure)
+        attrs = dict(obj.__dict__)
+        if obj.__annotations__:
+            attrs["__annotations__"] = obj.__annotations__
+        if obj.__doc__ is not None:
+            attrs["__doc__"] = obj.__doc__
+        return _load_function, (
+            module_name,
+            key,
+            obj.__name__,
+            obj.__defaults__,
+            obj.__kwdefaults__,
+            closure,
+            markers,
+            attrs,
+        )
+
+
+class _DesignUnpickler(pickle.Unpickler):
+    def __init__(self, file: tp.BinaryIO):
+        super().__init__(file)
+        self.nodes: list[Node] = []
+
+    def persistent_load(self, pid: int) -> Node:
+        if not 0 <= pid < len(self.nodes):
+            raise DesignFormatError(f"Node {pid} is referenced before its definition")
+        return self.nodes[pid]
+
+
+def _restore_spec_context(state: dict[str, tp.Any]) -> SpecContext:
+    ctx = SpecContext.__new__(SpecContext)
+    ctx.__dict__.update(state)
+    return ctx
+
+
+def _dependencies(node: Node) -> list[Node]:
+    deps = list(node.args)
+    if isinstance(node, (composite, primitive)):
+        deps.extend(node.inner_args)
+        deps.append(node.inner_tree)
+    if isinstance(node, composite):
+        deps.extend(node.ctx.spec_cache)
+    return deps
+
+
+def _topological_order(roots: list[Node]) -> list[Node]:
+    order: list[Node] = []
+    done: set[Node] = set()
+    stack: list[tuple[Node, bool]] = [(root, False) for root in reversed(roots)]
+    while stack:
+        node, expanded = stack.pop()
+        if node in done:
+            continue
+        if expanded:
+            done.add(node)
+            order.append(node)
+            continue
+        stack.append((node, True))
+        stack.extend((dep, False) for dep in reversed(_dependencies(node)) if dep not in done)
+    return order
+
+
+def _top_level_inputs(roots: list[Node]) -> list[Var]:
+    inputs: list[Var] = []
+    seen: set[Node] = set()
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if isinstance(node, Var):
+            inputs.append(node)
+        stack.extend(reversed(node.args))
+    return inputs
+
+
+def _record(node: Node) -> tuple:
+    # Fields of Op/Composite/Primitive records follow the arguments of their _restore()
+    if isinstance(node, Var):
+        return ("Var", node.name, node.node_type)
+    if isinstance(node, Const):
+        return ("Const", node.val)
+    if isinstance(node, Op):
+        return (
+            "Op", node.raw_impl, node.sign, node.args, node.name, node.c_lowering, node.attrs,
+            node.node_type, node.runtime_val,
+        )
+    if isinstance(node, composite):
+        return (
+            "Composite", node.spec, node.args, node.name, node.c_inline, node.c_lowering,
+            node.inner_args, node.inner_tree, node.ctx, node.runtime_val,
+        )
+    if isinstance(node, primitive):
+        return (
+            "Primitive", node.spec, node.args, node.name, node.c_inline, node.c_lowering,
+            node.inner_args, node.inner_tree, node.runtime_val,
+        )
+    raise DesignFormatError(f"Unsupported node type: {type(node).__name__}")
+
+
+def _build(record: tuple) -> Node:
+    kind, *fields = record
+    if kind == "Var":
+        name, node_type = fields
+        return Var(name=name, sign=node_type)
+    if kind == "Const":
+        return Const(*fields)
+    if kind == "Op":
+        return Op._restore(*fields)
+    if kind == "Composite":
+        return composite._restore(*fields)
+    if kind == "Primitive":
+        return primitive._restore(*fields)
+    raise DesignFormatError(f"Unknown node kind {kind!r}")
+
+
+############ Public API ###########
+
+def dumps_design(root: Node | tp.Sequence[Node], inputs: tp.Optional[list[Var]] = None) -> bytes:
+    """Serializes an elaborated design, or several designs sharing nodes.
+
+    `inputs` are the Vars returned by loads_design() in the same order,
+    by default the Vars reachable from the roots outside of inner trees.
+    """
+    roots = [root] if isinstance(root, Node) else list(root)
+    nodes = _topological_order(roots)
+    index = {node: idx for idx, node in enumerate(nodes)}
+    inputs = _top_level_inputs(roots) if inputs is None else inputs
+
+    body = io.BytesIO()
+    pickler = _DesignPickler(body, index)
+    for node in nodes:
+        pickler.dump((_record(node), node.checked))
+    root_ids = index[root] if isinstance(root, Node) else [index[node] for node in roots]
+    pickler.dump(([pickler.persistent_id(var) for var in inputs], root_ids))
+
+    header = {
+        "version": FORMAT_VERSION,
+        "python": sys.version_info[:2],
+        "num_nodes": len(nodes),
+        "modules": {name: _module_digest(name) for name in sorted(pickler.modules)},
+    }
+    return MAGIC + pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL) + zlib.compress(body.getvalue())
+
+
+def loads_design(data: bytes) -> tuple[Node | list[Node], list[Var]]:
+    """Restores designs serialized by dumps_design().
+
+    Returns the root, or the list of roots if several were saved, and the inputs.
+    """
+    if not data.startswith(MAGIC):
+        raise DesignFormatError("Not a serialized design")
+    stream = io.BytesIO(data)
+    stream.seek(len(MAGIC))
+    # The header is read first, so that stale files are rejected before any callable is restored
+    header = pickle.load(stream)
+    if header.get("version") != FORMAT_VERSION:
+        raise DesignFormatError(f"Unsupported design format version {header.get('version')}, expected {FORMAT_VERSION}")
+    if tuple(header["python"]) != sys.version_info[:2]:
+        raise DesignFormatError(f"Design was saved by Python {'.'.join(map(str, header['python']))}")
+    for name, digest in header["modules"].items():
+        importlib.import_module(name)
+        if _module_digest(name) != digest:
+            raise DesignFormatError(f"Module {name} changed since the design was saved")
+
+    unpickler = _DesignUnpickler(io.BytesIO(zlib.decompress(stream.read())))
+    for _ in range(header["num_nodes"]):
+        record, checked = unpickler.load()
+        node = _build(record)
+        node.checked = checked
+        unpickler.nodes.append(node)
+    input_ids, root_ids = unpickler.load()
+    nodes = unpickler.nodes
+    roots = nodes[root_ids] if isinstance(root_ids, int) else [nodes[idx] for idx in root_ids]
+    return roots, [nodes[idx] for idx in input_ids]
+
+
+def save_design(
+    root: Node | tp.Sequence[Node],
+    path: str | Path,
+    inputs: tp.Optional[list[Var]] = None,
+) -> None:
+    Path(path).write_bytes(dumps_design(root, inputs))
+
+
+def load_design(path: str | Path) -> tuple[Node | list[Node], list[Var]]:
+    return loads_design(Path(path).read_bytes())
@@ -1,6 +1,17 @@
-from .cpp import CppLoweringError, lower_to_cpp
+from .cpp import CppLoweringError, lower_entries_to_cpp, lower_to_cpp
+from .harness import FP32_ADD, FP32_MUL, NativeReference, lower_differential_harness, lower_exhaustive_harness
+from .units import CppUnit, CppUnits, lower_to_cpp_units
 
 __all__ = [
     "CppLoweringError",
+    "CppUnit",
+    "CppUnits",
+    "FP32_ADD",
+    "FP32_MUL",
+    "NativeReference",
+    "lower_differential_harness",
+    "lower_entries_to_cpp",
+    "lower_exhaustive_harness",
     "lower_to_cpp",
+    "lower_to_cpp_units",
 ]
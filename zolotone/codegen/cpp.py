@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-import typing as tp
 
 from ..ast.node import Node
 from ..ast.nodes import CLowering, Const, Op, Var, composite, primitive
+from ..sim.graph import flatten
+from ..sim.passes import optimize_graph
 from ..types.runtime import RuntimeType, Tuple
-from ..types.static import StaticType, TupleT
+from ..types.static import StaticType, TupleT, cpp_uint_literal
+from .wide import WIDE_PRELUDE, WIDE_TYPE_PREFIX
 
 
 class CppLoweringError(RuntimeError):
@@ -27,18 +29,35 @@ class _FunctionContext:
 
 
 class _CppEmitter:
-    def __init__(self, jittable: bool = True) -> None:
+    # Linkage of implementation functions and of the public entry points; all share one header
+    _function_linkage = "static inline "
+    _entry_linkage = 'extern "C" inline '
+    # With optimize=True, entry points are lowered into one flat function with every Primitive inlined
+    _flat_entry = True
+
+    def __init__(self, jittable: bool = True, optimize: bool = True, batch: bool = False) -> None:
         self.jittable = jittable
+        self.optimize = optimize
+        self.batch = batch
         self._reserved_names = {}
-        self._function_cache: dict[tp.Any, str] = {}
+        # Implementation function names by node fingerprint
+        self._function_cache: dict[bytes, str] = {}
         self._functions: list[str] = []
 
     def emit_cpp(self, root: Node, function_name: str) -> str:
+        self.add_entry(root, function_name)
+        return self.render()
+
+    def add_entry(self, root: Node, function_name: str) -> str:
         if isinstance(root.node_type, TupleT):
             raise CppLoweringError("Tuple-typed entry points are not supported in C++ lowering")
         public_name = self._make_name(function_name)
         internal_name = self._make_name(f"{public_name}_impl")
-        self.emit_function(root=root, function_name=internal_name)
+        if self.optimize and self._flat_entry and root.c_lowering is None:
+            self._functions.append(self._render_flat_function(root=root, name=internal_name))
+        else:
+            # Entry points of equal designs share one implementation
+            internal_name = self.emit_function(root=root, function_name=internal_name)
         self._functions.append(
             self._render_public_wrapper(
                 public_name=public_name,
@@ -47,6 +66,22 @@ class _CppEmitter:
                 return_type=root.node_type,
             )
         )
+        if self.batch:
+            self._functions.append(
+                self._render_batch_entry(
+                    public_name=public_name,
+                    batch_name=self._make_name(f"{public_name}_batch"),
+                    args=root.inner_args,
+                    return_type=root.node_type,
+                )
+            )
+        return public_name
+
+    def render(self) -> str:
+        wide = any(WIDE_TYPE_PREFIX in function for function in self._functions)
+        return "\n".join([*self._render_prelude(wide), *self._functions])
+
+    def _render_prelude(self, wide: bool) -> list[str]:
         includes = ["#include <cstdint>"]
         if self.jittable:
             includes.append("#include <array>")
@@ -60,14 +95,15 @@ class _CppEmitter:
             *includes,
             "",
         ]
+        if self.jittable and wide:
+            parts.extend([WIDE_PRELUDE, ""])
         if not self.jittable:
             parts.extend([
                 "template <int W>",
                 "using ac_uint = ac_int<W, false>;",
                 "",
             ])
-        parts.extend(self._functions)
-        return "\n".join(parts)
+        return parts
 
     def emit_function(self, root: Node, function_name: str) -> str:
         assert isinstance(root, (composite, primitive)), "Can lower only Primitive/Composite"
@@ -106,12 +142,60 @@ class _CppEmitter:
         else:
             result = self._lower(root.inner_tree, env, ctx)
 
-        signature = f"static inline {self._signature(name, root.inner_args, root.node_type)}"
+        signature = f"{self._function_linkage}{self._signature(name, root.inner_args, root.node_type)}"
 
         body = [*ctx.statements, f"return {result.expr};"]
         indented_body = "\n".join(f"    {line}" for line in body)
         return "\n".join([signature + f" {{  // {root.name}", indented_body, "}"])
 
+    def _render_flat_function(self, root: composite | primitive, name: str, keep_calls: bool = False) -> str:
+        # Straight-line body over the flattened inner tree after the passes of sim/passes.py;
+        # keep_calls=True calls the Primitives/Composites that get their own function and keeps direct
+        # lowerings, instead of inlining their inner trees
+        calls = (lambda node: not self._should_inline(node) or node.c_lowering is not None) if keep_calls else None
+        graph = optimize_graph(flatten(root.inner_tree, inputs=root.inner_args, calls=calls))
+        unbound = graph.inputs[len(root.inner_args):]
+        if unbound:
+            raise CppLoweringError(f"Unbound variable during lowering: {unbound[0].name}")
+
+        ctx = _FunctionContext()
+        values: list[_CppValue] = []
+        for flat in graph.nodes:
+            if flat.kind == "input":
+                values.append(_CppValue(expr=flat.node.name))
+            elif flat.kind == "const":
+                values.append(self._lower_const(flat.type_.from_bits(flat.value)))
+            elif flat.kind == "call" and self._should_inline(flat.node):
+                values.append(self._lower_direct_cpp(
+                    flat.type_,
+                    flat.node.c_lowering,
+                    [values[arg].expr for arg in flat.args],
+                ))
+            elif flat.kind == "call":
+                values.append(self._call_helper(flat.node, [values[arg] for arg in flat.args], ctx))
+            else:
+                values.append(self._apply_op(flat.node, [values[arg] for arg in flat.args], ctx))
+
+        signature = f"{self._function_linkage}{self._signature(name, root.inner_args, root.node_type)}"
+        body = [*ctx.statements, f"return {values[graph.output].expr};"]
+        indented_body = "\n".join(f"    {line}" for line in body)
+        return "\n".join([signature + f" {{  // {root.name}", indented_body, "}"])
+
+    def _call_helper(
+        self,
+        node: composite | primitive,
+        lowered_args: list[_CppValue],
+        ctx: _FunctionContext,
+    ) -> _CppValue:
+        expr = f"{self._helper_name(node)}({', '.join(arg.expr for arg in lowered_args)})"
+        return self._emit_temp(node.node_type, expr, node.name, ctx)
+
+    def _helper_name(self, node: composite | primitive) -> str:
+        helper_name = self._function_cache.get(node._fingerprint(self.jittable))
+        if helper_name is None:
+            helper_name = self.emit_function(root=node, function_name=self._make_name(node.name))
+        return helper_name
+
     def _should_inline(self, node: Node) -> bool:
         return isinstance(node, (primitive, composite)) and (
             node.c_inline
@@ -135,7 +219,7 @@ class _CppEmitter:
         if node in ctx.memo:
             return ctx.memo[node]
 
-        runtime_val = node.node_type.runtime_val
+        runtime_val = node.runtime_val
         if runtime_val is not None:
             lowered = self._lower_const(runtime_val)
             ctx.memo[node] = lowered
@@ -166,22 +250,16 @@ class _CppEmitter:
                 else:
                     inline_env = dict(env)
                     inline_env.update(dict(zip(node.inner_args, lowered_args)))
-                    lowered = self._lower(node.inner_tree, inline_env, ctx)
+                    # Inner trees are shared between instances, so they get their own memo
+                    inline_ctx = _FunctionContext(statements=ctx.statements)
+                    lowered = self._lower(node.inner_tree, inline_env, inline_ctx)
 
                 if not node.c_inline:
                     ctx.statements.append(f"// end inline {type(node).__name__} {node.name}")
                 ctx.memo[node] = lowered
                 return lowered
             else:  # Create a separate function for the node
-                helper_name = self._function_cache.get(node._fingerprint(self.jittable))
-                if helper_name is None:
-                    helper_name = self._make_name(node.name)
-                    self.emit_function(
-                        root=node,
-                        function_name=helper_name,
-                    )
-                expr = f"{helper_name}({', '.join(arg.expr for arg in lowered_args)})"
-                lowered = self._emit_temp(node.node_type, expr, node.name, ctx)
+                lowered = self._call_helper(node, lowered_args, ctx)
                 ctx.memo[node] = lowered
                 return lowered
 
@@ -208,18 +286,29 @@ class _CppEmitter:
                     + "}"
                 )
             return f"std::make_tuple({', '.join(arg.expr for arg in args)})"
-        return self._cast(value.static_type(), str(value.val))
+        type_ = value.static_type()
+        if self._is_wide(type_):
+            return cpp_uint_literal(value.val & ((1 << type_.total_bits()) - 1), type_.total_bits())
+        return self._cast(type_, str(value.val))
     
     def _lower_op(
         self,
         node: Op,
         env: dict[Node, _CppValue],
         ctx: _FunctionContext,
+    ) -> _CppValue:
+        lowered_args = [self._lower(arg, env, ctx) for arg in node.args]
+        return self._apply_op(node, lowered_args, ctx)
+
+    def _apply_op(
+        self,
+        node: Op,
+        lowered_args: list[_CppValue],
+        ctx: _FunctionContext,
     ) -> _CppValue:
         if node.c_lowering is None:
             raise CppLoweringError(f"Unsupported op lowering for {node.name}")
-
-        lowered_args = [self._lower(arg, env, ctx) for arg in node.args]
+        self._check_wide_tuple_args(node, lowered_args)
 
         # Skipping tuple creation
         if node.name.startswith("_basic_get_item_"):
@@ -240,6 +329,20 @@ class _CppEmitter:
 
         return self._emit_temp(node.node_type, expr, node.name, ctx)
     
+    def _check_wide_tuple_args(self, node: Op, lowered_args: list[_CppValue]) -> None:
+        # Jittable tuples are arrays of uint64_t, so only item-wise access keeps wide items intact
+        for arg, lowered in zip(node.args, lowered_args):
+            if lowered.tuple_items is not None and node.name.startswith("_basic_get_item_"):
+                continue
+            self._check_tuple_items(arg.node_type)
+
+    def _check_tuple_items(self, type_: StaticType) -> None:
+        if self.jittable and isinstance(type_, TupleT) and any(self._is_wide(arg) for arg in type_.args):
+            raise CppLoweringError(f"Tuples with items wider than 64 bits can not be materialized in jittable C++: {type_}")
+
+    def _is_wide(self, type_: StaticType) -> bool:
+        return self.jittable and not isinstance(type_, TupleT) and type_.total_bits() > 64
+
     def _signature(self, name: str, args: list[Var], return_type: StaticType) -> str:
         params_sig = ", ".join(
             f"{self._render_type(arg.node_type)} {arg.name}" for arg in args
@@ -261,15 +364,54 @@ class _CppEmitter:
         )
         return "\n".join(
             [
-                f'extern "C" inline {wrapper_signature} {{',
+                f"{self._entry_linkage}{wrapper_signature} {{",
                 f"    return {internal_name}({call_args});",
                 "}",
             ]
         )
     
+    def _render_batch_entry(
+        self,
+        public_name: str,
+        batch_name: str,
+        args: list[Var],
+        return_type: StaticType,
+    ) -> str:
+        # Loops the public entry over contiguous arrays of native integers, one per argument
+        taken = {arg.name for arg in args}
+        out_name, count_name, idx_name = (self._free_name(base, taken) for base in ("out", "n", "i"))
+        params = [f"const {self._abi_type(arg.node_type)}* {arg.name}" for arg in args]
+        params.extend([f"{self._abi_type(return_type)}* {out_name}", f"uint64_t {count_name}"])
+        call_args = ", ".join(f"{arg.name}[{idx_name}]" for arg in args)
+        return "\n".join(
+            [
+                f'{self._entry_linkage}void {batch_name}({", ".join(params)}) {{',
+                f"    for (uint64_t {idx_name} = 0; {idx_name} < {count_name}; ++{idx_name}) {{",
+                f"        {out_name}[{idx_name}] = static_cast<{self._abi_type(return_type)}>({public_name}({call_args}));",
+                "    }",
+                "}",
+            ]
+        )
+
+    def _abi_type(self, type_: StaticType) -> str:
+        if isinstance(type_, TupleT):
+            raise CppLoweringError("Batch entry points support only scalar arguments and outputs")
+        if type_.total_bits() > 64:
+            raise CppLoweringError(f"Batch entry points support values up to 64 bits, got {type_}")
+        return type_.to_cpp_type(jittable=True)
+
+    @staticmethod
+    def _free_name(base: str, taken: set[str]) -> str:
+        name = base
+        while name in taken:
+            name = f"_{name}"
+        taken.add(name)
+        return name
+
     def _render_type(self, type_: StaticType) -> str:
         if isinstance(type_, TupleT) and any(isinstance(arg, TupleT) for arg in type_.args):
             raise CppLoweringError("Nested tuples are not supported in C++ lowering")
+        self._check_tuple_items(type_)
         return type_.to_cpp_type(jittable=self.jittable)
 
     def _lower_direct_cpp(
@@ -286,6 +428,9 @@ class _CppEmitter:
     def _cast(self, type_: StaticType, expr: str) -> str:
         if isinstance(type_, TupleT):
             return expr
+        if self._is_wide(type_):
+            # Multi-word values are kept normalized by their constructors
+            return f"{self._render_type(type_)}({expr})"
         if self.jittable:
             return f"{self._render_type(type_)}({self._mask(expr, type_)})"
         return f"{self._render_type(type_)}({expr})"
@@ -297,7 +442,7 @@ class _CppEmitter:
         return str((1 << bits) - 1)
 
     def _render_public_arg(self, arg: Var) -> str:
-        if not self.jittable:
+        if not self.jittable or self._is_wide(arg.node_type):
             return arg.name
         return f"({arg.name} & {self._mask_literal(arg.node_type.total_bits())})"
     
@@ -334,12 +479,31 @@ class _CppEmitter:
         return safe
 
 
+def lower_entries_to_cpp(
+    entries: list[tuple[Node, str]],
+    jittable: bool = True,
+    optimize: bool = True,
+) -> str:
+    """One header with an `extern "C"` entry per `(root, function_name)`, sharing equal helpers."""
+    emitter = _CppEmitter(jittable=jittable, optimize=optimize)
+    for root, function_name in entries:
+        public_name = emitter.add_entry(root=root, function_name=function_name)
+        if public_name != function_name:
+            raise CppLoweringError(f"Entry name {function_name!r} is not a free C++ identifier")
+    return emitter.render()
+
+
 def lower_to_cpp(
     root: Node,
     function_name: str | None = None,
     jittable: bool = True,
+    optimize: bool = True,
+    batch: bool = False,
 ) -> str:
+    # The entry point is lowered into one function over the optimized flat graph, optimize=False
+    # keeps one function per Primitive;
+    # batch=True adds `<name>_batch(const T0* arg_0, ..., R* out, uint64_t n)` over arrays
     if function_name is None:
         function_name = root.name
-    emitter = _CppEmitter(jittable=jittable)
+    emitter = _CppEmitter(jittable=jittable, optimize=optimize, batch=batch)
     return emitter.emit_cpp(root=root, function_name=function_name)
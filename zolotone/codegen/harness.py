@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from ..ast.node import Node
+from ..types.static import StaticType, TupleT
+from .cpp import CppLoweringError, lower_entries_to_cpp, lower_to_cpp
+
+
+# Result comparisons, each a `same_<name>` helper of the harness
+_COMPARISONS = ("bits", "float32")
+
+
+@dataclass(frozen=True)
+class NativeReference:
+    """C++ expression computing the expected raw result bits from raw argument bits.
+
+    The arguments are `uint64_t x0, x1, ...`; the harness provides `f32(bits)`
+    and `bits32(value)` to move between raw bits and `float`. With
+    compare="float32" all NaN encodings are equal, as in `ulp_distance()`.
+    """
+    expr: str
+    compare: str = "bits"
+
+    def __post_init__(self):
+        if self.compare not in _COMPARISONS:
+            raise ValueError(f"Unknown comparison {self.compare!r}, expected one of {_COMPARISONS}")
+
+
+FP32_ADD = NativeReference("bits32(f32(x0) + f32(x1))", compare="float32")
+FP32_MUL = NativeReference("bits32(f32(x0) * f32(x1))", compare="float32")
+
+
+_HARNESS_HELPERS = """\
+namespace harness {
+
+inline float f32(uint64_t bits) {
+    const uint32_t narrow = static_cast<uint32_t>(bits);
+    float value;
+    std::memcpy(&value, &narrow, sizeof(value));
+    return value;
+}
+
+inline uint64_t bits32(float value) {
+    uint32_t bits;
+    std::memcpy(&bits, &value, sizeof(bits));
+    return bits;
+}
+
+inline bool same_bits(uint64_t lhs, uint64_t rhs) {
+    return lhs == rhs;
+}
+
+inline bool same_float32(uint64_t lhs, uint64_t rhs) {
+    return lhs == rhs || (std::isnan(f32(lhs)) && std::isnan(f32(rhs)));
+}
+"""
+
+
+def _harness_bits(type_: StaticType) -> int:
+    if isinstance(type_, TupleT) or type_.total_bits() > 64:
+        raise CppLoweringError(f"Differential harnesses support scalar values up to 64 bits, got {type_}")
+    return type_.total_bits()
+
+
+def _mask(bits: int) -> str:
+    return f"{(1 << bits) - 1}ull"
+
+
+def _without_pragma(header: str) -> str:
+    # The header becomes part of the main file
+    return "\n".join(line for line in header.splitlines() if line != "#pragma once")
+
+
+def _entry_call(root: Node, entry: str, jittable: bool) -> str:
+    args = ", ".join(
+        f"static_cast<{arg.node_type.to_cpp_type(jittable=jittable)}>(x{idx})"
+        for idx, arg in enumerate(root.inner_args)
+    )
+    return f"static_cast<uint64_t>({entry}({args}))"
+
+
+def lower_differential_harness(
+    root: Node,
+    reference: NativeReference,
+    jittable: bool = True,
+    optimize: bool = True,
+    seed: int = 0,
+    n_points: int = 1_000_000,
+) -> str:
+    """Self-contained C++ program comparing the lowered design against `reference`.
+
+    `./harness [seed] [n_points] [max_reports]` draws uniformly random raw
+    argument bits from a seeded mt19937_64, prints a JSON line per reported
+    mismatch and a JSON summary with the throughput, and exits with status 1
+    if any point mismatched.
+    """
+    arg_bits = [_harness_bits(arg.node_type) for arg in root.inner_args]
+    out_bits = _harness_bits(root.node_type)
+    header = _without_pragma(lower_to_cpp(root, function_name="dut_entry", jittable=jittable, optimize=optimize))
+
+    params = ", ".join(f"uint64_t x{idx}" for idx in range(len(arg_bits)))
+    names = ", ".join(f"x{idx}" for idx in range(len(arg_bits)))
+    draws = [
+        f"        const uint64_t x{idx} = rng() & {_mask(bits)};"
+        for idx, bits in enumerate(arg_bits)
+    ]
+    draw_lines = "\n".join(draws)
+    inputs_format = ", ".join('%" PRIu64 "' for _ in arg_bits)
+    mismatch_args = "".join(f", x{idx}" for idx in range(len(arg_bits)))
+
+    main = f"""\
+inline uint64_t dut({params}) {{
+    return {_entry_call(root, "dut_entry", jittable)} & {_mask(out_bits)};
+}}
+
+inline uint64_t reference({params}) {{
+    return static_cast<uint64_t>({reference.expr}) & {_mask(out_bits)};
+}}
+
+}}  // namespace harness
+
+int main(int argc, char** argv) {{
+    const uint64_t seed = argc > 1 ? std::strtoull(argv[1], nullptr, 0) : {seed}ull;
+    const uint64_t n_points = argc > 2 ? std::strtoull(argv[2], nullptr, 0) : {n_points}ull;
+    const uint64_t max_reports = argc > 3 ? std::strtoull(argv[3], nullptr, 0) : 10ull;
+
+    std::mt19937_64 rng(seed);
+    uint64_t mismatches = 0;
+    const auto start = std::chrono::steady_clock::now();
+    for (uint64_t i = 0; i < n_points; ++i) {{
+{draw_lines}
+        const uint64_t got = harness::dut({names});
+        const uint64_t want = harness::reference({names});
+        if (!harness::same_{reference.compare}(got, want)) {{
+            if (mismatches < max_reports) {{
+                std::printf("{{\\"mismatch\\": {{\\"index\\": %" PRIu64 ", \\"inputs\\": [{inputs_format}], "
+                            "\\"dut\\": %" PRIu64 ", \\"reference\\": %" PRIu64 "}}}}\\n", i{mismatch_args}, got, want);
+            }}
+            ++mismatches;
+        }}
+    }}
+    const double seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    std::printf("{{\\"points\\": %" PRIu64 ", \\"mismatches\\": %" PRIu64 ", \\"seconds\\": %.6f, "
+                "\\"points_per_second\\": %.1f}}\\n", n_points, mismatches, seconds, seconds > 0 ? n_points / seconds : 0.0);
+    return mismatches == 0 ? 0 : 1;
+}}
+"""
+    includes = [
+        "#include <chrono>",
+        "#include <cinttypes>",
+        "#include <cmath>",
+        "#include <cstdio>",
+        "#include <cstdlib>",
+        "#include <cstring>",
+        "#include <random>",
+    ]
+    return "\n".join([header, "", *includes, "", _HARNESS_HELPERS, main])
+
+
+def lower_exhaustive_harness(
+    root: Node,
+    reference: Node | NativeReference,
+    compare: str | None = None,
+    jittable: bool = True,
+    optimize: bool = True,
+    chunk_bits: int = 16,
+) -> str:
+    """Self-contained C++ program checking `root` against `reference` on every input.
+
+    The reference is either a design with the same argument widths, lowered
+    into the same file, or a NativeReference. Argument k takes the bits of the
+    enumeration index after those of arguments 0..k-1. `./exhaustive [threads]
+    [progress_seconds]` hands out chunks of 2**chunk_bits points to
+    std::thread workers (all cores by default), prints JSON progress lines and
+    ends with a JSON verdict: "proved", or "refuted" with the counterexample of
+    the lowest index. Workers skip chunks past a known counterexample.
+    """
+    arg_bits = [_harness_bits(arg.node_type) for arg in root.inner_args]
+    out_bits = _harness_bits(root.node_type)
+    total_bits = sum(arg_bits)
+    if total_bits >= 64:
+        raise CppLoweringError(f"Input space of 2**{total_bits} points is too large for exhaustive checking")
+
+    if isinstance(reference, NativeReference):
+        compare = compare or reference.compare
+        header = lower_to_cpp(root, function_name="impl_entry", jittable=jittable, optimize=optimize)
+        reference_expr = reference.expr
+    else:
+        ref_bits = [_harness_bits(arg.node_type) for arg in reference.inner_args]
+        if ref_bits != arg_bits:
+            raise ValueError(f"Reference takes arguments of {ref_bits} bits, the design takes {arg_bits}")
+        compare = compare or "bits"
+        header = lower_entries_to_cpp(
+            [(root, "impl_entry"), (reference, "ref_entry")],
+            jittable=jittable,
+            optimize=optimize,
+        )
+        reference_expr = _entry_call(reference, "ref_entry", jittable)
+    if compare not in _COMPARISONS:
+        raise ValueError(f"Unknown comparison {compare!r}, expected one of {_COMPARISONS}")
+
+    params = ", ".join(f"uint64_t x{idx}" for idx in range(len(arg_bits)))
+    offsets = [sum(arg_bits[:idx]) for idx in range(len(arg_bits))]
+    unpack = "\n".join(
+        f"    x[{idx}] = (index >> {offset}) & {_mask(bits)};"
+        for idx, (offset, bits) in enumerate(zip(offsets, arg_bits))
+    )
+    args_from_array = ", ".join(f"x[{idx}]" for idx in range(len(arg_bits)))
+    inputs_format = ", ".join('%" PRIu64 "' for _ in arg_bits)
+    inputs_args = "".join(f", x[{idx}]" for idx in range(len(arg_bits)))
+    n_inputs = max(len(arg_bits), 1)
+
+    main = f"""\
+inline uint64_t impl({params}) {{
+    return {_entry_call(root, "impl_entry", jittable)} & {_mask(out_bits)};
+}}
+
+inline uint64_t reference({params}) {{
+    return static_cast<uint64_t>({reference_expr}) & {_mask(out_bits)};
+}}
+
+inline void unpack(uint64_t index, uint64_t* x) {{
+{unpack}
+    (void)index;
+    (void)x;
+}}
+
+inline bool check(uint64_t index) {{
+    uint64_t x[{n_inputs}];
+    unpack(index, x);
+    return same_{compare}(impl({args_from_array}), reference({args_from_array}));
+}}
+
+}}  // namespace harness
+
+int main(int argc, char** argv) {{
+    unsigned threads = argc > 1 ? static_cast<unsigned>(std::strtoul(argv[1], nullptr, 0)) : 0;
+    if (threads == 0) threads = std::max(1u, std::thread::hardware_concurrency());
+    const double progress_seconds = argc > 2 ? std::strtod(argv[2], nullptr) : 0.0;
+
+    const uint64_t total = uint64_t(1) << {total_bits};
+    const uint64_t chunk = std::min<uint64_t>(total, uint64_t(1) << {chunk_bits});
+    std::atomic<uint64_t> next{{0}}, done{{0}}, first_bad{{UINT64_MAX}};
+    std::atomic<unsigned> finished{{0}};
+
+    auto worker = [&]() {{
+        for (;;) {{
+            const uint64_t start = next.fetch_add(chunk);
+            if (start >= total || start > first_bad.load(std::memory_order_relaxed)) break;
+            const uint64_t end = std::min(total, start + chunk);
+            uint64_t index = start;
+            for (; index < end; ++index) {{
+                if (!harness::check(index)) {{
+                    uint64_t known = first_bad.load();
+                    while (index < known && !first_bad.compare_exchange_weak(known, index)) {{}}
+                    break;
+                }}
+            }}
+            done.fetch_add(std::min(index + 1, end) - start, std::memory_order_relaxed);
+        }}
+        finished.fetch_add(1);
+    }};
+
+    const auto start_time = std::chrono::steady_clock::now();
+    auto elapsed = [&]() {{
+        return std::chrono::duration<double>(std::chrono::steady_clock::now() - start_time).count();
+    }};
+    std::vector<std::thread> pool;
+    for (unsigned t = 0; t < threads; ++t) pool.emplace_back(worker);
+    double last_report = 0.0;
+    while (finished.load() < threads) {{
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        if (progress_seconds > 0 && elapsed() - last_report >= progress_seconds) {{
+            last_report = elapsed();
+            const uint64_t checked = done.load();
+            std::printf("{{\\"progress\\": {{\\"points\\": %" PRIu64 ", \\"total\\": %" PRIu64 ", \\"seconds\\": %.3f, "
+                        "\\"points_per_second\\": %.1f}}}}\\n", checked, total, last_report, checked / last_report);
+            std::fflush(stdout);
+        }}
+    }}
+    for (std::thread& thread : pool) thread.join();
+
+    const double seconds = elapsed();
+    const uint64_t checked = done.load();
+    const uint64_t bad = first_bad.load();
+    std::printf("{{\\"verdict\\": \\"%s\\", \\"points\\": %" PRIu64 ", \\"total\\": %" PRIu64 ", \\"threads\\": %u, "
+                "\\"seconds\\": %.6f, \\"points_per_second\\": %.1f, \\"counterexample\\": ",
+                bad == UINT64_MAX ? "proved" : "refuted", checked, total, threads, seconds, seconds > 0 ? checked / seconds : 0.0);
+    if (bad == UINT64_MAX) {{
+        std::printf("null}}\\n");
+        return 0;
+    }}
+    uint64_t x[{n_inputs}];
+    harness::unpack(bad, x);
+    std::printf("{{\\"index\\": %" PRIu64 ", \\"inputs\\": [{inputs_format}], \\"impl\\": %" PRIu64 ", "
+                "\\"reference\\": %" PRIu64 "}}}}\\n", bad{inputs_args}, harness::impl({args_from_array}), harness::reference({args_from_array}));
+    return 1;
+}}
+"""
+    includes = [
+        "#include <algorithm>",
+        "#include <atomic>",
+        "#include <chrono>",
+        "#include <cinttypes>",
+        "#include <cmath>",
+        "#include <cstdio>",
+        "#include <cstdlib>",
+        "#include <cstring>",
+        "#include <thread>",
+        "#include <vector>",
+    ]
+    return "\n".join([_without_pragma(header), "", *includes, "", _HARNESS_HELPERS, main])
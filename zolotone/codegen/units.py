@@ -0,0 +1,130 @@
+"""C++ lowering split into one translation unit per deduplicated function.
+
+`lower_to_cpp_units()` emits the functions of `lower_to_cpp()` as separate
+sources. Every Primitive/Composite implementation gets its own unit, named
+after the fingerprint of its subtree, so the unit stays byte-for-byte the
+same as long as the subtree does. `CppUnit.fingerprint` is a digest of the
+unit source. The entry unit holds the `extern "C"` entry points, and
+`ENTRY_HEADER` declares them for wrappers. `infra/cpp_units.py` builds the
+units incrementally.
+
+With optimize=True, the body of every function is optimized on its own: calls
+of other lowered functions stay calls, so the units survive, while the flat
+`lower_to_cpp()` output inlines them into the entry point.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+
+from ..ast.node import Node
+from ..ast.nodes import composite, primitive
+from .cpp import CppLoweringError, _CppEmitter, _CppValue
+from .wide import WIDE_TYPE_PREFIX
+
+PRELUDE_HEADER = "zolotone_prelude.hpp"
+ENTRY_HEADER = "lowered.hpp"
+
+
+def _source_digest(source: str) -> str:
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class CppUnit:
+    name: str
+    # Hex digest of the source
+    fingerprint: str
+    source: str
+
+
+@dataclass(frozen=True)
+class CppUnits:
+    prelude: str  # Contents of PRELUDE_HEADER, included by every unit
+    header: str  # Contents of ENTRY_HEADER
+    units: tuple[CppUnit, ...]
+
+
+class _CppUnitEmitter(_CppEmitter):
+    _function_linkage = ""
+    _entry_linkage = 'extern "C" '
+    _flat_entry = False
+
+    def __init__(self, jittable: bool = True, optimize: bool = True, batch: bool = False) -> None:
+        super().__init__(jittable=jittable, optimize=optimize, batch=batch)
+        self._units: dict[str, CppUnit] = {}
+        self._prototypes: dict[str, str] = {}
+        # Functions called by the units being rendered, innermost last
+        self._callees: list[set[str]] = [set()]
+
+    def emit_function(self, root: Node, function_name: str) -> str:
+        assert isinstance(root, (composite, primitive)), "Can lower only Primitive/Composite"
+
+        fingerprint = root._fingerprint(self.jittable)
+        name = self._function_cache.get(fingerprint)
+        if name is None:
+            # Names follow the fingerprint instead of the emission order, so that unchanged
+            # subtrees keep their unit sources across designs and edits
+            name = f"{self._sanitize_identifier(root.name)}_{fingerprint.hex()[:16]}"
+            self._function_cache[fingerprint] = name
+            reserved, self._reserved_names = self._reserved_names, {}
+            self._callees.append(set())
+            try:
+                rendered = self._render_function(
+                    root=root,
+                    name=name,
+                    env={arg: _CppValue(expr=arg.name) for arg in root.inner_args},
+                )
+            finally:
+                self._reserved_names = reserved
+                callees = self._callees.pop()
+            self._prototypes[name] = f"{self._signature(name, root.inner_args, root.node_type)};"
+            source = self._unit_source(callees, [rendered])
+            self._units[name] = CppUnit(name, _source_digest(source), source)
+        self._callees[-1].add(name)
+        return name
+
+    def _render_function(self, root: composite | primitive, name: str, env: dict[Node, _CppValue]) -> str:
+        if self.optimize and root.c_lowering is None:
+            return self._render_flat_function(root=root, name=name, keep_calls=True)
+        return super()._render_function(root=root, name=name, env=env)
+
+    def _helper_name(self, node: composite | primitive) -> str:
+        return self.emit_function(root=node, function_name=node.name)
+
+    def _unit_source(self, callees: set[str], functions: list[str]) -> str:
+        lines = [f'#include "{PRELUDE_HEADER}"', ""]
+        if callees:
+            lines.extend([*(self._prototypes[name] for name in sorted(callees)), ""])
+        return "\n".join([*lines, *functions, ""])
+
+    def render_units(self, entry_name: str) -> CppUnits:
+        entry_source = self._unit_source(self._callees[0], self._functions)
+        entry = CppUnit(entry_name, _source_digest(entry_source), entry_source)
+        units = (*self._units.values(), entry)
+        wide = any(WIDE_TYPE_PREFIX in unit.source for unit in units)
+        # Entry points start with their signature line, see _render_public_wrapper/_render_batch_entry
+        entry_prototypes = [
+            f"{function.splitlines()[0].removesuffix(' {')};"
+            for function in self._functions
+            if function.startswith(self._entry_linkage)
+        ]
+        header = "\n".join(["#pragma once", f'#include "{PRELUDE_HEADER}"', "", *entry_prototypes, ""])
+        return CppUnits(prelude="\n".join(self._render_prelude(wide)), header=header, units=units)
+
+
+def lower_to_cpp_units(
+    root: Node,
+    function_name: str | None = None,
+    jittable: bool = True,
+    optimize: bool = True,
+    batch: bool = False,
+) -> CppUnits:
+    """Lowers like `lower_to_cpp()`, with one unit per function and one for the entry points."""
+    if function_name is None:
+        function_name = root.name
+    emitter = _CppUnitEmitter(jittable=jittable, optimize=optimize, batch=batch)
+    public_name = emitter.add_entry(root=root, function_name=function_name)
+    if public_name in emitter._units:
+        raise CppLoweringError(f"Entry name {function_name!r} clashes with a lowered function")
+    return emitter.render_units(public_name)
@@ -0,0 +1,242 @@
+"""C++ support for jittable values wider than 64 bits.
+
+StaticType.to_cpp_type(jittable=True) renders such values as
+`zolotone::wide<W>`, a fixed array of 64-bit words. The operators below keep
+the arithmetic of the native lowering: results wrap modulo 2**W, mixed
+operands are widened to the wider of the two, and narrowing casts keep the
+low bits. The prelude is emitted once per header, only when it is used.
+"""
+
+WIDE_TYPE_PREFIX = "zolotone::wide<"
+
+WIDE_PRELUDE = r"""#ifndef ZOLOTONE_WIDE_INT
+#define ZOLOTONE_WIDE_INT
+#include <type_traits>
+
+namespace zolotone {
+
+__extension__ typedef unsigned __int128 wide_u128;
+
+// Unsigned integer of W bits in little-endian 64-bit words; bits above W are always zero
+template <int W>
+struct wide {
+    static constexpr int N = (W + 63) / 64;
+    uint64_t w[N];
+
+    wide() : w{} {}
+
+    template <class T, typename std::enable_if<std::is_integral<T>::value, int>::type = 0>
+    wide(T x) : w{} {
+        w[0] = static_cast<uint64_t>(x);
+        if (std::is_signed<T>::value && x < 0) {
+            for (int i = 1; i < N; ++i) w[i] = ~uint64_t(0);
+        }
+        normalize();
+    }
+
+    template <int V>
+    explicit wide(const wide<V>& x) : w{} {
+        for (int i = 0; i < N && i < wide<V>::N; ++i) w[i] = x.w[i];
+        normalize();
+    }
+
+    template <class... T>
+    static wide words(T... parts) {
+        const uint64_t values[] = {static_cast<uint64_t>(parts)...};
+        wide r;
+        for (int i = 0; i < N && i < static_cast<int>(sizeof...(T)); ++i) r.w[i] = values[i];
+        r.normalize();
+        return r;
+    }
+
+    static wide load(const uint64_t* words_in) {
+        wide r;
+        for (int i = 0; i < N; ++i) r.w[i] = words_in[i];
+        r.normalize();
+        return r;
+    }
+
+    void store(uint64_t* words_out) const {
+        for (int i = 0; i < N; ++i) words_out[i] = w[i];
+    }
+
+    void normalize() {
+        if (W % 64 != 0) w[N - 1] &= (uint64_t(1) << (W % 64)) - 1;
+    }
+
+    // Shift amounts that do not fit into a word shift everything out anyway
+    uint64_t saturated() const {
+        for (int i = 1; i < N; ++i) {
+            if (w[i]) return ~uint64_t(0);
+        }
+        return w[0];
+    }
+
+    explicit operator bool() const {
+        for (int i = 0; i < N; ++i) {
+            if (w[i]) return true;
+        }
+        return false;
+    }
+
+    template <class T, typename std::enable_if<std::is_integral<T>::value && !std::is_same<T, bool>::value, int>::type = 0>
+    explicit operator T() const {
+        return static_cast<T>(w[0]);
+    }
+};
+
+template <class T> struct is_wide : std::false_type {};
+template <int W> struct is_wide<wide<W>> : std::true_type {};
+
+template <class T> struct wide_bits { static constexpr int value = std::is_integral<T>::value ? 64 : 0; };
+template <int W> struct wide_bits<wide<W>> { static constexpr int value = W; };
+
+// Operand type of mixed wide/native operations, defined only if one side is wide
+template <class A, class B>
+using common_wide = typename std::enable_if<
+    ((is_wide<A>::value || is_wide<B>::value) && wide_bits<A>::value > 0 && wide_bits<B>::value > 0),
+    wide<(wide_bits<A>::value > wide_bits<B>::value ? wide_bits<A>::value : wide_bits<B>::value)>
+>::type;
+
+template <int W>
+inline wide<W> add(const wide<W>& a, const wide<W>& b) {
+    wide<W> r;
+    uint64_t carry = 0;
+    for (int i = 0; i < wide<W>::N; ++i) {
+        const uint64_t s = a.w[i] + carry;
+        const uint64_t c = s < carry;
+        r.w[i] = s + b.w[i];
+        carry = c | (r.w[i] < s);
+    }
+    r.normalize();
+    return r;
+}
+
+template <int W>
+inline wide<W> sub(const wide<W>& a, const wide<W>& b) {
+    wide<W> r;
+    uint64_t borrow = 0;
+    for (int i = 0; i < wide<W>::N; ++i) {
+        const uint64_t d = a.w[i] - b.w[i];
+        const uint64_t c = a.w[i] < b.w[i];
+        r.w[i] = d - borrow;
+        borrow = c | (d < borrow);
+    }
+    r.normalize();
+    return r;
+}
+
+template <int W>
+inline wide<W> mul(const wide<W>& a, const wide<W>& b) {
+    // Schoolbook product of the low W bits, 64x64 -> 128-bit partial products
+    wide<W> r;
+    for (int i = 0; i < wide<W>::N; ++i) {
+        uint64_t carry = 0;
+        for (int j = 0; i + j < wide<W>::N; ++j) {
+            const wide_u128 p = static_cast<wide_u128>(a.w[i]) * b.w[j] + r.w[i + j] + carry;
+            r.w[i + j] = static_cast<uint64_t>(p);
+            carry = static_cast<uint64_t>(p >> 64);
+        }
+    }
+    r.normalize();
+    return r;
+}
+
+template <int W>
+inline wide<W> shl(const wide<W>& a, uint64_t amount) {
+    wide<W> r;
+    if (amount >= static_cast<uint64_t>(W)) return r;
+    const int words = static_cast<int>(amount / 64), bits = static_cast<int>(amount % 64);
+    for (int i = wide<W>::N - 1; i >= words; --i) {
+        r.w[i] = a.w[i - words] << bits;
+        if (bits && i > words) r.w[i] |= a.w[i - words - 1] >> (64 - bits);
+    }
+    r.normalize();
+    return r;
+}
+
+template <int W>
+inline wide<W> shr(const wide<W>& a, uint64_t amount) {
+    wide<W> r;
+    if (amount >= static_cast<uint64_t>(W)) return r;
+    const int words = static_cast<int>(amount / 64), bits = static_cast<int>(amount % 64);
+    for (int i = 0; i + words < wide<W>::N; ++i) {
+        r.w[i] = a.w[i + words] >> bits;
+        if (bits && i + words + 1 < wide<W>::N) r.w[i] |= a.w[i + words + 1] << (64 - bits);
+    }
+    return r;
+}
+
+template <int W>
+inline int compare(const wide<W>& a, const wide<W>& b) {
+    for (int i = wide<W>::N - 1; i >= 0; --i) {
+        if (a.w[i] != b.w[i]) return a.w[i] < b.w[i] ? -1 : 1;
+    }
+    return 0;
+}
+
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator+(const A& a, const B& b) { return add(R(a), R(b)); }
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator-(const A& a, const B& b) { return sub(R(a), R(b)); }
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator*(const A& a, const B& b) { return mul(R(a), R(b)); }
+
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator&(const A& a, const B& b) {
+    R x(a), y(b);
+    for (int i = 0; i < R::N; ++i) x.w[i] &= y.w[i];
+    return x;
+}
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator|(const A& a, const B& b) {
+    R x(a), y(b);
+    for (int i = 0; i < R::N; ++i) x.w[i] |= y.w[i];
+    return x;
+}
+template <class A, class B, class R = common_wide<A, B>>
+inline R operator^(const A& a, const B& b) {
+    R x(a), y(b);
+    for (int i = 0; i < R::N; ++i) x.w[i] ^= y.w[i];
+    return x;
+}
+
+template <int W>
+inline wide<W> operator~(const wide<W>& a) {
+    wide<W> r;
+    for (int i = 0; i < wide<W>::N; ++i) r.w[i] = ~a.w[i];
+    r.normalize();
+    return r;
+}
+
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator==(const A& a, const B& b) { return compare(R(a), R(b)) == 0; }
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator!=(const A& a, const B& b) { return compare(R(a), R(b)) != 0; }
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator<(const A& a, const B& b) { return compare(R(a), R(b)) < 0; }
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator<=(const A& a, const B& b) { return compare(R(a), R(b)) <= 0; }
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator>(const A& a, const B& b) { return compare(R(a), R(b)) > 0; }
+template <class A, class B, class R = common_wide<A, B>>
+inline bool operator>=(const A& a, const B& b) { return compare(R(a), R(b)) >= 0; }
+
+template <int W, class S, typename std::enable_if<std::is_integral<S>::value, int>::type = 0>
+inline wide<W> operator<<(const wide<W>& a, S amount) { return shl(a, static_cast<uint64_t>(amount)); }
+template <int W, class S, typename std::enable_if<std::is_integral<S>::value, int>::type = 0>
+inline wide<W> operator>>(const wide<W>& a, S amount) { return shr(a, static_cast<uint64_t>(amount)); }
+template <int W, int V>
+inline wide<W> operator<<(const wide<W>& a, const wide<V>& amount) { return shl(a, amount.saturated()); }
+template <int W, int V>
+inline wide<W> operator>>(const wide<W>& a, const wide<V>& amount) { return shr(a, amount.saturated()); }
+
+// Native values shifted by a wide amount; the lowering guards amounts past the width
+template <class T, int V, typename std::enable_if<std::is_integral<T>::value, int>::type = 0>
+inline auto operator<<(T x, const wide<V>& amount) -> decltype(x << 0) { return x << amount.saturated(); }
+template <class T, int V, typename std::enable_if<std::is_integral<T>::value, int>::type = 0>
+inline auto operator>>(T x, const wide<V>& amount) -> decltype(x >> 0) { return x >> amount.saturated(); }
+
+}  // namespace zolotone
+#endif  // ZOLOTONE_WIDE_INT
+"""
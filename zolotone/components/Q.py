@@ -31,10 +31,11 @@ def _q_is_min_val(x: Node) -> Op:
 
 # Function does not care about int_bits/frac_bits types, it takes their values
 def q_alloc(int_bits: Node, frac_bits: Node) -> Op:
+    # Types carry no values, the constant arguments are read from the nodes
     def sign(x: StaticType, y: StaticType) -> QT:
-        if x.runtime_val is None or y.runtime_val is None:
+        if int_bits.runtime_val is None or frac_bits.runtime_val is None:
             raise TypeError("q_alloc's arguments depend on a variable")
-        return QT(x.runtime_val.val, y.runtime_val.val)
+        return QT(int_bits.runtime_val.val, frac_bits.runtime_val.val)
 
     def impl(x: RuntimeType, y: RuntimeType) -> Q:
         return Q(0, x.val, y.val)
@@ -14,7 +14,8 @@ from ..spec import *
 # Allocates UQ at runtime
 def uq_alloc(int_bits: Node,
              frac_bits: Node) -> Op:
-    def sign(int_bits: StaticType, frac_bits: StaticType) -> UQT:
+    # Types carry no values, the constant arguments are read from the nodes
+    def sign(x: StaticType, y: StaticType) -> UQT:
         if int_bits.runtime_val is not None and frac_bits.runtime_val is not None:
             return UQT(int_bits.runtime_val.val, frac_bits.runtime_val.val)
         raise TypeError("uq_alloc's arguments depend on a variable")
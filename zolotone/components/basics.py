@@ -3,6 +3,7 @@ import typing as tp
 from ..types import *
 from ..utils import *
 from ..ast import *
+from ..types.static import cpp_uint_literal as _cpp_uint_literal
 
 
 ############ Constructors ##############
@@ -20,8 +21,8 @@ def _cpp_zero(type_: StaticType, jittable: bool) -> str:
     return _cpp_cast(type_, "0", jittable=jittable)
 
 
-def _mask_literal(bits: int) -> str:
-    return str((1 << bits) - 1)
+def _mask_literal(bits: int, jittable: bool = True) -> str:
+    return _cpp_uint_literal((1 << bits) - 1, bits, jittable=jittable)
 
 
 def _impl_constructor(op):
@@ -65,13 +66,14 @@ def _binary_operator(op: tp.Callable, x: Node, y: Node, out: Node, c_lowering, n
         args=[x, y, out],
         name=name)
 
-def _unary_operator(op: tp.Callable, x: Node, out: Node, c_lowering, name: str) -> Op:
+def _unary_operator(op: tp.Callable, x: Node, out: Node, c_lowering, name: str, attrs=None) -> Op:
     return Op(
         impl=make_fixed_arguments(_impl_constructor(op), [RuntimeType] * 2),
         sign=make_fixed_arguments(_sign_constructor(), [StaticType] * 2),
         c_lowering=c_lowering,
         args=[x, out],
-        name=name)
+        name=name,
+        attrs=attrs)
 
 ########## Ternary Operators ###########
 
@@ -300,26 +302,28 @@ def basic_not_equal(x: Node, y: Node, out: Node) -> Op:
 def basic_select(x: Node, start: int, end: int, out: Node) -> Op:
     if start < end or end < 0:
         raise ValueError(f"Bad indexing: start={start}, end={end}")
-    select_mask = _mask_literal(start - end + 1)
+    select_bits = start - end + 1
     return _unary_operator(
         op=lambda x: mask(x.val >> end, start - end + 1),
         x=x,
         out=out,
-        c_lowering=_format_c_lowering(
-            f"(({{}} >> {end}) & {select_mask})",
-            0,
+        c_lowering=lambda lowered_args, jittable: (
+            f"(({lowered_args[0]} >> {end}) & {_mask_literal(select_bits, jittable=jittable)})"
         ),
         name="basic_select",
+        attrs={"start": start, "end": end},
     )
 
 # TODO: Truncation is possible if out is too small
 def basic_invert(x: Node, out: Node) -> Op:
-    invert_mask = _mask_literal(x.node_type.total_bits())
+    x_bits = x.node_type.total_bits()
     return _unary_operator(
         op=lambda x: ((1 << x.total_bits()) - 1) - x.val,
         x=x,
         out=out,
-        c_lowering=lambda lowered_args, jittable: f"((~{lowered_args[0]}) & {invert_mask})",
+        c_lowering=lambda lowered_args, jittable: (
+            f"((~{lowered_args[0]}) & {_mask_literal(x_bits, jittable=jittable)})"
+        ),
         name="basic_invert",
     )
 
@@ -343,11 +347,13 @@ def basic_or_reduce(x: Node, out: Node) -> Op:
     )
 
 def basic_and_reduce(x: Node, out: Node) -> Op:
-    all_ones = _mask_literal(x.node_type.total_bits())
+    x_bits = x.node_type.total_bits()
     return _unary_operator(
         op=lambda x: 1 if x.val == ((1 << x.total_bits()) - 1) else 0,
         x=x,
         out=out,
-        c_lowering=_format_c_lowering(f"({{}} == {all_ones})", 0),
+        c_lowering=lambda lowered_args, jittable: (
+            f"({lowered_args[0]} == {_mask_literal(x_bits, jittable=jittable)})"
+        ),
         name="basic_and_reduce",
     )
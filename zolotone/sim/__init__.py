@@ -0,0 +1,29 @@
+from .graph import FlatGraph, SimulationError, flatten
+from .passes import PassManager, optimize_graph
+from .plan import EvalPlan, compile_plan
+from .batch import BatchPlan, compile_batch, evaluate_batch
+from .bitslice import BitslicePlan, compile_bitslice, evaluate_bitslice
+from .incremental import IncrementalPlan, compile_incremental, evaluate_incremental
+from .cost import Cost, CostReport, InstanceCost, estimate_cost
+from .limbs import ints_to_limbs, limbs_to_ints
+
+__all__ = [
+    "SimulationError",
+    "PassManager",
+    "optimize_graph",
+    "EvalPlan",
+    "compile_plan",
+    "BatchPlan",
+    "compile_batch",
+    "evaluate_batch",
+    "BitslicePlan",
+    "compile_bitslice",
+    "evaluate_bitslice",
+    "IncrementalPlan",
+    "compile_incremental",
+    "evaluate_incremental",
+    "Cost",
+    "CostReport",
+    "InstanceCost",
+    "estimate_cost",
+]
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import typing as tp
+import weakref
+
+import numpy as np
+
+from ..ast.node import Node
+from ..ast.nodes import Op, Var
+from ..types.static import StaticType, TupleT
+from .graph import FlatGraph, SimulationError, flatten
+from .passes import optimize_graph
+from .kernels import Kernel, scalar_kernel
+from .limbs import LIMB_BITS, WIDE_KERNELS, int_to_limbs, ints_to_limbs, limbs_to_ints, n_limbs
+
+
+_U64 = np.uint64
+
+
+def _u64(value: int) -> np.uint64:
+    return _U64(value)
+
+
+def _mask_of(type_: StaticType) -> np.uint64:
+    return _u64((1 << type_.total_bits()) - 1)
+
+
+def _leaf_types(type_: StaticType) -> tp.Iterator[StaticType]:
+    if isinstance(type_, TupleT):
+        for arg in type_.args:
+            yield from _leaf_types(arg)
+    else:
+        yield type_
+
+
+def _is_wide(type_: StaticType) -> bool:
+    return type_.total_bits() > LIMB_BITS
+
+
+def _as_batch_value(type_: StaticType, bits: tp.Any) -> tp.Any:
+    if isinstance(type_, TupleT):
+        return tuple(_as_batch_value(arg, x) for arg, x in zip(type_.args, bits))
+    if _is_wide(type_):
+        return int_to_limbs(bits, type_.total_bits())
+    return _u64(bits)
+
+
+############ Batch kernels #############
+# Kernels operate on uint64 arrays (or uint64 scalars for constants) whose
+# values are already masked to their static width. Shift amounts are clamped
+# explicitly because NumPy shifts of 64 or more bits are platform-defined.
+# Values wider than LIMB_BITS use the multi-limb kernels of .limbs instead.
+
+def _mux(node: Op) -> Kernel:
+    m = _mask_of(node.node_type)
+    return lambda sel, in0, in1, out: np.where(sel != 0, in1, in0) & m
+
+
+def _binary(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        m = _mask_of(node.node_type)
+        return lambda x, y, out: f(x, y) & m
+    return factory
+
+
+def _compare(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        m = _mask_of(node.node_type)
+        return lambda x, y, out: f(x, y).astype(_U64) & m
+    return factory
+
+
+def _rshift(node: Op) -> Kernel:
+    m = _mask_of(node.node_type)
+    limit = _u64(LIMB_BITS)
+    last = _u64(LIMB_BITS - 1)
+
+    def kernel(x, amount, out):
+        shifted = x >> np.minimum(amount, last)
+        return np.where(amount < limit, shifted, _u64(0)) & m
+
+    return kernel
+
+
+def _lshift(node: Op) -> Kernel:
+    m = _mask_of(node.node_type)
+    width = _u64(node.node_type.total_bits())
+    last = _u64(LIMB_BITS - 1)
+
+    def kernel(x, amount, out):
+        shifted = (x << np.minimum(amount, last)) & m
+        return np.where(amount < width, shifted, _u64(0))
+
+    return kernel
+
+
+def _concat(node: Op) -> Kernel:
+    shift = _u64(node.args[1].node_type.total_bits())
+    m = _mask_of(node.node_type)
+    return lambda x, y, out: ((x << shift) | y) & m
+
+
+def _select(node: Op) -> Kernel:
+    end = _u64(node.attrs["end"])
+    m = _mask_of(node.node_type) & _u64((1 << (node.attrs["start"] - node.attrs["end"] + 1)) - 1)
+    return lambda x, out: (x >> end) & m
+
+
+def _invert(node: Op) -> Kernel:
+    x_mask = _mask_of(node.args[0].node_type)
+    m = _mask_of(node.node_type)
+    return lambda x, out: (x ^ x_mask) & m
+
+
+def _identity(node: Op) -> Kernel:
+    m = _mask_of(node.node_type)
+    return lambda x, out: x & m
+
+
+def _or_reduce(node: Op) -> Kernel:
+    m = _mask_of(node.node_type)
+    return lambda x, out: (x != 0).astype(_U64) & m
+
+
+def _and_reduce(node: Op) -> Kernel:
+    x_mask = _mask_of(node.args[0].node_type)
+    m = _mask_of(node.node_type)
+    return lambda x, out: (x == x_mask).astype(_U64) & m
+
+
+def _field(shift: int, bits: int) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        s = _u64(shift)
+        m = _u64((1 << bits) - 1)
+        return lambda x: (x >> s) & m
+    return factory
+
+
+def _fp32_alloc(node: Op) -> Kernel:
+    return lambda sign, exponent, mantissa: (sign << _u64(31)) | (exponent << _u64(23)) | mantissa
+
+
+def _q_is_min_val(node: Op) -> Kernel:
+    min_val = _u64(1 << (node.args[0].node_type.total_bits() - 1))
+    return lambda x: (x == min_val).astype(_U64)
+
+
+def _get_item(node: Op) -> Kernel:
+    idx = node.attrs["idx"]
+    return lambda x: x[idx]
+
+
+def _tuple_maker(node: Op) -> Kernel:
+    return lambda *args: args
+
+
+_BATCH_KERNELS: dict[str, tp.Callable[[Op], Kernel]] = {
+    "basic_mux_2_1": _mux,
+    "basic_add": _binary(lambda x, y: x + y),
+    "basic_sub": _binary(lambda x, y: x - y),
+    "basic_mul": _binary(lambda x, y: x * y),
+    "basic_max": _binary(np.maximum),
+    "basic_min": _binary(np.minimum),
+    "basic_rshift": _rshift,
+    "basic_lshift": _lshift,
+    "basic_or": _binary(lambda x, y: x | y),
+    "basic_xor": _binary(lambda x, y: x ^ y),
+    "basic_and": _binary(lambda x, y: x & y),
+    "basic_concat": _concat,
+    "basic_less": _compare(lambda x, y: x < y),
+    "basic_less_or_equal": _compare(lambda x, y: x <= y),
+    "basic_greater": _compare(lambda x, y: x > y),
+    "basic_greater_or_equal": _compare(lambda x, y: x >= y),
+    "basic_equal": _compare(lambda x, y: x == y),
+    "basic_not_equal": _compare(lambda x, y: x != y),
+    "basic_select": _select,
+    "basic_invert": _invert,
+    "basic_identity": _identity,
+    "basic_or_reduce": _or_reduce,
+    "basic_and_reduce": _and_reduce,
+    # Field access of packed floating-point formats (zolotone/components)
+    "_bf16_sign": _field(15, 1),
+    "_bf16_exponent": _field(7, 8),
+    "_bf16_mantissa": _field(0, 7),
+    "_fp32_sign": _field(31, 1),
+    "_fp32_exponent": _field(23, 8),
+    "_fp32_mantissa": _field(0, 23),
+    "_fp32_alloc": _fp32_alloc,
+    "_q_is_min_val": _q_is_min_val,
+}
+
+
+def _leaf_values(type_: StaticType, value: tp.Any) -> tp.Iterator[tp.Any]:
+    if isinstance(type_, TupleT):
+        for arg, item in zip(type_.args, value):
+            yield from _leaf_values(arg, item)
+    else:
+        yield value
+
+
+def _from_leaves(type_: StaticType, leaves: tp.Iterator[tp.Any]) -> tp.Any:
+    if isinstance(type_, TupleT):
+        return tuple(_from_leaves(arg, leaves) for arg in type_.args)
+    return next(leaves)
+
+
+def _column_to_ints(type_: StaticType, column: tp.Any, size: int) -> list[int]:
+    if _is_wide(type_):
+        k = n_limbs(type_.total_bits())
+        return limbs_to_ints(np.broadcast_to(column, (size, k)))
+    return np.broadcast_to(column, (size,)).tolist()
+
+
+def _ints_to_column(type_: StaticType, values: list[int]) -> np.ndarray:
+    if _is_wide(type_):
+        return ints_to_limbs(values, type_.total_bits())
+    return np.array(values, dtype=_U64)
+
+
+def _elementwise_fallback(node: Op) -> Kernel:
+    # Ops without a vectorized kernel are applied point by point
+    scalar = scalar_kernel(node)
+    arg_leaves = [list(_leaf_types(arg.node_type)) for arg in node.args]
+    out_leaves = list(_leaf_types(node.node_type))
+
+    def kernel(*args):
+        columns = [
+            list(_leaf_values(arg.node_type, value)) for arg, value in zip(node.args, args)
+        ]
+        size = _batch_size(columns, arg_leaves)
+        rows = [
+            [_column_to_ints(type_, c, size) for type_, c in zip(types, cols)]
+            for types, cols in zip(arg_leaves, columns)
+        ]
+        results: list[list[int]] = [[] for _ in out_leaves]
+        for row in range(size):
+            row_args = [
+                _from_leaves(arg.node_type, iter([c[row] for c in cols]))
+                for arg, cols in zip(node.args, rows)
+            ]
+            for idx, value in enumerate(_leaf_values(node.node_type, scalar(*row_args))):
+                results[idx].append(value)
+        return _from_leaves(
+            node.node_type,
+            iter([_ints_to_column(type_, values) for type_, values in zip(out_leaves, results)]),
+        )
+
+    return kernel
+
+
+def _batch_size(columns: list[list[tp.Any]], leaves: list[list[StaticType]]) -> int:
+    # Constants have no batch dimension: narrow ones are 0-d, wide ones 1-d
+    size = 1
+    for types, cols in zip(leaves, columns):
+        for type_, column in zip(types, cols):
+            batch_ndim = np.ndim(column) - (1 if _is_wide(type_) else 0)
+            if batch_ndim > 0:
+                size = max(size, np.shape(column)[0])
+    return size
+
+
+def _wide_kernel(node: Op) -> Kernel:
+    factory = WIDE_KERNELS.get(node.name)
+    if factory is None:
+        return _elementwise_fallback(node)
+    kernel = factory(node)
+    narrow_args = [not _is_wide(arg.node_type) for arg in node.args]
+    narrow_out = not _is_wide(node.node_type)
+
+    def wrapper(*args):
+        limbs = [
+            np.asarray(arg)[..., None] if narrow else arg
+            for arg, narrow in zip(args, narrow_args)
+        ]
+        out = kernel(*limbs)
+        return out[..., 0] if narrow_out else out
+
+    return wrapper
+
+
+def batch_kernel(node: Op) -> Kernel:
+    if node.name.startswith("_basic_get_item_"):
+        return _get_item(node)
+    if node.name.startswith("basic_tuple_maker_"):
+        return _tuple_maker(node)
+    types = [arg.node_type for arg in node.args] + [node.node_type]
+    if any(_is_wide(leaf) for type_ in types for leaf in _leaf_types(type_)):
+        return _wide_kernel(node)
+    factory = _BATCH_KERNELS.get(node.name)
+    if factory is None:
+        return _elementwise_fallback(node)
+    return factory(node)
+
+
+class BatchPlan:
+    """Vectorized evaluation of a design over uint64 NumPy arrays.
+
+    Every slot of the flattened design is a uint64 array (or a tuple of them),
+    so one pass over the plan evaluates a whole batch of stimuli. Values wider
+    than 64 bits are (N, k) arrays of uint64 limbs, least significant first.
+    """
+
+    def __init__(self, graph: FlatGraph):
+        self.graph = graph
+        self.inputs: list[Var] = list(graph.inputs)
+        self.output_type: StaticType = graph.output_type
+        self.steps: list[tuple[int, Kernel, tuple[int, ...]]] = [
+            (slot, batch_kernel(flat.node), flat.args)
+            for slot, flat in graph.ops()
+        ]
+        self._consts = {
+            slot: _as_batch_value(flat.type_, flat.value)
+            for slot, flat in enumerate(graph.nodes)
+            if flat.kind == "const"
+        }
+
+    def __call__(self, *columns: np.ndarray) -> tp.Any:
+        if len(columns) != len(self.inputs):
+            raise SimulationError(f"Batch plan expects {len(self.inputs)} inputs, got {len(columns)}")
+        slots: list[tp.Any] = [None] * len(self.graph.nodes)
+        for slot, value in self._consts.items():
+            slots[slot] = value
+        size = 1
+        for slot, column in zip(self.graph.input_slots, columns):
+            column = np.asarray(column, dtype=_U64)
+            size = max(size, column.shape[0]) if column.ndim else size
+            slots[slot] = column
+        # uint64 arithmetic wraps like the masked scalar kernels
+        with np.errstate(over="ignore"):
+            for slot, kernel, args in self.steps:
+                slots[slot] = kernel(*[slots[arg] for arg in args])
+        return _broadcast(self.output_type, slots[self.graph.output], size)
+
+
+def _broadcast(type_: StaticType, value: tp.Any, size: int) -> tp.Any:
+    if isinstance(type_, TupleT):
+        return tuple(_broadcast(arg, item, size) for arg, item in zip(type_.args, value))
+    shape = (size, n_limbs(type_.total_bits())) if _is_wide(type_) else (size,)
+    return np.broadcast_to(np.asarray(value, dtype=_U64), shape).copy()
+
+
+_batch_plans: "weakref.WeakKeyDictionary[Node, BatchPlan]" = weakref.WeakKeyDictionary()
+
+
+def compile_batch(root: Node, optimize: bool = True) -> BatchPlan:
+    graph = flatten(root)
+    return BatchPlan(optimize_graph(graph) if optimize else graph)
+
+
+def input_columns(inputs: list[Var]) -> list[np.ndarray]:
+    """Returns the batches loaded into the Vars, checking that their sizes match."""
+    columns = []
+    sizes = set()
+    for var in inputs:
+        if var.batch is None:
+            raise ValueError(f"Variable {var.name} not bound to a batch")
+        columns.append(var.batch)
+        sizes.add(var.batch.shape[0])
+    if len(sizes) > 1:
+        raise ValueError(f"Batch sizes of input variables do not match: {sorted(sizes)}")
+    return columns
+
+
+def evaluate_batch(root: Node) -> tp.Any:
+    plan = _batch_plans.get(root)
+    if plan is None:
+        plan = compile_batch(root)
+        _batch_plans[root] = plan
+    return plan(*input_columns(plan.inputs))
@@ -0,0 +1,460 @@
+from __future__ import annotations
+
+import typing as tp
+import weakref
+
+import numpy as np
+
+from ..ast.node import Node
+from ..ast.nodes import Op, Var
+from ..types.static import StaticType, TupleT
+from .batch import _broadcast, _is_wide, batch_kernel, input_columns
+from .graph import FlatGraph, SimulationError, flatten
+from .passes import optimize_graph
+from .kernels import Kernel
+from .limbs import LIMB_BITS, n_limbs
+
+
+_U64 = np.uint64
+_WORD = np.dtype("<u8")
+_ONES = np.uint64(np.iinfo(np.uint64).max)
+
+
+############ Bit-sliced values ############
+# A value of width w over a batch of N stimuli is a (w, W) uint64 array with
+# W = ceil(N / 64) words: row b holds bit b of the value, and bit j of word i
+# belongs to stimulus 64 * i + j. Constants are (w, 1) arrays of all-zero or
+# all-one words and broadcast against batches. Tuples are tuples of values.
+
+def _words(size: int) -> int:
+    return max(1, -(-size // LIMB_BITS))
+
+
+def _const_planes(bits: int, width: int) -> np.ndarray:
+    return np.array([_ONES if (bits >> b) & 1 else 0 for b in range(width)], dtype=_U64).reshape(width, 1)
+
+
+def _words_of(value: tp.Any) -> int:
+    if isinstance(value, tuple):
+        return max((_words_of(item) for item in value), default=1)
+    return value.shape[1]
+
+
+def _pack(bits: np.ndarray, words: int) -> np.ndarray:
+    # (w, N) array of 0/1 -> (w, words) bit planes
+    padded = np.zeros((bits.shape[0], words * LIMB_BITS), dtype=np.uint8)
+    padded[:, :bits.shape[1]] = bits
+    return np.packbits(padded, axis=1, bitorder="little").view(_WORD).astype(_U64)
+
+
+def _unpack(planes: np.ndarray, size: int) -> np.ndarray:
+    # (w, words) bit planes -> (w, size) array of 0/1
+    planes = np.ascontiguousarray(planes, dtype=_WORD)
+    return np.unpackbits(planes.view(np.uint8), axis=1, bitorder="little")[:, :size]
+
+
+def to_planes(type_: StaticType, column: tp.Any, size: int) -> tp.Any:
+    """Converts a batch column (as used by BatchPlan) into bit planes."""
+    if isinstance(type_, TupleT):
+        return tuple(to_planes(arg, item, size) for arg, item in zip(type_.args, column))
+    width = type_.total_bits()
+    k = n_limbs(width)
+    column = np.asarray(column, dtype=_WORD)
+    limbs = np.ascontiguousarray(np.broadcast_to(column.reshape(-1, k), (size, k)))
+    # Only the bytes holding the low `width` bits of every value are unpacked
+    raw = limbs.view(np.uint8)[:, :-(-width // 8)]
+    bits = np.unpackbits(raw, axis=1, bitorder="little")[:, :width]
+    return _pack(bits.T, _words(size))
+
+
+def from_planes(type_: StaticType, value: tp.Any, size: int) -> tp.Any:
+    """Converts bit planes back into a batch column of `size` stimuli."""
+    if isinstance(type_, TupleT):
+        return tuple(from_planes(arg, item, size) for arg, item in zip(type_.args, value))
+    width = type_.total_bits()
+    k = n_limbs(width)
+    planes = np.broadcast_to(value, (width, max(_words(size), value.shape[1])))
+    bits = np.zeros((size, k * LIMB_BITS), dtype=np.uint8)
+    bits[:, :width] = _unpack(planes, size).T
+    limbs = np.packbits(bits, axis=1, bitorder="little").view(_WORD).astype(_U64)
+    return limbs if _is_wide(type_) else limbs[:, 0]
+
+
+def exhaustive_planes(types: list[StaticType]) -> tuple[int, list[np.ndarray]]:
+    """Bit planes enumerating every combination of input values.
+
+    Stimulus s assigns the first input the lowest bits of s, the next input
+    the following bits, and so on. Returns the number of stimuli and the planes.
+    """
+    widths = [type_.total_bits() for type_ in types]
+    size = 1 << sum(widths)
+    words = np.arange(_words(size), dtype=_U64)
+    # Bit p of the stimulus index: periodic within a word for p < 6, per word above
+    low = [_U64(sum(1 << j for j in range(LIMB_BITS) if (j >> p) & 1)) for p in range(6)]
+    planes = []
+    position = 0
+    for width in widths:
+        rows = []
+        for p in range(position, position + width):
+            if p < 6:
+                rows.append(np.full(len(words), low[p], dtype=_U64))
+            else:
+                rows.append(((words >> _U64(p - 6)) & _U64(1)) * _ONES)
+        planes.append(np.array(rows, dtype=_U64).reshape(width, len(words)))
+        position += width
+    return size, planes
+
+
+def _fit(x: np.ndarray, width: int) -> np.ndarray:
+    # Truncates or zero-extends a value to `width` bit planes
+    rows = x.shape[0]
+    if rows >= width:
+        return x[:width]
+    return np.concatenate([x, np.zeros((width - rows, x.shape[1]), dtype=_U64)])
+
+
+def _cat(*parts: np.ndarray) -> np.ndarray:
+    words = max(part.shape[1] for part in parts)
+    return np.concatenate([np.broadcast_to(part, (part.shape[0], words)) for part in parts])
+
+
+def _any(x: np.ndarray) -> np.ndarray:
+    if x.shape[0] == 0:
+        return np.zeros((1, x.shape[1]), dtype=_U64)
+    return np.bitwise_or.reduce(x, axis=0, keepdims=True)
+
+
+def _all(x: np.ndarray) -> np.ndarray:
+    if x.shape[0] == 0:
+        return np.full((1, x.shape[1]), _ONES, dtype=_U64)
+    return np.bitwise_and.reduce(x, axis=0, keepdims=True)
+
+
+def _choose(s: np.ndarray, if_set: np.ndarray, if_clear: np.ndarray) -> np.ndarray:
+    return (s & if_set) | (~s & if_clear)
+
+
+def _ripple_add(x: np.ndarray, y: np.ndarray, carry: tp.Any, width: int) -> np.ndarray:
+    x, y = _fit(x, width), _fit(y, width)
+    rows = []
+    for b in range(width):
+        t = x[b] ^ y[b]
+        rows.append(t ^ carry)
+        carry = (x[b] & y[b]) | (carry & t)
+    if not rows:
+        return np.zeros((0, max(x.shape[1], y.shape[1])), dtype=_U64)
+    return np.stack(np.broadcast_arrays(*rows))
+
+
+def _compare(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns bit-sliced (x < y, x == y), scanning from the most significant bit."""
+    width = max(x.shape[0], y.shape[0])
+    x, y = _fit(x, width), _fit(y, width)
+    lt: tp.Any = _U64(0)
+    eq: tp.Any = _ONES
+    for b in reversed(range(width)):
+        lt = lt | (eq & ~x[b] & y[b])
+        eq = eq & ~(x[b] ^ y[b])
+    words = max(x.shape[1], y.shape[1])
+    return np.broadcast_to(lt, (1, words)), np.broadcast_to(eq, (1, words))
+
+
+############ Bit-sliced kernels ############
+# Every kernel returns exactly as many planes as its output width, so the
+# masking of the scalar and batch kernels happens by construction.
+
+def _width(node: Op) -> int:
+    return node.node_type.total_bits()
+
+
+def _mux(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda sel, in0, in1, out: _choose(_any(sel), _fit(in1, w), _fit(in0, w))
+
+
+def _bitwise(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        w = _width(node)
+        return lambda x, y, out: f(_fit(x, w), _fit(y, w))
+    return factory
+
+
+def _add(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, y, out: _ripple_add(x, y, _U64(0), w)
+
+
+def _sub(node: Op) -> Kernel:
+    # x - y == x + ~y + 1 modulo 2**w
+    w = _width(node)
+    return lambda x, y, out: _ripple_add(x, ~_fit(y, w), _ONES, w)
+
+
+def _mul(node: Op) -> Kernel:
+    w = _width(node)
+
+    def kernel(x, y, out):
+        acc = np.zeros((w, 1), dtype=_U64)
+        x = _fit(x, w)
+        for i in range(min(y.shape[0], w)):
+            partial = _cat(np.zeros((i, 1), dtype=_U64), x[:w - i]) & y[i]
+            acc = _ripple_add(acc, partial, _U64(0), w)
+        return acc
+
+    return kernel
+
+
+def _extremum(take_less: bool) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        w = _width(node)
+
+        def kernel(x, y, out):
+            lt, _ = _compare(x, y)
+            return _choose(lt if take_less else ~lt, _fit(x, w), _fit(y, w))
+
+        return kernel
+    return factory
+
+
+def _predicate(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        w = _width(node)
+        return lambda x, y, out: _fit(f(*_compare(x, y)), w)
+    return factory
+
+
+def _barrel(x: np.ndarray, amount: np.ndarray, width: int, left: bool) -> np.ndarray:
+    # One stage per bit of the shift amount, each stage shifts by 2**k or passes through
+    cur = x
+    for k in range(amount.shape[0]):
+        shift = 1 << k
+        if shift >= width:
+            shifted = np.zeros_like(cur)
+        elif left:
+            shifted = _cat(np.zeros((shift, 1), dtype=_U64), cur[:width - shift])
+        else:
+            shifted = _cat(cur[shift:], np.zeros((shift, 1), dtype=_U64))
+        cur = _choose(amount[k:k + 1], shifted, cur)
+    return cur
+
+
+def _rshift(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, amount, out: _fit(_barrel(x, amount, x.shape[0], left=False), w)
+
+
+def _lshift(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, amount, out: _barrel(_fit(x, w), amount, w, left=True)
+
+
+def _concat(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, y, out: _fit(_cat(y, x), w)
+
+
+def _rows(start: int, count: int) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        w = _width(node)
+        return lambda x, *_: _fit(x[start:start + count], w)
+    return factory
+
+
+def _select(node: Op) -> Kernel:
+    end = node.attrs["end"]
+    return _rows(end, node.attrs["start"] - end + 1)(node)
+
+
+def _invert(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, out: _fit(~x, w)
+
+
+def _identity(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, out: _fit(x, w)
+
+
+def _or_reduce(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, out: _fit(_any(x), w)
+
+
+def _and_reduce(node: Op) -> Kernel:
+    w = _width(node)
+    return lambda x, out: _fit(_all(x), w)
+
+
+def _fp32_alloc(node: Op) -> Kernel:
+    return lambda sign, exponent, mantissa: _cat(_fit(mantissa, 23), _fit(exponent, 8), _fit(sign, 1))
+
+
+def _q_is_min_val(node: Op) -> Kernel:
+    # Only the sign bit is set
+    w = _width(node)
+    return lambda x: _fit(_all(_cat(~x[:-1], x[-1:])), w)
+
+
+def _get_item(node: Op) -> Kernel:
+    idx = node.attrs["idx"]
+    return lambda x: x[idx]
+
+
+def _tuple_maker(node: Op) -> Kernel:
+    return lambda *args: args
+
+
+_BITSLICE_KERNELS: dict[str, tp.Callable[[Op], Kernel]] = {
+    "basic_mux_2_1": _mux,
+    "basic_add": _add,
+    "basic_sub": _sub,
+    "basic_mul": _mul,
+    "basic_max": _extremum(take_less=False),
+    "basic_min": _extremum(take_less=True),
+    "basic_rshift": _rshift,
+    "basic_lshift": _lshift,
+    "basic_or": _bitwise(lambda x, y: x | y),
+    "basic_xor": _bitwise(lambda x, y: x ^ y),
+    "basic_and": _bitwise(lambda x, y: x & y),
+    "basic_concat": _concat,
+    "basic_less": _predicate(lambda lt, eq: lt),
+    "basic_less_or_equal": _predicate(lambda lt, eq: lt | eq),
+    "basic_greater": _predicate(lambda lt, eq: ~(lt | eq)),
+    "basic_greater_or_equal": _predicate(lambda lt, eq: ~lt),
+    "basic_equal": _predicate(lambda lt, eq: eq),
+    "basic_not_equal": _predicate(lambda lt, eq: ~eq),
+    "basic_select": _select,
+    "basic_invert": _invert,
+    "basic_identity": _identity,
+    "basic_or_reduce": _or_reduce,
+    "basic_and_reduce": _and_reduce,
+    # Field access of packed floating-point formats (zolotone/components)
+    "_bf16_sign": _rows(15, 1),
+    "_bf16_exponent": _rows(7, 8),
+    "_bf16_mantissa": _rows(0, 7),
+    "_fp32_sign": _rows(31, 1),
+    "_fp32_exponent": _rows(23, 8),
+    "_fp32_mantissa": _rows(0, 23),
+    "_fp32_alloc": _fp32_alloc,
+    "_q_is_min_val": _q_is_min_val,
+}
+
+
+def _batch_fallback(node: Op) -> Kernel:
+    # Ops without a bit-sliced kernel run on uint64 columns of the batch backend.
+    # Padding stimuli of the last word are converted too, they are discarded at the end.
+    kernel = batch_kernel(node)
+    arg_types = [arg.node_type for arg in node.args]
+    out_type = node.node_type
+
+    def wrapper(*args):
+        size = LIMB_BITS * max((_words_of(arg) for arg in args), default=1)
+        columns = [from_planes(type_, arg, size) for type_, arg in zip(arg_types, args)]
+        return to_planes(out_type, kernel(*columns), size)
+
+    return wrapper
+
+
+def has_bitslice_kernel(node: Op) -> bool:
+    return (
+        node.name in _BITSLICE_KERNELS
+        or node.name.startswith("_basic_get_item_")
+        or node.name.startswith("basic_tuple_maker_")
+    )
+
+
+def bitslice_kernel(node: Op) -> Kernel:
+    if node.name.startswith("_basic_get_item_"):
+        return _get_item(node)
+    if node.name.startswith("basic_tuple_maker_"):
+        return _tuple_maker(node)
+    factory = _BITSLICE_KERNELS.get(node.name)
+    if factory is None:
+        return _batch_fallback(node)
+    return factory(node)
+
+
+def _as_planes(type_: StaticType, bits: tp.Any) -> tp.Any:
+    if isinstance(type_, TupleT):
+        return tuple(_as_planes(arg, x) for arg, x in zip(type_.args, bits))
+    return _const_planes(bits, type_.total_bits())
+
+
+class BitslicePlan:
+    """Bit-sliced evaluation of a design: 64 stimuli per uint64 word and bit.
+
+    Inputs and outputs are batch columns in the format of BatchPlan. Inside,
+    every value is a stack of bit planes, so bitwise gates, selects and
+    concatenations cost one word operation per 64 stimuli; arithmetic is
+    expanded into ripple-carry, comparator and barrel-shifter networks. Ops
+    without a bit-sliced kernel fall back to the batch kernels.
+    """
+
+    def __init__(self, graph: FlatGraph):
+        self.graph = graph
+        self.inputs: list[Var] = list(graph.inputs)
+        self.output_type: StaticType = graph.output_type
+        self.steps: list[tuple[int, Kernel, tuple[int, ...]]] = [
+            (slot, bitslice_kernel(flat.node), flat.args)
+            for slot, flat in graph.ops()
+        ]
+        self.fallbacks: list[str] = sorted({
+            flat.node.name for _, flat in graph.ops() if not has_bitslice_kernel(flat.node)
+        })
+        self._consts = {
+            slot: _as_planes(flat.type_, flat.value)
+            for slot, flat in enumerate(graph.nodes)
+            if flat.kind == "const"
+        }
+
+    def run_planes(self, *planes: tp.Any) -> tp.Any:
+        """Evaluates already bit-sliced inputs, returns the output bit planes."""
+        if len(planes) != len(self.inputs):
+            raise SimulationError(f"Bit-sliced plan expects {len(self.inputs)} inputs, got {len(planes)}")
+        slots: list[tp.Any] = [None] * len(self.graph.nodes)
+        for slot, value in self._consts.items():
+            slots[slot] = value
+        for slot, value in zip(self.graph.input_slots, planes):
+            slots[slot] = value
+        for slot, kernel, args in self.steps:
+            slots[slot] = kernel(*[slots[arg] for arg in args])
+        return slots[self.graph.output]
+
+    def exhaustive(self) -> tp.Any:
+        """Evaluates every input combination, in the order of exhaustive_planes()."""
+        for var in self.inputs:
+            if isinstance(var.node_type, TupleT):
+                raise SimulationError(f"Exhaustive evaluation does not support tuple input {var.name}")
+        size, planes = exhaustive_planes([var.node_type for var in self.inputs])
+        out = from_planes(self.output_type, self.run_planes(*planes), size)
+        return _broadcast(self.output_type, out, size)
+
+    def __call__(self, *columns: np.ndarray) -> tp.Any:
+        if len(columns) != len(self.inputs):
+            raise SimulationError(f"Bit-sliced plan expects {len(self.inputs)} inputs, got {len(columns)}")
+        size = 1
+        for column in columns:
+            if np.ndim(column):
+                size = max(size, np.shape(column)[0])
+        planes = [
+            to_planes(var.node_type, column, size)
+            for var, column in zip(self.inputs, columns)
+        ]
+        out = from_planes(self.output_type, self.run_planes(*planes), size)
+        return _broadcast(self.output_type, out, size)
+
+
+_bitslice_plans: "weakref.WeakKeyDictionary[Node, BitslicePlan]" = weakref.WeakKeyDictionary()
+
+
+def compile_bitslice(root: Node, optimize: bool = True) -> BitslicePlan:
+    graph = flatten(root)
+    return BitslicePlan(optimize_graph(graph) if optimize else graph)
+
+
+def evaluate_bitslice(root: Node) -> tp.Any:
+    plan = _bitslice_plans.get(root)
+    if plan is None:
+        plan = compile_bitslice(root)
+        _bitslice_plans[root] = plan
+    return plan(*input_columns(plan.inputs))
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+import typing as tp
+
+from ..ast.node import Node
+from ..ast.nodes import Op, Var, composite, primitive
+from ..ast.profiler import node_kind
+from .graph import FlatGraph, FlatNode, flatten
+from .passes import optimize_graph
+
+
+# Area of the cells the estimates are built from, in gate equivalents (2-input NAND = 1)
+GATE_AREA: dict[str, float] = {
+    "inv": 0.67,
+    "and": 1.33,
+    "or": 1.33,
+    "xor": 2.33,
+    "mux": 2.33,
+    "full_adder": 6.0,
+}
+
+
+@dataclass
+class Cost:
+    """Estimated hardware of one Op, or a sum over Ops in aggregated reports."""
+    area: float = 0.0  # gate equivalents
+    adder_bits: int = 0  # adders, subtractors and magnitude comparators
+    mux_bits: int = 0  # 2:1 multiplexers, including the ones of barrel shifters
+    shifter_stages: int = 0  # barrel shifter stages
+    multiplier_bits: int = 0  # partial product bits
+
+    def merge(self, other: "Cost", times: int = 1) -> None:
+        self.area += times * other.area
+        self.adder_bits += times * other.adder_bits
+        self.mux_bits += times * other.mux_bits
+        self.shifter_stages += times * other.shifter_stages
+        self.multiplier_bits += times * other.multiplier_bits
+
+
+# Cost and delay in gate levels of one Op. `consts` holds the raw bits of constant
+# arguments and None for the others.
+OpCost = tp.Callable[[Op, list[tp.Any]], tuple[Cost, int]]
+
+
+def _width(node: Op, idx: int) -> int:
+    return node.args[idx].node_type.total_bits()
+
+
+def _log2(bits: int) -> int:
+    # ceil(log2(bits)), levels of a balanced tree over `bits` leaves
+    return (bits - 1).bit_length() if bits > 1 else 0
+
+
+def _adder_delay(bits: int) -> int:
+    # Parallel-prefix carry network between propagate/generate and sum levels
+    return _log2(bits) + 2
+
+
+def _wire(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    return Cost(), 0
+
+
+def _adder(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    w = min(node.node_type.total_bits(), max(_width(node, 0), _width(node, 1)))
+    return Cost(area=w * GATE_AREA["full_adder"], adder_bits=w), _adder_delay(w)
+
+
+def _comparator(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    w = max(_width(node, 0), _width(node, 1))
+    return Cost(area=w * GATE_AREA["full_adder"], adder_bits=w), _adder_delay(w)
+
+
+def _equality(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    w = max(_width(node, 0), _width(node, 1))
+    return Cost(area=w * GATE_AREA["xor"] + (w - 1) * GATE_AREA["and"]), 1 + _log2(w)
+
+
+def _extremum(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    cost, delay = _comparator(node, consts)
+    w = node.node_type.total_bits()
+    cost.mux_bits += w
+    cost.area += w * GATE_AREA["mux"]
+    return cost, delay + 1
+
+
+def _csa_levels(rows: int) -> int:
+    # 3:2 compressor levels reducing the partial products to two rows
+    levels = 0
+    while rows > 2:
+        rows -= rows // 3
+        levels += 1
+    return levels
+
+
+def _multiplier(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    wx, wy = _width(node, 0), _width(node, 1)
+    bits = wx * wy
+    out = node.node_type.total_bits()
+    cost = Cost(
+        area=bits * (GATE_AREA["and"] + GATE_AREA["full_adder"]),
+        multiplier_bits=bits,
+        adder_bits=out,
+    )
+    # A full adder is two gate levels deep
+    return cost, 1 + 2 * _csa_levels(min(wx, wy)) + _adder_delay(out)
+
+
+def _mux(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    w = node.node_type.total_bits()
+    return Cost(area=w * GATE_AREA["mux"], mux_bits=w), 1
+
+
+def _shifter(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    if consts[1] is not None:
+        return Cost(), 0  # constant shifts are wiring
+    w = max(_width(node, 0), node.node_type.total_bits())
+    # Stages past log2(width) only detect out-of-range amounts, counted as one OR level
+    stages = min(_width(node, 1), _log2(w))
+    overflow = _width(node, 1) - stages
+    cost = Cost(
+        area=stages * w * GATE_AREA["mux"] + overflow * GATE_AREA["or"],
+        mux_bits=stages * w,
+        shifter_stages=stages,
+    )
+    return cost, stages + (1 if overflow else 0)
+
+
+def _bitwise(gate: str) -> OpCost:
+    def estimate(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+        w = node.node_type.total_bits()
+        if consts[0] is not None or consts[1] is not None:
+            if gate != "xor":
+                return Cost(), 0  # masking with a constant is wiring
+            return Cost(area=w * GATE_AREA["inv"]), 1
+        return Cost(area=w * GATE_AREA[gate]), 1
+    return estimate
+
+
+def _invert(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    return Cost(area=node.node_type.total_bits() * GATE_AREA["inv"]), 1
+
+
+def _reduce(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    w = _width(node, 0)
+    return Cost(area=(w - 1) * GATE_AREA["and"]), _log2(w)
+
+
+def _q_is_min_val(node: Op, consts: list[tp.Any]) -> tuple[Cost, int]:
+    cost, delay = _reduce(node, consts)
+    cost.area += (_width(node, 0) - 1) * GATE_AREA["inv"]
+    return cost, delay + 1
+
+
+OP_COSTS: dict[str, OpCost] = {
+    "basic_mux_2_1": _mux,
+    "basic_add": _adder,
+    "basic_sub": _adder,
+    "basic_mul": _multiplier,
+    "basic_max": _extremum,
+    "basic_min": _extremum,
+    "basic_rshift": _shifter,
+    "basic_lshift": _shifter,
+    "basic_or": _bitwise("or"),
+    "basic_xor": _bitwise("xor"),
+    "basic_and": _bitwise("and"),
+    "basic_concat": _wire,
+    "basic_less": _comparator,
+    "basic_less_or_equal": _comparator,
+    "basic_greater": _comparator,
+    "basic_greater_or_equal": _comparator,
+    "basic_equal": _equality,
+    "basic_not_equal": _equality,
+    "basic_select": _wire,
+    "basic_invert": _invert,
+    "basic_identity": _wire,
+    "basic_or_reduce": _reduce,
+    "basic_and_reduce": _reduce,
+    "_bf16_sign": _wire,
+    "_bf16_exponent": _wire,
+    "_bf16_mantissa": _wire,
+    "_fp32_sign": _wire,
+    "_fp32_exponent": _wire,
+    "_fp32_mantissa": _wire,
+    "_fp32_alloc": _wire,
+    "_q_is_min_val": _q_is_min_val,
+}
+
+
+def _op_cost(node: Op) -> tp.Optional[OpCost]:
+    if node.name.startswith("_basic_get_item_") or node.name.startswith("basic_tuple_maker_"):
+        return _wire
+    return OP_COSTS.get(node.name)
+
+
+@dataclass
+class GraphCost:
+    """Area and critical path of a flattened design."""
+    cost: Cost
+    depth: int  # gate levels from any input to the output
+    critical_path: list[str]  # names of the Ops with a delay along the deepest path
+    unknown_ops: list[str]  # Ops without an entry in OP_COSTS, counted as wiring
+
+
+def _const_bits(flat: FlatNode) -> tp.Any:
+    return flat.value if flat.kind == "const" else None
+
+
+def graph_cost(graph: FlatGraph) -> GraphCost:
+    total = Cost()
+    unknown: set[str] = set()
+    arrival = [0] * len(graph.nodes)
+    previous: list[tp.Optional[int]] = [None] * len(graph.nodes)
+    delays = [0] * len(graph.nodes)
+    for slot, flat in graph.ops():
+        estimate = _op_cost(flat.node)
+        if estimate is None:
+            unknown.add(flat.node.name)
+            estimate = _wire
+        consts = [_const_bits(graph.nodes[arg]) for arg in flat.args]
+        cost, delays[slot] = estimate(flat.node, consts)
+        total.merge(cost)
+        if flat.args:
+            previous[slot] = max(flat.args, key=lambda arg: arrival[arg])
+            arrival[slot] = arrival[previous[slot]] + delays[slot]
+        else:
+            arrival[slot] = delays[slot]
+
+    path = []
+    slot: tp.Optional[int] = graph.output
+    while slot is not None:
+        if delays[slot]:
+            path.append(graph.nodes[slot].node.name)
+        slot = previous[slot]
+    return GraphCost(
+        cost=total,
+        depth=arrival[graph.output],
+        critical_path=path[::-1],
+        unknown_ops=sorted(unknown),
+    )
+
+
+@dataclass
+class InstanceCost:
+    """Estimates of all instances of Primitives/Composites with one name.
+
+    Instances are estimated in isolation, so constant arguments of a
+    particular instance do not turn its logic into wiring.
+    """
+    kind: str
+    name: str
+    instances: int = 0  # hardware copies in the design, including nested ones
+    cost: Cost = field(default_factory=Cost)  # sum over all copies
+    depth: int = 0  # deepest single instance
+
+
+@dataclass
+class CostReport:
+    design: str
+    cost: Cost
+    depth: int
+    critical_path: list[str]
+    unknown_ops: list[str]
+    instances: list[InstanceCost]
+
+    def rows(self, sort: str = "area") -> list[dict[str, tp.Any]]:
+        rows = [
+            {"kind": item.kind, "name": item.name, "instances": item.instances, "depth": item.depth, **asdict(item.cost)}
+            for item in self.instances
+        ]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows
+
+    def to_json(self, sort: str = "area") -> str:
+        return json.dumps(
+            {
+                "design": self.design,
+                "depth": self.depth,
+                "critical_path": self.critical_path,
+                "unknown_ops": self.unknown_ops,
+                **asdict(self.cost),
+                "instances": self.rows(sort),
+            },
+            indent=2,
+        )
+
+    def table(self, sort: str = "area", limit: tp.Optional[int] = None) -> str:
+        rows = self.rows(sort)[:limit]
+        names = [f"{row['kind']} {row['name']}" for row in rows]
+        width = max([len("kind/name"), len(self.design), *(len(name) for name in names)])
+        lines = [
+            f"{'kind/name':<{width}}  {'count':>6}  {'area GE':>10}  {'adder':>6}  {'mux':>6}"
+            f"  {'shift':>5}  {'mul':>6}  {'depth':>5}"
+        ]
+
+        def line(name: str, count: str, cost: Cost, depth: int) -> str:
+            return (
+                f"{name:<{width}}  {count:>6}  {cost.area:>10.1f}  {cost.adder_bits:>6}  {cost.mux_bits:>6}"
+                f"  {cost.shifter_stages:>5}  {cost.multiplier_bits:>6}  {depth:>5}"
+            )
+
+        lines.append(line(self.design, "", self.cost, self.depth))
+        for name, row in zip(names, rows):
+            cost = Cost(**{key: row[key] for key in asdict(self.cost)})
+            lines.append(line(name, str(row["instances"]), cost, row["depth"]))
+        return "\n".join(lines)
+
+
+def _instance_counts(root: Node) -> dict[Node, int]:
+    # Hardware copies of every Primitive/Composite instance node; inner trees are shared
+    # between instances, so per-tree counts are computed once and scaled
+    nested: dict[Node, dict[Node, int]] = {}
+
+    def scope(tree: Node) -> dict[Node, int]:
+        if tree in nested:
+            return nested[tree]
+        counts: dict[Node, int] = {}
+        visited: set[Node] = set()
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if node in visited or isinstance(node, Var) or node.runtime_val is not None:
+                continue
+            visited.add(node)
+            stack.extend(node.args)
+            if isinstance(node, (composite, primitive)):
+                counts[node] = counts.get(node, 0) + 1
+                for inner, times in scope(node.inner_tree).items():
+                    counts[inner] = counts.get(inner, 0) + times
+        nested[tree] = counts
+        return counts
+
+    return scope(root)
+
+
+def estimate_cost(root: Node, optimize: bool = True) -> CostReport:
+    """Static area and critical-path estimate of a design and of its Primitives/Composites.
+
+    The estimate runs on the flattened design, after the passes of optimize_graph()
+    unless optimize=False, with the per-Op formulas of OP_COSTS.
+    """
+    def analyze(graph: FlatGraph) -> GraphCost:
+        return graph_cost(optimize_graph(graph) if optimize else graph)
+
+    design = analyze(flatten(root))
+    templates: dict[Node, GraphCost] = {}
+    groups: dict[tuple[str, str], InstanceCost] = {}
+    for node, times in _instance_counts(root).items():
+        if node is root:
+            continue  # reported as the design itself
+        template = templates.get(node.inner_tree)
+        if template is None:
+            template = analyze(flatten(node.inner_tree, inputs=node.inner_args))
+            templates[node.inner_tree] = template
+        key = (node_kind(node), node.name)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = InstanceCost(kind=key[0], name=key[1])
+        group.instances += times
+        group.cost.merge(template.cost, times)
+        group.depth = max(group.depth, template.depth)
+
+    return CostReport(
+        design=root.name,
+        cost=design.cost,
+        depth=design.depth,
+        critical_path=design.critical_path,
+        unknown_ops=design.unknown_ops,
+        instances=list(groups.values()),
+    )
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import typing as tp
+
+from ..ast.node import Node
+from ..ast.nodes import Const, Op, Var, composite, primitive
+from ..types.static import StaticType
+
+
+class SimulationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class FlatNode:
+    """One slot of a flattened design: an input, a constant, or an Op applied to earlier slots."""
+    kind: str  # "input" | "const" | "op" | "call"
+    node: Node
+    type_: StaticType
+    args: tuple[int, ...] = ()
+    value: tp.Any = None  # raw bits for constants
+
+
+@dataclass
+class FlatGraph:
+    """Topologically sorted Op/Const/Var graph with Primitives and Composites inlined."""
+    nodes: list[FlatNode] = field(default_factory=list)
+    inputs: list[Var] = field(default_factory=list)
+    input_slots: list[int] = field(default_factory=list)
+    output: int = -1
+
+    @property
+    def output_type(self) -> StaticType:
+        return self.nodes[self.output].type_
+
+    def ops(self) -> tp.Iterator[tuple[int, FlatNode]]:
+        for slot, flat in enumerate(self.nodes):
+            if flat.kind == "op":
+                yield slot, flat
+
+
+class _Flattener:
+    def __init__(self, calls: tp.Optional[tp.Callable[[Node], bool]] = None) -> None:
+        self.graph = FlatGraph()
+        self._calls = calls
+        self._inputs: dict[Var, int] = {}
+        self._consts: dict[tp.Any, int] = {}
+
+    def _append(self, flat: FlatNode) -> int:
+        self.graph.nodes.append(flat)
+        return len(self.graph.nodes) - 1
+
+    def _const(self, node: Node, type_: StaticType, bits: tp.Any) -> int:
+        key = (repr(type_), bits)
+        if key not in self._consts:
+            self._consts[key] = self._append(
+                FlatNode(kind="const", node=node, type_=type_, value=bits)
+            )
+        return self._consts[key]
+
+    def _input(self, node: Var) -> int:
+        if node not in self._inputs:
+            slot = self._append(FlatNode(kind="input", node=node, type_=node.node_type))
+            self._inputs[node] = slot
+            self.graph.inputs.append(node)
+            self.graph.input_slots.append(slot)
+        return self._inputs[node]
+
+    def visit(self, node: Node, env: dict[Node, int], memo: dict[Node, int]) -> int:
+        if node in memo:
+            return memo[node]
+
+        if isinstance(node, Var):
+            slot = env[node] if node in env else self._input(node)
+        elif node.runtime_val is not None:
+            slot = self._const(node, node.node_type, node.runtime_val.to_bits())
+        elif isinstance(node, Const):
+            slot = self._const(node, node.node_type, node.val.to_bits())
+        elif isinstance(node, Op):
+            args = tuple(self.visit(arg, env, memo) for arg in node.args)
+            slot = self._append(FlatNode(kind="op", node=node, type_=node.node_type, args=args))
+        elif isinstance(node, (primitive, composite)) and self._calls is not None and self._calls(node):
+            # Kept as a call of the Primitive/Composite on the argument slots
+            args = tuple(self.visit(arg, env, memo) for arg in node.args)
+            slot = self._append(FlatNode(kind="call", node=node, type_=node.node_type, args=args))
+        elif isinstance(node, (primitive, composite)):
+            # Inline: the inner tree is evaluated with inner args bound to the outer slots
+            args = [self.visit(arg, env, memo) for arg in node.args]
+            inner_env = dict(zip(node.inner_args, args))
+            slot = self.visit(node.inner_tree, inner_env, {})
+        else:
+            raise SimulationError(f"Unsupported node type: {type(node).__name__}")
+
+        memo[node] = slot
+        return slot
+
+
+def flatten(
+    root: Node,
+    inputs: tp.Optional[list[Var]] = None,
+    calls: tp.Optional[tp.Callable[[Node], bool]] = None,
+) -> FlatGraph:
+    # `inputs` fixes the leading input slots, e.g. the inner args of a Primitive for lowering;
+    # Primitives/Composites selected by `calls` stay "call" slots instead of being inlined
+    flattener = _Flattener(calls)
+    for var in inputs or []:
+        flattener._input(var)
+    flattener.graph.output = flattener.visit(root, {}, {})
+    return flattener.graph
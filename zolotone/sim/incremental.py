@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import typing as tp
+import weakref
+
+from ..ast.node import Node
+from ..ast.nodes import Var
+from ..types.runtime import RuntimeType
+from ..types.static import StaticType
+from .graph import FlatGraph, SimulationError, flatten
+from .passes import optimize_graph
+from .kernels import Kernel, scalar_kernel
+
+
+# Cones are cached per set of changed inputs; sweeps keep changing the same few inputs.
+# Least recently used cones are evicted beyond this, except for the full recomputation
+MAX_CACHED_CONES = 256
+
+
+class IncrementalPlan:
+    """Evaluation plan that keeps every slot value between calls.
+
+    Each Op slot records which inputs it transitively depends on. When called
+    again, only the fan-out cone of inputs whose bits changed since the last
+    call is recomputed; values of unaffected subgraphs are reused.
+    """
+
+    def __init__(self, graph: FlatGraph):
+        self.graph = graph
+        self.inputs: list[Var] = list(graph.inputs)
+        self.output_type: StaticType = graph.output_type
+        self.steps: list[tuple[int, Kernel, tuple[int, ...]]] = [
+            (slot, scalar_kernel(flat.node), flat.args)
+            for slot, flat in graph.ops()
+        ]
+
+        # Bit i of a dependency mask is set if the slot depends on input i
+        masks = [0] * len(graph.nodes)
+        for idx, slot in enumerate(graph.input_slots):
+            masks[slot] = 1 << idx
+        self._step_masks: list[int] = []
+        for slot, _, args in self.steps:
+            mask = 0
+            for arg in args:
+                mask |= masks[arg]
+            masks[slot] = mask
+            self._step_masks.append(mask)
+
+        # Compiled update and number of recomputed slots by dirty mask, least recently used first
+        self._cones: OrderedDict[tp.Optional[int], tuple[tp.Callable[[list[tp.Any]], None], int]] = OrderedDict()
+        self._values: list[tp.Any] = [
+            flat.value if flat.kind == "const" else None for flat in graph.nodes
+        ]
+        self._bits: tp.Optional[tuple[tp.Any, ...]] = None
+        self.last_recomputed = 0
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _compile(self, steps: list[tuple[int, Kernel, tuple[int, ...]]]) -> tp.Callable[[list[tp.Any]], None]:
+        # Straight-line update of the slot list: cone slots live in locals and are written back
+        namespace: dict[str, tp.Any] = {}
+        computed: set[int] = set()
+        body = []
+        for slot, kernel, args in steps:
+            namespace[f"k{slot}"] = kernel
+            operands = ", ".join(f"s{arg}" if arg in computed else f"v[{arg}]" for arg in args)
+            body.append(f"    s{slot} = k{slot}({operands})")
+            computed.add(slot)
+        body.extend(f"    v[{slot}] = s{slot}" for slot, _, _ in steps)
+        source = "\n".join(["def run(v):", *(body or ["    pass"])])
+        exec(compile(source, f"<incremental {self.graph.nodes[self.graph.output].node.name}>", "exec"), namespace)
+        return namespace["run"]
+
+    def _cone(self, dirty: tp.Optional[int]) -> tuple[tp.Callable[[list[tp.Any]], None], int]:
+        # dirty=None stands for a full recomputation
+        cone = self._cones.get(dirty)
+        if cone is not None:
+            self._cones.move_to_end(dirty)
+            return cone
+        steps = [
+            step for step, mask in zip(self.steps, self._step_masks)
+            if dirty is None or mask & dirty
+        ]
+        cone = self._cones[dirty] = (self._compile(steps), len(steps))
+        if len(self._cones) > MAX_CACHED_CONES:
+            # The full recomputation stays, every reset() starts with it
+            del self._cones[next(key for key in self._cones if key is not None)]
+        return cone
+
+    def __call__(self, *bits: tp.Any) -> tp.Any:
+        if len(bits) != len(self.inputs):
+            raise SimulationError(f"Plan expects {len(self.inputs)} inputs, got {len(bits)}")
+
+        if self._bits is None:
+            dirty = None
+        else:
+            dirty = 0
+            for idx, (old, new) in enumerate(zip(self._bits, bits)):
+                if old != new:
+                    dirty |= 1 << idx
+
+        values = self._values
+        recomputed = 0
+        if dirty != 0:
+            for slot, value in zip(self.graph.input_slots, bits):
+                values[slot] = value
+            run, recomputed = self._cone(dirty)
+            try:
+                run(values)
+            except Exception:
+                # Slots may be half-updated, the next call starts from scratch
+                self.reset()
+                raise
+
+        self._bits = bits
+        self.last_recomputed = recomputed
+        return values[self.graph.output]
+
+    def reset(self) -> None:
+        """Forgets the cached slot values, the next call recomputes everything."""
+        self._bits = None
+
+    def evaluate(self) -> RuntimeType:
+        """Runs the plan on the values currently loaded into its input Vars."""
+        bits = []
+        for var in self.inputs:
+            if var.val is None:
+                raise ValueError(f"Variable {var.name} not bound to a value")
+            bits.append(var.val.to_bits())
+        return self.output_type.from_bits(self(*bits))
+
+
+_incremental_plans: "weakref.WeakKeyDictionary[Node, IncrementalPlan]" = weakref.WeakKeyDictionary()
+
+
+def compile_incremental(root: Node, optimize: bool = True) -> IncrementalPlan:
+    graph = flatten(root)
+    return IncrementalPlan(optimize_graph(graph) if optimize else graph)
+
+
+def evaluate_incremental(root: Node) -> RuntimeType:
+    plan = _incremental_plans.get(root)
+    if plan is None:
+        plan = compile_incremental(root)
+        _incremental_plans[root] = plan
+    return plan.evaluate()
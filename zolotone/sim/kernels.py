@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import typing as tp
+
+from ..ast.nodes import Op
+from ..types.static import StaticType
+
+
+Kernel = tp.Callable[..., tp.Any]
+
+
+def _mask(type_: StaticType) -> int:
+    return (1 << type_.total_bits()) - 1
+
+
+def _width(node: Op, idx: int) -> int:
+    return node.args[idx].node_type.total_bits()
+
+
+############ Scalar kernels ############
+# Each factory receives an Op and returns a function over raw bit patterns.
+# Basic operators take their output shape as a trailing argument, which kernels ignore.
+
+def _mux(node: Op) -> Kernel:
+    m = _mask(node.node_type)
+    return lambda sel, in0, in1, out: (in1 if sel else in0) & m
+
+
+def _binary(f: tp.Callable[[int, int], int]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        m = _mask(node.node_type)
+        return lambda x, y, out: f(x, y) & m
+    return factory
+
+
+def _rshift(node: Op) -> Kernel:
+    m = _mask(node.node_type)
+    return lambda x, amount, out: (x >> amount) & m
+
+
+def _lshift(node: Op) -> Kernel:
+    width = node.node_type.total_bits()
+    m = _mask(node.node_type)
+    return lambda x, amount, out: ((x << amount) & m) if amount < width else 0
+
+
+def _concat(node: Op) -> Kernel:
+    shift = _width(node, 1)
+    m = _mask(node.node_type)
+    return lambda x, y, out: ((x << shift) | y) & m
+
+
+def _select(node: Op) -> Kernel:
+    end = node.attrs["end"]
+    m = _mask(node.node_type) & ((1 << (node.attrs["start"] - end + 1)) - 1)
+    return lambda x, out: (x >> end) & m
+
+
+def _invert(node: Op) -> Kernel:
+    x_mask = (1 << _width(node, 0)) - 1
+    m = _mask(node.node_type)
+    return lambda x, out: (x_mask - x) & m
+
+
+def _identity(node: Op) -> Kernel:
+    m = _mask(node.node_type)
+    return lambda x, out: x & m
+
+
+def _or_reduce(node: Op) -> Kernel:
+    m = _mask(node.node_type)
+    return lambda x, out: (1 if x else 0) & m
+
+
+def _and_reduce(node: Op) -> Kernel:
+    x_mask = (1 << _width(node, 0)) - 1
+    m = _mask(node.node_type)
+    return lambda x, out: (1 if x == x_mask else 0) & m
+
+
+def _get_item(node: Op) -> Kernel:
+    idx = node.attrs["idx"]
+    return lambda x: x[idx]
+
+
+def _tuple_maker(node: Op) -> Kernel:
+    return lambda *args: args
+
+
+_SCALAR_KERNELS: dict[str, tp.Callable[[Op], Kernel]] = {
+    "basic_mux_2_1": _mux,
+    "basic_add": _binary(lambda x, y: x + y),
+    "basic_sub": _binary(lambda x, y: x - y),
+    "basic_mul": _binary(lambda x, y: x * y),
+    "basic_max": _binary(max),
+    "basic_min": _binary(min),
+    "basic_rshift": _rshift,
+    "basic_lshift": _lshift,
+    "basic_or": _binary(lambda x, y: x | y),
+    "basic_xor": _binary(lambda x, y: x ^ y),
+    "basic_and": _binary(lambda x, y: x & y),
+    "basic_concat": _concat,
+    "basic_less": _binary(lambda x, y: 1 if x < y else 0),
+    "basic_less_or_equal": _binary(lambda x, y: 1 if x <= y else 0),
+    "basic_greater": _binary(lambda x, y: 1 if x > y else 0),
+    "basic_greater_or_equal": _binary(lambda x, y: 1 if x >= y else 0),
+    "basic_equal": _binary(lambda x, y: 1 if x == y else 0),
+    "basic_not_equal": _binary(lambda x, y: 1 if x != y else 0),
+    "basic_select": _select,
+    "basic_invert": _invert,
+    "basic_identity": _identity,
+    "basic_or_reduce": _or_reduce,
+    "basic_and_reduce": _and_reduce,
+}
+
+
+def _runtime_fallback(node: Op) -> Kernel:
+    # Ops without a dedicated kernel go through their RuntimeType implementation
+    arg_types = [arg.node_type for arg in node.args]
+    impl = node.raw_impl
+
+    def kernel(*bits):
+        inputs = [type_.from_bits(x) for type_, x in zip(arg_types, bits)]
+        return impl(*inputs).to_bits()
+
+    return kernel
+
+
+def scalar_kernel(node: Op) -> Kernel:
+    if node.name.startswith("_basic_get_item_"):
+        return _get_item(node)
+    if node.name.startswith("basic_tuple_maker_"):
+        return _tuple_maker(node)
+    factory = _SCALAR_KERNELS.get(node.name)
+    if factory is None:
+        return _runtime_fallback(node)
+    return factory(node)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import typing as tp
+
+import numpy as np
+
+from ..ast.nodes import Op
+
+
+LIMB_BITS = 64
+
+_U64 = np.uint64
+_DIGIT_MASK = _U64((1 << 32) - 1)
+
+Kernel = tp.Callable[..., tp.Any]
+
+
+############# Limb arrays ##############
+# Values wider than LIMB_BITS are stored as uint64 arrays of shape (..., k)
+# with the least significant limb first. Constants have shape (k,) and
+# broadcast against batches of shape (N, k).
+
+def n_limbs(bits: int) -> int:
+    return max(1, -(-bits // LIMB_BITS))
+
+
+def int_to_limbs(value: int, bits: int) -> np.ndarray:
+    k = n_limbs(bits)
+    return np.array(
+        [(value >> (LIMB_BITS * i)) & ((1 << LIMB_BITS) - 1) for i in range(k)],
+        dtype=_U64,
+    )
+
+
+def ints_to_limbs(values: tp.Iterable[int], bits: int) -> np.ndarray:
+    k = n_limbs(bits)
+    rows = [int_to_limbs(int(value), bits) for value in values]
+    if not rows:
+        return np.zeros((0, k), dtype=_U64)
+    return np.stack(rows)
+
+
+def limbs_to_ints(limbs: np.ndarray) -> list[int]:
+    """Converts an (N, k) limb array back to Python ints."""
+    limbs = np.asarray(limbs, dtype=_U64)
+    result = [0] * limbs.shape[0]
+    for i in reversed(range(limbs.shape[-1])):
+        column = limbs[:, i].tolist()
+        result = [(acc << LIMB_BITS) | x for acc, x in zip(result, column)]
+    return result
+
+
+def mask_limbs(bits: int) -> np.ndarray:
+    return int_to_limbs((1 << bits) - 1, bits)
+
+
+def resize(x: np.ndarray, k: int) -> np.ndarray:
+    current = x.shape[-1]
+    if current == k:
+        return x
+    if current > k:
+        return x[..., :k]
+    x = np.asarray(x)
+    pad = np.zeros(x.shape[:-1] + (k - current,), dtype=_U64)
+    return np.concatenate([x, pad], axis=-1)
+
+
+def _stack(limbs: list[tp.Any]) -> np.ndarray:
+    return np.stack(np.broadcast_arrays(*limbs), axis=-1)
+
+
+def add(a: np.ndarray, b: np.ndarray, k: int) -> np.ndarray:
+    a, b = resize(a, k), resize(b, k)
+    carry = _U64(0)
+    out = []
+    for i in range(k):
+        s = a[..., i] + b[..., i]
+        t = s + carry
+        carry = ((s < a[..., i]) | (t < s)).astype(_U64)
+        out.append(t)
+    return _stack(out)
+
+
+def sub(a: np.ndarray, b: np.ndarray, k: int) -> np.ndarray:
+    a, b = resize(a, k), resize(b, k)
+    borrow = _U64(0)
+    out = []
+    for i in range(k):
+        d = a[..., i] - b[..., i]
+        t = d - borrow
+        borrow = ((a[..., i] < b[..., i]) | (d < borrow)).astype(_U64)
+        out.append(t)
+    return _stack(out)
+
+
+def _digits(x: np.ndarray) -> list[tp.Any]:
+    digits = []
+    for i in range(x.shape[-1]):
+        digits.append(x[..., i] & _DIGIT_MASK)
+        digits.append(x[..., i] >> _U64(32))
+    return digits
+
+
+def mul(a: np.ndarray, b: np.ndarray, k: int) -> np.ndarray:
+    # Schoolbook multiplication over 32-bit digits so partial products fit a limb
+    da, db = _digits(resize(a, k)), _digits(resize(b, k))
+    n = 2 * k
+    acc: list[tp.Any] = [_U64(0)] * n
+    for i in range(n):
+        for j in range(n - i):
+            p = da[i] * db[j]
+            acc[i + j] = acc[i + j] + (p & _DIGIT_MASK)
+            if i + j + 1 < n:
+                acc[i + j + 1] = acc[i + j + 1] + (p >> _U64(32))
+    carry: tp.Any = _U64(0)
+    digits = []
+    for t in range(n):
+        v = acc[t] + carry
+        digits.append(v & _DIGIT_MASK)
+        carry = v >> _U64(32)
+    return _stack([digits[2 * i] | (digits[2 * i + 1] << _U64(32)) for i in range(k)])
+
+
+def _prepare_shift(x: np.ndarray, amount: tp.Any) -> tuple[np.ndarray, np.ndarray, np.ndarray, tuple[int, ...]]:
+    k = x.shape[-1]
+    amount = np.minimum(np.asarray(amount, dtype=_U64), _U64(LIMB_BITS * k)).astype(np.int64)
+    shape = np.broadcast_shapes(x.shape[:-1], amount.shape)
+    x = np.broadcast_to(x, shape + (k,))
+    amount = np.broadcast_to(amount, shape)
+    q = (amount // LIMB_BITS)[..., None]
+    r = (amount % LIMB_BITS).astype(_U64)[..., None]
+    return x, q, r, shape
+
+
+def shr(x: np.ndarray, amount: tp.Any) -> np.ndarray:
+    k = x.shape[-1]
+    x, q, r, shape = _prepare_shift(x, amount)
+    padded = np.concatenate([x, np.zeros(shape + (k + 1,), dtype=_U64)], axis=-1)
+    idx = q + np.arange(k)
+    lo = np.take_along_axis(padded, idx, axis=-1)
+    hi = np.take_along_axis(padded, idx + 1, axis=-1)
+    carried = np.where(r == 0, _U64(0), hi << ((_U64(LIMB_BITS) - r) & _U64(LIMB_BITS - 1)))
+    return (lo >> r) | carried
+
+
+def shl(x: np.ndarray, amount: tp.Any) -> np.ndarray:
+    k = x.shape[-1]
+    x, q, r, shape = _prepare_shift(x, amount)
+    padded = np.concatenate([np.zeros(shape + (k + 1,), dtype=_U64), x], axis=-1)
+    idx = np.arange(k) - q + (k + 1)
+    lo = np.take_along_axis(padded, idx, axis=-1)
+    hi = np.take_along_axis(padded, idx - 1, axis=-1)
+    carried = np.where(r == 0, _U64(0), hi >> ((_U64(LIMB_BITS) - r) & _U64(LIMB_BITS - 1)))
+    return (lo << r) | carried
+
+
+def compare(a: np.ndarray, b: np.ndarray) -> tuple[tp.Any, tp.Any]:
+    """Returns (a < b, a == b) computed from the most significant limb down."""
+    k = max(a.shape[-1], b.shape[-1])
+    a, b = resize(a, k), resize(b, k)
+    lt: tp.Any = np.False_
+    eq: tp.Any = np.True_
+    for i in reversed(range(k)):
+        lt = lt | (eq & (a[..., i] < b[..., i]))
+        eq = eq & (a[..., i] == b[..., i])
+    return lt, eq
+
+
+def _saturate(amount: np.ndarray) -> tp.Any:
+    # Shift amounts wider than a limb only matter through their low limb or as "too large"
+    if amount.shape[-1] == 1:
+        return amount[..., 0]
+    too_large = np.any(amount[..., 1:] != 0, axis=-1)
+    return np.where(too_large, _U64(np.iinfo(np.uint64).max), amount[..., 0])
+
+
+############# Wide kernels #############
+# Wide kernels receive every argument as a limb array and return the result
+# as a limb array of n_limbs(output width) limbs, masked to the output width.
+
+def _out(node: Op) -> tuple[int, np.ndarray]:
+    bits = node.node_type.total_bits()
+    return n_limbs(bits), mask_limbs(bits)
+
+
+def _arg_mask(node: Op, idx: int) -> np.ndarray:
+    return mask_limbs(node.args[idx].node_type.total_bits())
+
+
+def _flag(value: tp.Any, k: int, m: np.ndarray) -> np.ndarray:
+    return resize(np.asarray(value).astype(_U64)[..., None], k) & m
+
+
+def _mux(node: Op) -> Kernel:
+    k, m = _out(node)
+    return lambda sel, in0, in1, out: np.where(
+        (sel[..., 0] != 0)[..., None], resize(in1, k), resize(in0, k)
+    ) & m
+
+
+def _arith(f: tp.Callable[[np.ndarray, np.ndarray, int], np.ndarray]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        k, m = _out(node)
+        return lambda x, y, out: f(x, y, k) & m
+    return factory
+
+
+def _bitwise(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        k, m = _out(node)
+        return lambda x, y, out: f(resize(x, k), resize(y, k)) & m
+    return factory
+
+
+def _extremum(take_less: bool) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        k, m = _out(node)
+
+        def kernel(x, y, out):
+            lt, _ = compare(x, y)
+            pick_x = lt if take_less else ~lt
+            return np.where(np.asarray(pick_x)[..., None], resize(x, k), resize(y, k)) & m
+
+        return kernel
+    return factory
+
+
+def _predicate(f: tp.Callable[[tp.Any, tp.Any], tp.Any]) -> tp.Callable[[Op], Kernel]:
+    def factory(node: Op) -> Kernel:
+        k, m = _out(node)
+        return lambda x, y, out: _flag(f(*compare(x, y)), k, m)
+    return factory
+
+
+def _rshift(node: Op) -> Kernel:
+    k, m = _out(node)
+    return lambda x, amount, out: resize(shr(x, _saturate(amount)), k) & m
+
+
+def _lshift(node: Op) -> Kernel:
+    k, m = _out(node)
+    return lambda x, amount, out: shl(resize(x, k), _saturate(amount)) & m
+
+
+def _concat(node: Op) -> Kernel:
+    k, m = _out(node)
+    shift = _U64(node.args[1].node_type.total_bits())
+    return lambda x, y, out: (shl(resize(x, k), shift) | resize(y, k)) & m
+
+
+def _select(node: Op) -> Kernel:
+    k, m = _out(node)
+    end = _U64(node.attrs["end"])
+    m = m & resize(mask_limbs(node.attrs["start"] - node.attrs["end"] + 1), k)
+    return lambda x, out: resize(shr(x, end), k) & m
+
+
+def _invert(node: Op) -> Kernel:
+    k, m = _out(node)
+    x_mask = _arg_mask(node, 0)
+    return lambda x, out: resize(x ^ x_mask, k) & m
+
+
+def _identity(node: Op) -> Kernel:
+    k, m = _out(node)
+    return lambda x, out: resize(x, k) & m
+
+
+def _or_reduce(node: Op) -> Kernel:
+    k, m = _out(node)
+    return lambda x, out: _flag(np.any(x != 0, axis=-1), k, m)
+
+
+def _and_reduce(node: Op) -> Kernel:
+    k, m = _out(node)
+    x_mask = _arg_mask(node, 0)
+    return lambda x, out: _flag(np.all(x == x_mask, axis=-1), k, m)
+
+
+WIDE_KERNELS: dict[str, tp.Callable[[Op], Kernel]] = {
+    "basic_mux_2_1": _mux,
+    "basic_add": _arith(add),
+    "basic_sub": _arith(sub),
+    "basic_mul": _arith(mul),
+    "basic_max": _extremum(take_less=False),
+    "basic_min": _extremum(take_less=True),
+    "basic_rshift": _rshift,
+    "basic_lshift": _lshift,
+    "basic_or": _bitwise(lambda x, y: x | y),
+    "basic_xor": _bitwise(lambda x, y: x ^ y),
+    "basic_and": _bitwise(lambda x, y: x & y),
+    "basic_concat": _concat,
+    "basic_less": _predicate(lambda lt, eq: lt),
+    "basic_less_or_equal": _predicate(lambda lt, eq: lt | eq),
+    "basic_greater": _predicate(lambda lt, eq: ~(lt | eq)),
+    "basic_greater_or_equal": _predicate(lambda lt, eq: ~lt),
+    "basic_equal": _predicate(lambda lt, eq: eq),
+    "basic_not_equal": _predicate(lambda lt, eq: ~eq),
+    "basic_select": _select,
+    "basic_invert": _invert,
+    "basic_identity": _identity,
+    "basic_or_reduce": _or_reduce,
+    "basic_and_reduce": _and_reduce,
+}
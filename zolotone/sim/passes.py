@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+import typing as tp
+
+from ..types.static import TupleT
+from .graph import FlatGraph, FlatNode
+
+
+# A pass rewrites a flattened design into an equivalent one
+Pass = tp.Callable[[FlatGraph], FlatGraph]
+
+
+def _forward(graph: FlatGraph, target: tp.Callable[[int, FlatNode, list[FlatNode]], int]) -> FlatGraph:
+    # Visits slots in topological order with arguments already redirected; target() returns
+    # the slot that replaces the visited one, which is left in place for remove_dead_nodes
+    forward = list(range(len(graph.nodes)))
+    nodes: list[FlatNode] = []
+    for slot, flat in enumerate(graph.nodes):
+        if flat.args:
+            args = tuple(forward[arg] for arg in flat.args)
+            if args != flat.args:
+                flat = replace(flat, args=args)
+        nodes.append(flat)
+        if flat.kind == "op":
+            forward[slot] = target(slot, flat, nodes)
+
+    output = forward[graph.output]
+    if nodes[output].type_ != nodes[graph.output].type_:
+        # Keeps the declared output type of the design, e.g. Q instead of an equal-width UQ
+        output = graph.output
+    return FlatGraph(
+        nodes=nodes,
+        inputs=list(graph.inputs),
+        input_slots=list(graph.input_slots),
+        output=output,
+    )
+
+
+def _is_bit_identity(flat: FlatNode, nodes: list[FlatNode]) -> bool:
+    if flat.node.name != "basic_identity" or isinstance(flat.type_, TupleT):
+        return False
+    source = nodes[flat.args[0]].type_
+    # Narrowing masks the value and widening changes the representation in the batch backends
+    return not isinstance(source, TupleT) and source.total_bits() == flat.type_.total_bits()
+
+
+def eliminate_copies(graph: FlatGraph) -> FlatGraph:
+    """Forwards equal-width basic_identity casts and tuple items taken from a tuple maker."""
+    def target(slot: int, flat: FlatNode, nodes: list[FlatNode]) -> int:
+        if _is_bit_identity(flat, nodes):
+            return flat.args[0]
+        if flat.node.name.startswith("_basic_get_item_"):
+            source = nodes[flat.args[0]]
+            if source.kind == "op" and source.node.name.startswith("basic_tuple_maker_"):
+                return source.args[flat.node.attrs["idx"]]
+        return slot
+
+    return _forward(graph, target)
+
+
+def _op_key(flat: FlatNode) -> tp.Any:
+    # Same identification as the hash-consing of Ops during elaboration, with argument
+    # nodes replaced by slots: Primitive boundaries no longer separate equal subexpressions
+    node = flat.node
+    identity = node._identity()
+    if identity is None:
+        identity = ("id", id(node))
+    return (
+        identity,
+        flat.type_,
+        tuple(arg.node_type for arg in node.args),
+        flat.args,
+    )
+
+
+def eliminate_common_subexpressions(graph: FlatGraph) -> FlatGraph:
+    """Forwards every Op slot to the first slot applying the same Op to the same slots."""
+    seen: dict[tp.Any, int] = {}
+
+    def target(slot: int, flat: FlatNode, nodes: list[FlatNode]) -> int:
+        return seen.setdefault(_op_key(flat), slot)
+
+    return _forward(graph, target)
+
+
+def _live_slots(graph: FlatGraph) -> list[bool]:
+    # Inputs stay even if unused, plans keep the input signature of the design
+    live = [False] * len(graph.nodes)
+    live[graph.output] = True
+    for slot in graph.input_slots:
+        live[slot] = True
+    for slot in range(len(graph.nodes) - 1, -1, -1):
+        if live[slot]:
+            for arg in graph.nodes[slot].args:
+                live[arg] = True
+    return live
+
+
+def remove_dead_nodes(graph: FlatGraph) -> FlatGraph:
+    """Drops slots the output does not depend on and renumbers the remaining ones."""
+    live = _live_slots(graph)
+    renumber: dict[int, int] = {}
+    nodes: list[FlatNode] = []
+    for slot, flat in enumerate(graph.nodes):
+        if not live[slot]:
+            continue
+        renumber[slot] = len(nodes)
+        if flat.args:
+            flat = replace(flat, args=tuple(renumber[arg] for arg in flat.args))
+        nodes.append(flat)
+    return FlatGraph(
+        nodes=nodes,
+        inputs=list(graph.inputs),
+        input_slots=[renumber[slot] for slot in graph.input_slots],
+        output=renumber[graph.output],
+    )
+
+
+def live_ops(graph: FlatGraph) -> int:
+    """Number of Op slots the output depends on."""
+    live = _live_slots(graph)
+    return sum(1 for slot, _ in graph.ops() if live[slot])
+
+
+DEFAULT_PASSES: list[tuple[str, Pass]] = [
+    ("copies", eliminate_copies),
+    ("cse", eliminate_common_subexpressions),
+    ("dce", remove_dead_nodes),
+]
+
+
+@dataclass(frozen=True)
+class PassStats:
+    name: str
+    ops_before: int
+    ops_after: int
+
+
+class PassManager:
+    """Runs graph passes in order and records the live Op count around each of them."""
+
+    def __init__(self, passes: tp.Optional[list[tuple[str, Pass]]] = None):
+        self.passes = list(DEFAULT_PASSES if passes is None else passes)
+        self.stats: list[PassStats] = []
+
+    def run(self, graph: FlatGraph) -> FlatGraph:
+        self.stats = []
+        ops = live_ops(graph)
+        for name, pass_ in self.passes:
+            graph = pass_(graph)
+            ops_after = live_ops(graph)
+            self.stats.append(PassStats(name=name, ops_before=ops, ops_after=ops_after))
+            ops = ops_after
+        return graph
+
+
+def optimize_graph(graph: FlatGraph) -> FlatGraph:
+    return PassManager().run(graph)
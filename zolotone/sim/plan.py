@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import typing as tp
+
+from ..ast.node import Node
+from ..ast.nodes import Var
+from ..types.runtime import RuntimeType
+from ..types.static import StaticType
+from .graph import FlatGraph, SimulationError, flatten
+from .passes import optimize_graph
+from .kernels import Kernel, scalar_kernel
+
+
+class EvalPlan:
+    """Flat, precompiled evaluation of a design over raw bit patterns.
+
+    The plan is a topologically sorted list of slots. Each Op slot holds a
+    closure over raw integers, so running the plan allocates no RuntimeType
+    objects. Inputs are the free Vars of the design in first-use order; for
+    a Primitive/Composite applied to Vars this is its argument order.
+    """
+
+    def __init__(self, graph: FlatGraph):
+        self.graph = graph
+        self.inputs: list[Var] = list(graph.inputs)
+        self.output_type: StaticType = graph.output_type
+        self.steps: list[tuple[int, Kernel, tuple[int, ...]]] = [
+            (slot, scalar_kernel(flat.node), flat.args)
+            for slot, flat in graph.ops()
+        ]
+        self._run = self._build()
+
+    def _build(self) -> tp.Callable[..., tp.Any]:
+        # Straight-line Python keeps the hot loop free of slot-list indexing
+        namespace: dict[str, tp.Any] = {}
+        names: dict[int, str] = {}
+        for slot, flat in enumerate(self.graph.nodes):
+            if flat.kind == "const":
+                names[slot] = f"c{slot}"
+                namespace[names[slot]] = flat.value
+        for idx, slot in enumerate(self.graph.input_slots):
+            names[slot] = f"i{idx}"
+
+        body = []
+        for slot, kernel, args in self.steps:
+            namespace[f"k{slot}"] = kernel
+            names[slot] = f"s{slot}"
+            body.append(f"    s{slot} = k{slot}({', '.join(names[arg] for arg in args)})")
+        body.append(f"    return {names[self.graph.output]}")
+
+        params = ", ".join(names[slot] for slot in self.graph.input_slots)
+        source = "\n".join([f"def run({params}):", *body])
+        exec(compile(source, f"<plan {self.graph.nodes[self.graph.output].node.name}>", "exec"), namespace)
+        return namespace["run"]
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __call__(self, *bits: tp.Any) -> tp.Any:
+        if len(bits) != len(self.inputs):
+            raise SimulationError(f"Plan expects {len(self.inputs)} inputs, got {len(bits)}")
+        return self._run(*bits)
+
+    def evaluate(self, *values: RuntimeType) -> RuntimeType:
+        """Runs the plan on RuntimeType inputs and wraps the output like Node.evaluate()."""
+        return self.output_type.from_bits(self(*[value.to_bits() for value in values]))
+
+    def bound_inputs(self) -> tuple[tp.Any, ...]:
+        """Raw bits currently loaded into the plan's input Vars."""
+        return tuple(var.evaluate().to_bits() for var in self.inputs)
+
+
+def compile_plan(root: Node, optimize: bool = True) -> EvalPlan:
+    graph = flatten(root)
+    return EvalPlan(optimize_graph(graph) if optimize else graph)
@@ -1,10 +1,23 @@
 import random
 import time
 
-from .static import BFloat16T, BoolT, Float32T, QT, TupleT, UQT
+from .static import BFloat16T, BoolT, Float32T, QT, StaticType, TupleT, UQT
+
+
+# Static types of runtime values are shared per shape, callers must not mutate them
+_static_types: dict[tuple, StaticType] = {}
+
+
+def _static_type_of(key: tuple, build) -> StaticType:
+    type_ = _static_types.get(key)
+    if type_ is None:
+        type_ = _static_types[key] = build()
+    return type_
 
 
 class RuntimeType:
+    __slots__ = ()
+    
     def to_spec(self):
         raise NotImplementedError
     
@@ -27,9 +40,18 @@ class RuntimeType:
     def total_bits(self):
         raise NotImplementedError
     
+    def to_bits(self):
+        """Raw bit pattern of the value; tuples map to tuples of bit patterns."""
+        return self.val
+    
     def __eq__(self, other):
         raise NotImplementedError
 
+    def _fields(self):
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                yield name, getattr(self, name)
+    
     def _fingerprint(self):
         from .utils import _fingerprint_value
         return (
@@ -37,7 +59,7 @@ class RuntimeType:
             tuple(
                 sorted(
                     (name, _fingerprint_value(value))
-                    for name, value in vars(self).items()
+                    for name, value in self._fields()
                 )
             ),
         )
@@ -45,6 +67,8 @@ class RuntimeType:
 
 # TODO: Tuple should have a default self.val field
 class Tuple(RuntimeType):
+    __slots__ = ("args",)
+    
     def __init__(self, *args: RuntimeType):
         if not args:
             raise TypeError("Tuple cannot be empty")
@@ -64,11 +88,18 @@ class Tuple(RuntimeType):
         return f"Tuple[{', '.join([str(x) for x in self.args])}]"
     
     def static_type(self):
-        return TupleT(*[x.static_type() for x in self.args])
+        arg_types = [x.static_type() for x in self.args]
+        return _static_type_of(
+            ("Tuple", *arg_types),
+            lambda: TupleT(*arg_types),
+        )
     
     def total_bits(self):
         return sum([x.total_bits() for x in self.args])
     
+    def to_bits(self):
+        return tuple(x.to_bits() for x in self.args)
+    
     def copy(self, val=None):
         if val is None:
             return Tuple(*[x.copy() for x in self.args])
@@ -95,6 +126,8 @@ class Tuple(RuntimeType):
 
 
 class Bool(RuntimeType):
+    __slots__ = ("val",)
+    
     def __init__(self, val: int):
         if val not in (0, 1):
             raise ValueError(f"Bool value must be 0 or 1, got {val}")
@@ -110,7 +143,7 @@ class Bool(RuntimeType):
         return ctx.bool_val(self.to_val())
     
     def static_type(self):
-        return BoolT()
+        return _static_type_of(("Bool",), BoolT)
     
     def copy(self, val=None):
         if val is None:
@@ -129,6 +162,8 @@ class Bool(RuntimeType):
 
 class Q(RuntimeType):
     """Signed fixed-point type."""
+    __slots__ = ("val", "int_bits", "frac_bits")
+    
     def __init__(self, val: int, int_bits: int, frac_bits: int):
         self.val, self.int_bits, self.frac_bits = val, int_bits, frac_bits
         
@@ -160,7 +195,10 @@ class Q(RuntimeType):
         return ctx.real_val(self.to_val())
     
     def static_type(self):
-        return QT(self.int_bits, self.frac_bits)
+        return _static_type_of(
+            ("Q", self.int_bits, self.frac_bits),
+            lambda: QT(self.int_bits, self.frac_bits),
+        )
     
     def copy(self, val=None):
         if val is None:
@@ -214,6 +252,8 @@ class Q(RuntimeType):
 
 class UQ(RuntimeType):
     """Unsigned fixed-point type."""
+    __slots__ = ("val", "int_bits", "frac_bits")
+    
     def __init__(self, val: int, int_bits: int, frac_bits: int):
         total_bits = int_bits + frac_bits
         
@@ -241,7 +281,10 @@ class UQ(RuntimeType):
         return ctx.real_val(self.to_val())
     
     def static_type(self):
-        return UQT(self.int_bits, self.frac_bits)
+        return _static_type_of(
+            ("UQ", self.int_bits, self.frac_bits),
+            lambda: UQT(self.int_bits, self.frac_bits),
+        )
     
     def copy(self, val=None):
         if val is None:
@@ -285,6 +328,7 @@ class UQ(RuntimeType):
 
 class Float32(RuntimeType):
     """Single-precision floating-point format, IEEE754-1985"""
+    __slots__ = ("val",)
     mantissa_bits = 23
     exponent_bits = 8
     exponent_bias = 127
@@ -393,7 +437,7 @@ class Float32(RuntimeType):
        
     
     def static_type(self):
-        return Float32T()
+        return _static_type_of(("Float32",), Float32T)
     
     @classmethod
     def nInf(cls):
@@ -440,6 +484,7 @@ class Float32(RuntimeType):
 
 class BFloat16(RuntimeType):
     """Brain Floating Point 16-bit (bfloat16) format — 1 sign, 8 exponent, 7 mantissa bits."""
+    __slots__ = ("val",)
     mantissa_bits = 7
     exponent_bits = 8
     exponent_bias = 127
@@ -498,7 +543,7 @@ class BFloat16(RuntimeType):
         return ctx.real_val(self.to_val())
     
     def static_type(self):
-        return BFloat16T()
+        return _static_type_of(("BFloat16",), BFloat16T)
     
     @classmethod
     def random_generator(cls, seed = None, shared_exponent_bits: int = 0):
@@ -1,18 +1,67 @@
 import random
 
 
-class StaticType:
-    def __init__(self):
-        self.runtime_val = None
+# Canonical instances by (class, shape) and by (class, constructor call)
+_interned: dict[tuple, "StaticType"] = {}
+_interned_calls: dict[tuple, "StaticType"] = {}
+
+
+class _Interned(type):
+    """Makes every StaticType subclass return one shared, frozen instance per shape."""
+    
+    def __call__(cls, *args, **kwargs):
+        try:
+            call_key = (cls, args, tuple(sorted(kwargs.items())))
+            instance = _interned_calls.get(call_key)
+        except TypeError:  # unhashable constructor arguments
+            call_key, instance = None, None
+        if instance is None:
+            new = super().__call__(*args, **kwargs)
+            instance = _interned.setdefault((cls, new._key()), new)
+            if instance is new:
+                object.__setattr__(new, "_frozen", True)
+            if call_key is not None:
+                _interned_calls[call_key] = instance
+        return instance
+
+
+def cpp_uint_literal(value: int, bits: int, jittable: bool = True) -> str:
+    """C++ expression of a non-negative constant used in a `bits`-wide context."""
+    if jittable and bits > 64:
+        words = [(value >> (64 * i)) & ((1 << 64) - 1) for i in range((bits + 63) // 64)]
+        return f"zolotone::wide<{bits}>::words({', '.join(f'{word}ull' for word in words)})"
+    return str(value)
+
+
+class StaticType(metaclass=_Interned):
+    """Immutable, interned description of a value's shape.
     
-    def copy(self) -> "StaticType":
-        """Return a fresh StaticType instance with the same shape."""
-        new = self._clone_impl()
-        new.runtime_val = None if self.runtime_val is None else self.runtime_val.copy()
-        return new
+    Equal types are the same object, so equality and hashing are identity checks.
+    Constant-folded values live on Node.runtime_val, not on the type.
+    """
+    _frozen = False
     
-    def _clone_impl(self) -> "StaticType":
-        raise NotImplementedError
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        object.__setattr__(self, name, value)
+    
+    def __eq__(self, other):
+        return self is other
+    
+    def __hash__(self):
+        return id(self)
+    
+    def __reduce__(self):
+        return (type(self), self._key())
+    
+    def _key(self) -> tuple:
+        """Constructor arguments, which fully determine the type."""
+        return ()
+    
+    def copy(self) -> "StaticType":
+        # Types are immutable, so a copy is the type itself
+        return self
     
     def total_bits(self):
         raise NotImplementedError
@@ -29,39 +78,37 @@ class StaticType:
             elif total_bits <= 64:
                 return "uint64_t"
             else:
-                raise TypeError("Can not find an ABI-safe type with more than 64 bits in C")  # can use pointer buffers for this
+                # Multi-word integer defined by the prelude of codegen/wide.py
+                return f"zolotone::wide<{total_bits}>"
         else:
             return f"ac_uint<{total_bits}>"
     
     def __repr__(self):
         raise NotImplementedError
     
-    def __eq__(self, other):
-        raise NotImplementedError
-    
     def to_spec(self, name, ctx):
         raise NotImplementedError
     
     def random_runtime_value(self, rng: random.Random):
         raise NotImplementedError
     
+    def from_bits(self, bits):
+        """Builds a runtime value of this type from its raw bit pattern."""
+        raise NotImplementedError
+    
     def _fingerprint(self):
         from .utils import _fingerprint_value
         fields = tuple(
             sorted(
                 (name, _fingerprint_value(value))
                 for name, value in vars(self).items()
-                if name != "runtime_val"
+                if not name.startswith("_")
             )
         )
-        runtime_val = None if self.runtime_val is None else self.runtime_val._fingerprint()
-        return (type(self).__name__, fields, runtime_val)
+        return (type(self).__name__, fields)
 
 
 class BoolT(StaticType):
-    def __init__(self):
-        super().__init__()
-    
     def total_bits(self):
         return 1
     
@@ -71,23 +118,20 @@ class BoolT(StaticType):
     def __str__(self):
         return f"Bool<1>"
     
-    def __eq__(self, other):
-        return isinstance(other, BoolT)
-    
-    def _clone_impl(self) -> "QT":
-        return BoolT()
-    
     def to_spec(self, name, ctx):
         return ctx.fresh_bool(name)
     
     def random_runtime_value(self, rng: random.Random):
         from .runtime import Bool
         return Bool(rng.getrandbits(1))
+    
+    def from_bits(self, bits):
+        from .runtime import Bool
+        return Bool(bits)
 
 
 class QT(StaticType):
     def __init__(self, int_bits: int, frac_bits: int):
-        super().__init__()
         if int_bits < 0 or frac_bits < 0:
             raise ValueError(
                 f"QT bit widths must be non-negative, got int_bits={int_bits}, frac_bits={frac_bits}"
@@ -96,6 +140,9 @@ class QT(StaticType):
             raise ValueError("QT requires at least one total bit")
         self.int_bits, self.frac_bits = int_bits, frac_bits
     
+    def _key(self):
+        return (self.int_bits, self.frac_bits)
+    
     def total_bits(self):
         return self.int_bits + self.frac_bits
     
@@ -105,27 +152,20 @@ class QT(StaticType):
     def __str__(self):
         return f"Q<{self.int_bits},{self.frac_bits}>"
     
-    def __eq__(self, other):
-        return (
-            isinstance(other, QT)
-            and self.int_bits == other.int_bits
-            and self.frac_bits == other.frac_bits
-        )
-    
-    def _clone_impl(self) -> "QT":
-        return QT(self.int_bits, self.frac_bits)
-    
     def to_spec(self, name, ctx):
         return ctx.fresh_real(name)
     
     def random_runtime_value(self, rng: random.Random):
         from .runtime import Q
         return Q(rng.getrandbits(self.total_bits()), self.int_bits, self.frac_bits)
+    
+    def from_bits(self, bits):
+        from .runtime import Q
+        return Q(bits, self.int_bits, self.frac_bits)
 
 
 class UQT(StaticType):
     def __init__(self, int_bits: int, frac_bits: int):
-        super().__init__()
         if int_bits < 0 or frac_bits < 0:
             raise ValueError(
                 f"UQT bit widths must be non-negative, got int_bits={int_bits}, frac_bits={frac_bits}"
@@ -134,6 +174,9 @@ class UQT(StaticType):
             raise ValueError("UQT requires at least one total bit")
         self.int_bits, self.frac_bits = int_bits, frac_bits
     
+    def _key(self):
+        return (self.int_bits, self.frac_bits)
+    
     def total_bits(self):
         return self.int_bits + self.frac_bits
     
@@ -143,16 +186,6 @@ class UQT(StaticType):
     def __str__(self):
         return f"UQ<{self.int_bits},{self.frac_bits}>"
     
-    def __eq__(self, other):
-        return (
-            isinstance(other, UQT)
-            and self.int_bits == other.int_bits
-            and self.frac_bits == other.frac_bits
-        )
-    
-    def _clone_impl(self) -> "UQT":
-        return UQT(self.int_bits, self.frac_bits)
-    
     def to_spec(self, name, ctx):
         variable = ctx.fresh_real(name)
         ctx.assume(variable.eq(abs(variable)))
@@ -161,11 +194,14 @@ class UQT(StaticType):
     def random_runtime_value(self, rng: random.Random):
         from .runtime import UQ
         return UQ(rng.getrandbits(self.total_bits()), self.int_bits, self.frac_bits)
+    
+    def from_bits(self, bits):
+        from .runtime import UQ
+        return UQ(bits, self.int_bits, self.frac_bits)
 
 
 class Float32T(StaticType):
     def __init__(self):
-        super().__init__()
         self.sign_bits = 1
         self.mantissa_bits = 23
         self.exponent_bits = 8
@@ -179,17 +215,6 @@ class Float32T(StaticType):
     def __str__(self):
         return f"Float<32>"
     
-    def __eq__(self, other):
-        return (
-            isinstance(other, Float32T)
-            and self.sign_bits == other.sign_bits
-            and self.mantissa_bits == other.mantissa_bits
-            and self.exponent_bits == other.exponent_bits
-        )
-    
-    def _clone_impl(self) -> "Float32T":
-        return Float32T()
-    
     def to_spec(self, name, ctx):
         from ..spec.custom_specs.fp32 import fp32
 
@@ -198,11 +223,14 @@ class Float32T(StaticType):
     def random_runtime_value(self, rng: random.Random):
         from .runtime import Float32
         return Float32(rng.getrandbits(self.total_bits()))
+    
+    def from_bits(self, bits):
+        from .runtime import Float32
+        return Float32(bits)
 
 
 class BFloat16T(StaticType):
     def __init__(self):
-        super().__init__()
         self.sign_bits = 1
         self.mantissa_bits = 7
         self.exponent_bits = 8
@@ -216,28 +244,20 @@ class BFloat16T(StaticType):
     def __str__(self):
         return f"BFloat<16>"
     
-    def __eq__(self, other):
-        return (
-            isinstance(other, BFloat16T)
-            and self.sign_bits == other.sign_bits
-            and self.mantissa_bits == other.mantissa_bits
-            and self.exponent_bits == other.exponent_bits
-        )
-    
-    def _clone_impl(self) -> "BFloat16T":
-        return BFloat16T()
-    
     def to_spec(self, name, ctx):
         return ctx.fresh_real(name)
     
     def random_runtime_value(self, rng: random.Random):
         from .runtime import BFloat16
         return BFloat16(rng.getrandbits(self.total_bits()))
+    
+    def from_bits(self, bits):
+        from .runtime import BFloat16
+        return BFloat16(bits)
 
 
 class TupleT(StaticType):
     def __init__(self, *args: StaticType):
-        super().__init__()
         for x in args:
             if not isinstance(x, StaticType):
                 raise TypeError(f"TupleT can not contain non-StaticType, given: {x}")
@@ -245,6 +265,9 @@ class TupleT(StaticType):
             raise ValueError("tuple can not be empty")
         self.args = args
     
+    def _key(self):
+        return self.args
+    
     def total_bits(self):
         return sum([x.total_bits() for x in self.args])
     
@@ -254,16 +277,6 @@ class TupleT(StaticType):
     def __str__(self):
         return f"Tuple<{', '.join([repr(x) for x in self.args])}>"
     
-    def __eq__(self, other):
-        return (
-            isinstance(other, TupleT)
-            and len(self.args) == len(other.args)
-            and all([arg1 == arg2 for arg1, arg2 in zip(self.args, other.args)])
-        )
-    
-    def _clone_impl(self) -> "TupleT":
-        return TupleT(*[arg.copy() for arg in self.args])
-    
     def to_spec(self, name, ctx):
         return tuple(x.to_spec(name=f"{name}_{i}", ctx=ctx) for i, x in enumerate(self.args))
     
@@ -273,3 +286,7 @@ class TupleT(StaticType):
     def random_runtime_value(self, rng: random.Random):
         from .runtime import Tuple
         return Tuple(*[arg.random_runtime_value(rng) for arg in self.args])
+    
+    def from_bits(self, bits):
+        from .runtime import Tuple
+        return Tuple(*[arg.from_bits(x) for arg, x in zip(self.args, bits, strict=True)])
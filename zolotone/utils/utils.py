@@ -5,6 +5,29 @@ import typing as tp
 import numpy as np
 
 
+# Signatures are immutable, so wrappers with the same types share one
+_fixed_signatures: dict[tuple[tp.Any, ...], inspect.Signature] = {}
+
+
+def _fixed_signature(arg_types: tuple[tp.Any, ...], return_type: tp.Any) -> inspect.Signature:
+    key = (arg_types, return_type)
+    sig = _fixed_signatures.get(key)
+    if sig is None:
+        params = [
+            inspect.Parameter(
+                f"arg{i}",
+                inspect.Parameter.POSITIONAL_ONLY,
+                annotation=arg_type,
+            )
+            for i, arg_type in enumerate(arg_types)
+        ]
+        sig = _fixed_signatures[key] = inspect.Signature(
+            parameters=params,
+            return_annotation=return_type,
+        )
+    return sig
+
+
 def make_fixed_arguments(
     f: tp.Callable[..., tp.Any],
     arg_types: list[tp.Any],
@@ -14,19 +37,7 @@ def make_fixed_arguments(
     if return_type is inspect._empty:
         return_type = f.__annotations__.get("return", inspect._empty)
 
-    params = [
-        inspect.Parameter(
-            f"arg{i}",
-            inspect.Parameter.POSITIONAL_ONLY,
-            annotation=arg_type,
-        )
-        for i, arg_type in enumerate(arg_types)
-    ]
-
-    sig = inspect.Signature(
-        parameters=params,
-        return_annotation=return_type,
-    )
+    sig = _fixed_signature(tuple(arg_types), return_type)
 
     def wrapper(*args):
         if len(args) != N:
@@ -92,7 +103,7 @@ def round_to_the_nearest_even(x: int, x_len: int, target_len: int) -> int:
     return x
 
 def print_runtime_val(x, name: str):
-    print(f"{name}: {str(x.node_type.runtime_val)}")
+    print(f"{name}: {str(x.runtime_val)}")
 
 def mask(x, n):
     return x & ((1 << n) - 1)